@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+bench.py
+
+Benchmark-runner (standalone, zonder extra dependencies) voor de hot paths
+van de CyNiT Tools hub:
+
+- cert_viewer.decode_cert_from_bytes   (RSA/EC certificaten en CSR's)
+- cynit_exports.build_zip_bytes        (json, csv, html, md, xlsx en alles samen)
+- dcb_org_export.build_excel           (1k / 10k / 100k rijen)
+- dcbaas_api._load_collection          (grote Postman collection)
+- useful_links.load_db                 (10k links)
+- cynit_theme.markdown_to_html_simple  (export-markdown)
+- volledige render van /               (ctools.app via test_client)
+
+Alle testdata wordt synthetisch aangemaakt in een tijdelijke map; er wordt
+niets in config/ of exports/ aangeraakt.
+
+Resultaten gaan als JSON naar bench_results/<datum>-<commit>.json (+ latest.json),
+en worden vergeleken met het vorige resultaat (of --compare BESTAND).
+
+Gebruik:
+    python bench.py                      # alles
+    python bench.py --quick              # zonder de zware cases (100k rijen)
+    python bench.py --only cert,zip      # enkel namen die een van deze stukken bevatten
+    python bench.py --fail-on-regression 20   # exit 1 als iets >20% trager is
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+BASE_DIR = Path(__file__).parent.resolve()
+RESULTS_DIR = BASE_DIR / "bench_results"
+RESULTS_VERSION = 1
+
+MIN_TIME = 0.2     # minimum meettijd per ronde (s); kleine calls worden gebundeld
+ROUNDS = 5
+
+
+# =========================
+# Registratie
+# =========================
+
+# naam -> (setup, heavy); setup(tmp_dir) geeft de te meten functie (zonder args)
+BENCHMARKS: Dict[str, Tuple[Callable[[Path], Callable[[], Any]], bool]] = {}
+
+
+def bench(name: str, heavy: bool = False):
+    def deco(setup: Callable[[Path], Callable[[], Any]]):
+        BENCHMARKS[name] = (setup, heavy)
+        return setup
+    return deco
+
+
+# =========================
+# Testdata
+# =========================
+
+def _make_cert_and_csr(kind: str) -> Tuple[bytes, bytes]:
+    """Self-signed certificaat + CSR (PEM) met RSA-2048 of EC P-256."""
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec, rsa
+    from cryptography.x509.oid import NameOID
+
+    if kind == "rsa":
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    else:
+        key = ec.generate_private_key(ec.SECP256R1())
+
+    name = x509.Name([
+        x509.NameAttribute(NameOID.COUNTRY_NAME, "BE"),
+        x509.NameAttribute(NameOID.ORGANIZATION_NAME, "CyNiT Bench"),
+        x509.NameAttribute(NameOID.ORGANIZATIONAL_UNIT_NAME, "Perf"),
+        x509.NameAttribute(NameOID.COMMON_NAME, f"bench-{kind}.example.org"),
+    ])
+    now = dt.datetime.now(dt.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now)
+        .not_valid_after(now + dt.timedelta(days=365))
+        .sign(key, hashes.SHA256())
+    )
+    csr = x509.CertificateSigningRequestBuilder().subject_name(name).sign(key, hashes.SHA256())
+    enc = serialization.Encoding.PEM
+    return cert.public_bytes(enc), csr.public_bytes(enc)
+
+
+def _org_results(rows: int, orgs: int = 50) -> Dict[str, List[Dict[str, Any]]]:
+    results: Dict[str, List[Dict[str, Any]]] = {}
+    for i in range(rows):
+        org = f"0{200000000 + i % orgs}"
+        results.setdefault(org, []).append({
+            "application_name": f"toepassing-{i % (rows // 4 or 1)}",
+            "application_status": "ACTIVE",
+            "contact_persons": [f"persoon{i % 7}@example.org", "team@example.org"],
+            "description": "Synthetische toepassing voor benchmark",
+            "type": "SERVER",
+            "issued_by": "Bench CA",
+            "start_date": "2025-01-01",
+            "end_date": "2026-01-01",
+            "status": "VALID",
+            "serial_number": f"{i:032x}",
+        })
+    return results
+
+
+def _postman_collection(folders: int = 40, per_folder: int = 50) -> Dict[str, Any]:
+    def req(f: int, r: int) -> Dict[str, Any]:
+        return {
+            "name": f"Request {f}-{r}",
+            "request": {
+                "method": "POST" if r % 2 else "GET",
+                "url": {"raw": "{{url}}/api/v1/applications/{{appId}}/certificates?page=" + str(r)},
+                "header": [
+                    {"key": "Authorization", "value": "Bearer {{DCB TOKEN}}"},
+                    {"key": "Origin", "value": "{{Origin}}"},
+                    {"key": "Content-Type", "value": "application/json"},
+                ],
+                "body": {
+                    "mode": "raw",
+                    "raw": json.dumps({"organizationCode": "{{orgCode}}", "name": f"app-{r}", "index": r}),
+                },
+            },
+        }
+
+    items = []
+    for f in range(folders):
+        sub = [req(f, r) for r in range(per_folder // 2)]
+        items.append({
+            "name": f"Folder {f}",
+            "item": [
+                {"name": "Sub", "item": sub},
+                *[req(f, r) for r in range(per_folder // 2, per_folder)],
+            ],
+        })
+    return {"info": {"name": "Bench collection"}, "item": items}
+
+
+def _links_db(count: int = 10_000, categories: int = 25) -> Dict[str, Any]:
+    cats = {f"Categorie {i}": {"color": "#00f700"} for i in range(categories)}
+    links = [
+        {
+            "id": str(uuid.UUID(int=i)),
+            "name": f"Link {i}",
+            "url": f"https://example.org/pad/{i}",
+            "category": f"Categorie {i % categories}",
+            "info": "",
+            "created": "2025-01-01T00:00:00",
+            "updated": "2025-01-01T00:00:00",
+        }
+        for i in range(count)
+    ]
+    return {
+        "version": 7,
+        "prefs": {"default_category": "Categorie 0", "hide_default_category": False},
+        "categories": cats,
+        "links": links,
+    }
+
+
+def _export_markdown() -> str:
+    exports = sorted((BASE_DIR / "exports").glob("*.md"))
+    text = "\n\n".join(p.read_text(encoding="utf-8") for p in exports[:4])
+    if not text:
+        rows = "\n".join(f"| Veld {i} | Waarde {i} |" for i in range(200))
+        text = "# Export\n\n## Subject\n\n| Field | Value |\n|---|---|\n" + rows
+    # schaal op naar ~200 KB zodat de meting stabiel is
+    return (text + "\n\n") * max(1, 200_000 // max(1, len(text)))
+
+
+# =========================
+# Benchmarks
+# =========================
+
+for _kind in ("rsa", "ec"):
+    for _obj in ("cert", "csr"):
+        def _setup(tmp: Path, kind: str = _kind, obj: str = _obj) -> Callable[[], Any]:
+            import cert_viewer
+            cert_pem, csr_pem = _make_cert_and_csr(kind)
+            data = cert_pem if obj == "cert" else csr_pem
+            fake = Path(f"bench.{obj}.pem")
+            return lambda: cert_viewer.decode_cert_from_bytes(data, fake)
+        bench(f"cert.decode.{_kind}_{_obj}")(_setup)
+
+
+for _fmt in ("json", "csv", "html", "md", "xlsx", "all"):
+    def _setup(tmp: Path, fmt: str = _fmt) -> Callable[[], Any]:
+        import cert_viewer
+        import cynit_exports
+        import cynit_theme
+        cert_pem, _csr = _make_cert_and_csr("rsa")
+        info = cert_viewer.decode_cert_from_bytes(cert_pem, Path("bench.pem"))
+        settings = cynit_theme.load_settings()
+        formats = ["json", "csv", "html", "md", "xlsx"] if fmt == "all" else [fmt]
+        return lambda: cynit_exports.build_zip_bytes(info, settings, formats)
+    bench(f"zip.{_fmt}")(_setup)
+
+
+for _rows, _heavy in ((1_000, False), (10_000, False), (100_000, True)):
+    def _setup(tmp: Path, rows: int = _rows) -> Callable[[], Any]:
+        import dcb_org_export
+        dcb_org_export.DEBUG = False
+        results = _org_results(rows)
+        return lambda: dcb_org_export.build_excel(results)
+    bench(f"excel.build_{_rows // 1000}k", heavy=_heavy)(_setup)
+
+
+@bench("postman.load_collection_2k")
+def _setup_postman(tmp: Path) -> Callable[[], Any]:
+    import dcbaas_api
+    path = tmp / "bench.postman_collection.json"
+    path.write_text(json.dumps(_postman_collection()), encoding="utf-8")
+    return lambda: dcbaas_api._load_collection(path)
+
+
+@bench("links.load_db_10k")
+def _setup_links(tmp: Path) -> Callable[[], Any]:
+    import useful_links
+    path = tmp / "useful_links.json"
+    path.write_text(json.dumps(_links_db(), indent=2), encoding="utf-8")
+    useful_links.DATA_PATH = path
+    return useful_links.load_db
+
+
+@bench("markdown.to_html")
+def _setup_markdown(tmp: Path) -> Callable[[], Any]:
+    import cynit_theme
+    text = _export_markdown()
+    return lambda: cynit_theme.markdown_to_html_simple(text)
+
+
+@bench("page.index")
+def _setup_index(tmp: Path) -> Callable[[], Any]:
+    import ctools
+    client = ctools.app.test_client()
+
+    def run() -> None:
+        resp = client.get("/")
+        if resp.status_code != 200:
+            raise RuntimeError(f"GET / gaf {resp.status_code}")
+    return run
+
+
+# =========================
+# Meten
+# =========================
+
+def measure(fn: Callable[[], Any], rounds: int = ROUNDS, min_time: float = MIN_TIME) -> Dict[str, Any]:
+    """Zoals timeit.autorange: bundel calls tot een ronde >= min_time duurt."""
+    t0 = time.perf_counter()
+    fn()  # warm-up (imports, caches)
+    first = time.perf_counter() - t0
+
+    number = 1
+    if first < min_time:
+        number = max(1, int(min_time / max(first, 1e-6)))
+
+    per_call: List[float] = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        per_call.append((time.perf_counter() - t0) / number)
+
+    return {
+        "min_s": min(per_call),
+        "median_s": statistics.median(per_call),
+        "mean_s": statistics.fmean(per_call),
+        "stdev_s": statistics.stdev(per_call) if len(per_call) > 1 else 0.0,
+        "first_s": first,
+        "rounds": rounds,
+        "number": number,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BASE_DIR, capture_output=True, text=True, timeout=10,
+        )
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run(names: List[str], rounds: int) -> Dict[str, Any]:
+    if str(BASE_DIR) not in sys.path:
+        sys.path.insert(0, str(BASE_DIR))
+
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory(prefix="cynit-bench-") as tmp:
+        for name in names:
+            setup, heavy = BENCHMARKS[name]
+            rnds = 1 if heavy else rounds
+            try:
+                fn = setup(Path(tmp))
+                res = measure(fn, rounds=rnds)
+            except Exception as e:
+                res = {"error": f"{type(e).__name__}: {e}"}
+                print(f"  {name:<28} FOUT  {res['error']}")
+            else:
+                print(f"  {name:<28} {res['median_s'] * 1000:10.3f} ms  (min {res['min_s'] * 1000:.3f}, n={res['number']}x{rnds})")
+            results[name] = res
+
+    return {
+        "version": RESULTS_VERSION,
+        "created": dt.datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+
+# =========================
+# Opslag / vergelijken
+# =========================
+
+def save(report: Dict[str, Any], out_dir: Path) -> Path:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stamp = dt.datetime.now().strftime("%Y%m%d-%H%M%S")
+    path = out_dir / f"{stamp}-{report.get('commit') or 'nogit'}.json"
+    text = json.dumps(report, indent=2)
+    path.write_text(text, encoding="utf-8")
+    (out_dir / "latest.json").write_text(text, encoding="utf-8")
+    return path
+
+
+def previous_report(out_dir: Path, exclude: Optional[Path] = None) -> Optional[Path]:
+    files = sorted(p for p in out_dir.glob("*.json") if p.name != "latest.json" and p != exclude)
+    return files[-1] if files else None
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, float]:
+    """Verschil in % van de mediaan t.o.v. baseline (positief = trager)."""
+    deltas: Dict[str, float] = {}
+    print(f"\nVergelijking met {baseline.get('commit') or '?'} ({baseline.get('created')}):")
+    for name, res in report["results"].items():
+        old = (baseline.get("results") or {}).get(name) or {}
+        if "median_s" not in res or "median_s" not in old or not old["median_s"]:
+            continue
+        delta = (res["median_s"] / old["median_s"] - 1.0) * 100.0
+        deltas[name] = round(delta, 1)
+        print(f"  {name:<28} {delta:+7.1f}%")
+    return deltas
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmarks voor de CyNiT Tools hot paths.")
+    ap.add_argument("--only", help="Komma-gescheiden stukken van benchmarknamen")
+    ap.add_argument("--quick", action="store_true", help="Zware benchmarks overslaan")
+    ap.add_argument("--rounds", type=int, default=ROUNDS, help="Aantal meetrondes")
+    ap.add_argument("--out", type=Path, default=RESULTS_DIR, help="Map voor de JSON-resultaten")
+    ap.add_argument("--compare", type=Path, help="Vergelijk met dit resultaatbestand (default: vorige run)")
+    ap.add_argument("--no-save", action="store_true", help="Resultaat niet bewaren")
+    ap.add_argument("--fail-on-regression", type=float, metavar="PCT",
+                    help="Exit 1 als een benchmark meer dan PCT%% trager is dan de baseline")
+    ap.add_argument("--list", action="store_true", help="Toon de beschikbare benchmarks")
+    args = ap.parse_args(argv)
+
+    names = list(BENCHMARKS)
+    if args.list:
+        for n in names:
+            print(n + ("  (zwaar)" if BENCHMARKS[n][1] else ""))
+        return 0
+    if args.only:
+        parts = [p.strip() for p in args.only.split(",") if p.strip()]
+        names = [n for n in names if any(p in n for p in parts)]
+    if args.quick:
+        names = [n for n in names if not BENCHMARKS[n][1]]
+    if not names:
+        print("Geen benchmarks geselecteerd.")
+        return 2
+
+    print(f"CyNiT bench: {len(names)} benchmark(s)")
+    report = run(names, max(1, args.rounds))
+
+    saved: Optional[Path] = None
+    if not args.no_save:
+        saved = save(report, args.out)
+        print(f"\nResultaat: {saved}")
+
+    baseline_path = args.compare or previous_report(args.out, exclude=saved)
+    if baseline_path and baseline_path.exists():
+        deltas = compare(report, json.loads(baseline_path.read_text(encoding="utf-8")))
+        if args.fail_on_regression is not None:
+            slow = {n: d for n, d in deltas.items() if d > args.fail_on_regression}
+            if slow:
+                print(f"\nRegressies (> {args.fail_on_regression:g}%): {', '.join(sorted(slow))}")
+                return 1
+
+    return 1 if any("error" in r for r in report["results"].values()) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
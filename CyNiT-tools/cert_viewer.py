@@ -57,6 +57,7 @@ from cryptography.x509.oid import NameOID
 import cynit_theme
 import cynit_layout
 import cynit_exports
+import cynit_state
 
 
 # ------------------------------------------------------------
@@ -69,7 +70,8 @@ LOGO_PATH: Path = cynit_theme.LOGO_PATH
 # Laat export-map & styles volledig door cynit_exports beheren
 EXPORTS_DIR: Path = cynit_exports.EXPORTS_DIR
 
-LAST_INFO: Optional[Dict[str, Any]] = None   # voor web-downloads
+# voor web-downloads; gedeeld over workers (zie cynit_state)
+_SHARED = cynit_state.shared_dict("cert_viewer", {"last_info": None})
 
 
 # ------------------------------------------------------------
@@ -288,12 +290,11 @@ def decode_cert_from_file(path: Path) -> Dict[str, Any]:
 # ------------------------------------------------------------
 
 def set_last_info(info: Dict[str, Any]) -> None:
-    global LAST_INFO
-    LAST_INFO = info
+    _SHARED["last_info"] = info
 
 
 def get_last_info() -> Optional[Dict[str, Any]]:
-    return LAST_INFO
+    return _SHARED.get("last_info")
 
 
 # ------------------------------------------------------------
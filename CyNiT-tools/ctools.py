@@ -9,11 +9,10 @@ CyNiT Tools webhub:
 - Icons per tool instelbaar via tools.json -> icon_web / icon_gui.
 - Web-only tools: volledige card is klikbaar.
 - Web+GUI / GUI-tools: aparte knoppen.
-- Registreert web-routes van:
-  * cert_viewer
-  * voica1
-  * config_editor
-  * dcb_org_export
+- Registreert web-routes van cert_viewer, voica1, config_editor, dcbaas_api,
+  dcb_org_export, ... lazy via cynit_registry: enkel tools uit tools.json,
+  elk pas bij het eerste request op zijn web_path (settings.json ->
+  "lazy_tools": false = alles bij startup laden).
 - /start/ route om GUI-tools te starten (type 'gui' of 'web+gui').
 - /yt-launch: PIN-beveiligde launcher voor SP-YT/yt.py.
 """
@@ -24,11 +23,15 @@ import json
 import os
 import subprocess
 import sys
+import signal
 import socket
 import time
+from urllib.parse import urlsplit
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 
+_STARTUP_T0 = time.perf_counter()  # voor de startup-rapportage in register_external_routes
+
 from flask import (
     Flask,
     render_template_string,
@@ -37,7 +40,7 @@ from flask import (
     url_for,
     send_from_directory,
     session,
-    g,
+    abort,
 )
 
 import logging
@@ -46,22 +49,16 @@ logging.basicConfig(level=logging.DEBUG)
 
 import cynit_theme
 import cynit_layout
-import cert_viewer
-import voica1
-import config_editor
-import dcb_org_export
 import cynit_notify
-import convert_to_ico
-import exe_builder
-import useful_links
-import dcbaas_api
+import cynit_metrics
+import cynit_profiler
+import cynit_registry
 
 from cynit_notify import send_signal_message, SignalError
 
 BASE_DIR = Path(__file__).parent
 SPYT_DIR = BASE_DIR.parent / "SP-YT"
 START_TIME = time.time()
-REQUEST_COUNT = 0
 
 
 # Fallback PIN als er niets in settings.json staat
@@ -217,6 +214,18 @@ reload_config()
 app = Flask(__name__)
 # Secret key voor sessions (PIN onthouden)
 app.secret_key = SETTINGS.get("secret_key", "cynit-dev-key")
+cynit_metrics.init_app(app)  # per-route latency/status/size + in-flight voor /metrics
+# opt-in cProfile per request (settings.json -> profiler); uit = geen hooks
+PROFILER = cynit_profiler.init_app(
+    app,
+    SETTINGS.get("profiler"),
+    page_context=lambda: {
+        "base_css": cynit_layout.common_css(SETTINGS),
+        "common_js": cynit_layout.common_js(),
+        "header": cynit_layout.header_html(SETTINGS, tools=TOOLS, title="Debug profiles", right_html=""),
+        "footer": cynit_layout.footer_html(),
+    },
+)
 
 # ===== HOME-TEMPLATE =====
 
@@ -497,20 +506,26 @@ def _start_gui_tool(tool: Dict[str, Any]) -> None:
 
 # ===== ROUTES =====
 
-@app.before_request
-def _track_request():
-    """Eenvoudige request-teller voor /metrics."""
-    global REQUEST_COUNT
-    REQUEST_COUNT += 1
-    g.request_started = time.time()
-
-@app.route("/restart")
+@app.route("/restart", methods=["GET", "POST"])
 def restart():
     """
-    Wordt aangeroepen door de 'Reload app' knop in de topbar.
-    Herlaadt settings.json en tools.json in geheugen.
+    GET: aangeroepen door de 'Reload app' knop in de topbar.
+    Herlaadt settings.json en tools.json in geheugen (enkel deze worker).
+
+    POST: idem, en onder gunicorn (serve.py) krijgt de master een SIGHUP:
+    alle workers worden graceful vervangen en laden zo dezelfde config.
+    Enkel voor admins (zelfde check als /debug/profiles) en niet cross-site.
     """
+    if request.method == "POST":
+        origin = request.headers.get("Origin")
+        if not PROFILER.is_admin() or (origin and urlsplit(origin).netloc != request.host):
+            abort(403)
+
     reload_config()
+    if TOOL_REGISTRY is not None:
+        TOOL_REGISTRY.configure(TOOLS)
+    if request.method == "POST" and os.environ.get("CYNIT_SERVER") == "gunicorn" and hasattr(signal, "SIGHUP"):
+        os.kill(os.getppid(), signal.SIGHUP)
     return "OK"
 
 @app.route("/health")
@@ -616,8 +631,8 @@ def health_full():
 @app.route("/metrics")
 def metrics():
     """
-    Eenvoudige Prometheus-achtige metrics.
-    Tekst-formaat, zodat bv. Prometheus het kan scrapen.
+    Prometheus metrics (text exposition format 0.0.4).
+    Per-route requests/latency/size komen uit cynit_metrics.
     """
     uptime = time.time() - START_TIME
     lines = [
@@ -627,7 +642,7 @@ def metrics():
         "",
         "# HELP cynit_tools_requests_total Aantal HTTP requests sinds start.",
         "# TYPE cynit_tools_requests_total counter",
-        f"cynit_tools_requests_total {REQUEST_COUNT}",
+        f"cynit_tools_requests_total {cynit_metrics.cluster_total(cynit_metrics.HTTP_REQUESTS):.0f}",
         "",
         "# HELP cynit_tools_tools_loaded Aantal geladen tools uit tools.json.",
         "# TYPE cynit_tools_tools_loaded gauge",
@@ -636,8 +651,13 @@ def metrics():
         "# HELP cynit_tools_dev_mode Dev mode actief (1) of niet (0).",
         "# TYPE cynit_tools_dev_mode gauge",
         f"cynit_tools_dev_mode {1 if DEV_MODE else 0}",
+        "",
     ]
-    body = "\n".join(lines) + "\n"
+    lines += cynit_metrics.REGISTRY.lines()
+    voica1 = TOOL_REGISTRY.module("voica1") if TOOL_REGISTRY is not None else None
+    if voica1 is not None:
+        lines += voica1.metrics_lines()
+    body = "\n".join(lines).rstrip("\n") + "\n"
     return body, 200, {"Content-Type": "text/plain; version=0.0.4"}
 
 @app.route("/signal-test", methods=["GET", "POST"])
@@ -908,86 +928,165 @@ def debug_routes():
     return "\n".join(output)
 
 
-# ===== EXTERNE TOOL-ROUTES REGISTREREN =====
+@app.route("/debug/timings")
+def debug_timings():
+    """
+    Uitgaande calls (DCBaaS, token endpoint, openssl, signal-cli, ...):
+    totalen per dependency + omgeving en de laatste calls, plus import-tijd
+    per tool-module (cynit_registry). ?format=json voor JSON.
+    """
+    summary = cynit_metrics.dependency_summary()
+    recent = cynit_metrics.recent_calls(100)
+    modules = TOOL_REGISTRY.report() if TOOL_REGISTRY is not None else []
+    if request.args.get("format") == "json":
+        return {"summary": summary, "recent": recent, "modules": modules}, 200
 
-def register_external_routes(app: Flask) -> None:
-    print(">>> REGISTERING ROUTES")
+    template = """
+<!doctype html>
+<html lang="nl">
+<head>
+  <meta charset="utf-8">
+  <title>Debug timings</title>
+  <style>
+    {{ base_css|safe }}
+    table.timings { border-collapse: collapse; width: 100%; margin-bottom: 24px; font-size: 0.9rem; }
+    table.timings th, table.timings td { border-bottom: 1px solid #333; padding: 4px 8px; text-align: left; }
+    table.timings td.num { text-align: right; font-family: Consolas, monospace; }
+    .err { color: #fca5a5; }
+  </style>
+  <script>
+    {{ common_js|safe }}
+  </script>
+</head>
+<body>
+  {{ header|safe }}
+  <div class="page">
+    <h1>Uitgaande calls</h1>
+    <p class="muted">Sinds de start van dit proces. Prometheus: <code>cynit_dependency_*</code> op <a href="/metrics">/metrics</a>.</p>
+
+    <table class="timings">
+      <tr><th>Dependency</th><th>Omgeving</th><th>Calls</th><th>Fouten</th><th>Gem. (ms)</th><th>Max (ms)</th><th>Totaal (s)</th><th>Laatste fout</th></tr>
+      {% for r in summary %}
+      <tr>
+        <td>{{ r.dependency }}</td><td>{{ r.env }}</td>
+        <td class="num">{{ r.count }}</td><td class="num">{{ r.errors }}</td>
+        <td class="num">{{ "%.1f"|format(r.avg_s * 1000) }}</td>
+        <td class="num">{{ "%.1f"|format(r.max_s * 1000) }}</td>
+        <td class="num">{{ "%.2f"|format(r.total_s) }}</td>
+        <td class="err">{{ r.last_error or "" }}</td>
+      </tr>
+      {% else %}
+      <tr><td colspan="8" class="muted">Nog geen uitgaande calls.</td></tr>
+      {% endfor %}
+    </table>
+
+    <h2>Laatste calls</h2>
+    <table class="timings">
+      <tr><th>Tijd</th><th>Dependency</th><th>Omgeving</th><th>Duur (ms)</th><th>Verzonden</th><th>Ontvangen</th><th>Fout</th></tr>
+      {% for c in recent %}
+      <tr>
+        <td>{{ fmt_time(c.time) }}</td><td>{{ c.dependency }}</td><td>{{ c.env }}</td>
+        <td class="num">{{ "%.1f"|format(c.duration_s * 1000) }}</td>
+        <td class="num">{{ c.sent if c.sent is not none else "" }}</td>
+        <td class="num">{{ c.received if c.received is not none else "" }}</td>
+        <td class="err">{{ c.error or "" }}</td>
+      </tr>
+      {% endfor %}
+    </table>
+
+    <h2>Tool-modules</h2>
+    <table class="timings">
+      <tr><th>Module</th><th>Status</th><th>Import (ms)</th><th>Routes (ms)</th><th>Fout</th></tr>
+      {% for m in modules %}
+      <tr>
+        <td>{{ m.module }}</td><td>{{ m.status }}</td>
+        <td class="num">{{ m.import_ms if m.import_ms is not none else "" }}</td>
+        <td class="num">{{ m.register_ms if m.register_ms is not none else "" }}</td>
+        <td class="err">{{ m.error or "" }}</td>
+      </tr>
+      {% endfor %}
+    </table>
+  </div>
+  {{ footer|safe }}
+</body>
+</html>
+    """
 
-    try:
-        print(" - Registering CERT VIEWER...")
-        cert_viewer.register_web_routes(app, SETTINGS, TOOLS)
-        print("   OK: cert_viewer routes registered")
-    except Exception as exc:
-        print("   ERROR: cert_viewer.register_web_routes FAILED:")
-        print("   -->", exc)
+    return render_template_string(
+        template,
+        base_css=cynit_layout.common_css(SETTINGS),
+        common_js=cynit_layout.common_js(),
+        header=cynit_layout.header_html(SETTINGS, tools=TOOLS, title="Debug timings", right_html=""),
+        footer=cynit_layout.footer_html(),
+        summary=summary,
+        recent=recent,
+        modules=modules,
+        fmt_time=lambda ts: time.strftime("%H:%M:%S", time.localtime(ts)),
+    )
 
-    print(" - Loading voica1.json...")
+
+# ===== EXTERNE TOOL-ROUTES REGISTREREN =====
+
+def _load_voica_cfg() -> Dict[str, Any]:
     voica_cfg_path = BASE_DIR / "config" / "voica1.json"
     try:
-        voica_cfg = json.loads(voica_cfg_path.read_text(encoding="utf-8"))
-        print("   OK: voica1.json loaded")
+        return json.loads(voica_cfg_path.read_text(encoding="utf-8"))
     except Exception as exc:
         print("   ERROR: Could not load voica1.json:", exc)
-        voica_cfg = {}
+        return {}
 
-    try:
-        print(" - Registering VOICA1...")
-        voica1.register_web_routes(app, SETTINGS, TOOLS, voica_cfg)
-        print("   OK: voica1 routes registered")
-    except Exception as exc:
-        print("   ERROR: voica1.register_web_routes FAILED:", exc)
 
-    try:
-        print(" - Registering CONFIG EDITOR...")
-        config_editor.register_web_routes(app, SETTINGS, TOOLS)
-        print("   OK: config editor registered")
-    except Exception as exc:
-        print("   ERROR: config_editor.register_web_routes FAILED:", exc)
+# module -> registratie van zijn routes (module wordt door cynit_registry geïmporteerd)
+TOOL_LOADERS: Dict[str, cynit_registry.Loader] = {
+    "cert_viewer":    lambda mod, app: mod.register_web_routes(app, SETTINGS, TOOLS),
+    "voica1":         lambda mod, app: mod.register_web_routes(app, SETTINGS, TOOLS, _load_voica_cfg()),
+    "config_editor":  lambda mod, app: mod.register_web_routes(app, SETTINGS, TOOLS),
+    "dcb_org_export": lambda mod, app: mod.register_web_routes(app, SETTINGS, TOOLS),
+    "convert_to_ico": lambda mod, app: mod.register_web_routes(app, SETTINGS, TOOLS),
+    "exe_builder":    lambda mod, app: mod.register_web_routes(app, SETTINGS, TOOLS),
+    "useful_links":   lambda mod, app: mod.register_web_routes(app, SETTINGS, TOOLS),
+    "dcbaas_api":     lambda mod, app: mod.register_web_routes(app, SETTINGS, TOOLS),
+}
 
-    try:
-        print(" - Registering DCBAAS ORG EXPORT...")
-        dcb_org_export.register_web_routes(app, SETTINGS, TOOLS)
-        print("   OK: dcbaas-org-export routes registered")
-    except Exception as exc:
-        print("   ERROR: dcb_org_export.register_web_routes FAILED:")
-        print("   -->", exc)
-    
-    try:
-        print(" - Registering ICO CONVERTER...")
-        convert_to_ico.register_web_routes(app, SETTINGS, TOOLS)
-        print("   OK: ico-converter routes registered")
-    except Exception as exc:
-        print("   ERROR: convert_to_ico.register_web_routes FAILED:")
-        print("   -->", exc)
-        
-    try:
-        print(" - Registering EXE BUILDER...")
-        exe_builder.register_web_routes(app, SETTINGS, TOOLS)
-        print("   OK: exe-builder routes registered")
-    except Exception as exc:
-        print("   ERROR: exe_builder.register_web_routes FAILED:")
-        print("   -->", exc)
-        
-    try:
-        print(" - Registering USEFUL LINKS...")
-        useful_links.register_web_routes(app, SETTINGS, TOOLS)
-        print("   OK: useful-links routes registered")
-    except Exception as exc:
-        print("   ERROR: useful_links.register_web_routes FAILED:")
-        print("   -->", exc)
+# routes zonder card in tools.json
+TOOL_EXTRA_PREFIXES = {"dcb_org_export": ("/dcbaas-org-export",)}
 
-    try:
-        print(" - Registering DCBAAS API...")
-        dcbaas_api.register_web_routes(app, SETTINGS, TOOLS)
-        print("   OK: dcbaas_api routes registered")
-    except Exception as exc:
-        print("   ERROR: dcbaas_api.register_web_routes FAILED:")
-        print("   -->", exc)
+TOOL_REGISTRY: Optional[cynit_registry.LazyToolRegistry] = None
+
+
+def register_external_routes(app: Flask) -> None:
+    global TOOL_REGISTRY
+    TOOL_REGISTRY = cynit_registry.LazyToolRegistry(app, TOOL_LOADERS, TOOL_EXTRA_PREFIXES)
+    TOOL_REGISTRY.configure(TOOLS)
+
+    lazy = bool(SETTINGS.get("lazy_tools", True))
+    print(f">>> REGISTERING ROUTES ({'lazy' if lazy else 'eager'}): {', '.join(TOOL_REGISTRY.enabled())}")
+    if not lazy:
+        TOOL_REGISTRY.load_all()
+    print(f">>> Hub klaar in {(time.perf_counter() - _STARTUP_T0) * 1000:.0f} ms")
+
+
+_ROUTES_REGISTERED = False
+
+def create_app() -> Flask:
+    """
+    WSGI-entrypoint (serve.py, of bv. gunicorn 'ctools:create_app()').
+    Registreert de tool-routes één keer en geeft de app terug.
+    """
+    global _ROUTES_REGISTERED
+    if not _ROUTES_REGISTERED:
+        register_external_routes(app)
+        _ROUTES_REGISTERED = True
+    return app
 
 
 # ===== MAIN =====
 if __name__ == "__main__":
-    register_external_routes(app)
+    # nodig voor voica1 process pool in de PyInstaller EXE (Windows spawn)
+    import multiprocessing
+    multiprocessing.freeze_support()
+
+    create_app()
     # Detecteer of we als PyInstaller EXE draaien of gewoon als script
     is_frozen = getattr(sys, "frozen", False)
     if is_frozen:
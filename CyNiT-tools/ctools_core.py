@@ -4,7 +4,7 @@ ctools_core.py
 
 Core routes van de CyNiT Tools hub:
 
-- before_request: request teller voor /metrics
+- request metrics via cynit_metrics (per route, in-flight)
 - /restart        : reload settings/tools via callback
 - /health         : simpele healthcheck
 - /metrics        : Prometheus-achtige tekst
@@ -29,10 +29,10 @@ from flask import (
     redirect,
     url_for,
     send_from_directory,
-    g,
 )
 
 import cynit_layout
+import cynit_metrics
 
 bp = Blueprint("cynit_core", __name__)
 
@@ -42,7 +42,6 @@ TOOLS: List[Dict[str, Any]] = []
 DEV_MODE: bool = False
 BASE_DIR: Path = Path(".")
 START_TIME: float = time.time()
-REQUEST_COUNT: int = 0
 RELOAD_CALLBACK: Optional[Callable[[], None]] = None
 APP = None  # referentie naar Flask app voor /debug/routes
 
@@ -335,15 +334,6 @@ def _start_gui_tool(tool: Dict[str, Any]) -> None:
         print("[ERROR] Kon GUI-tool niet starten:", exc)
 
 
-# ===== hooks =====
-
-@bp.before_app_request
-def _track_request():
-    global REQUEST_COUNT
-    REQUEST_COUNT += 1
-    g.request_started = time.time()
-
-
 # ====== routes ======
 
 @bp.route("/restart")
@@ -378,7 +368,7 @@ def metrics():
         "",
         "# HELP cynit_tools_requests_total Aantal HTTP requests sinds start.",
         "# TYPE cynit_tools_requests_total counter",
-        f"cynit_tools_requests_total {REQUEST_COUNT}",
+        f"cynit_tools_requests_total {cynit_metrics.cluster_total(cynit_metrics.HTTP_REQUESTS):.0f}",
         "",
         "# HELP cynit_tools_tools_loaded Aantal geladen tools uit tools.json.",
         "# TYPE cynit_tools_tools_loaded gauge",
@@ -387,8 +377,10 @@ def metrics():
         "# HELP cynit_tools_dev_mode Dev mode actief (1) of niet (0).",
         "# TYPE cynit_tools_dev_mode gauge",
         f"cynit_tools_dev_mode {1 if DEV_MODE else 0}",
+        "",
     ]
-    body = "\n".join(lines) + "\n"
+    lines += cynit_metrics.REGISTRY.lines()
+    body = "\n".join(lines).rstrip("\n") + "\n"
     return body, 200, {"Content-Type": "text/plain; version=0.0.4"}
 
 
@@ -475,14 +467,14 @@ def register_core_routes(
     """
     Wordt vanuit ctools.py aangeroepen.
     """
-    global SETTINGS, TOOLS, DEV_MODE, BASE_DIR, START_TIME, REQUEST_COUNT, RELOAD_CALLBACK, APP
+    global SETTINGS, TOOLS, DEV_MODE, BASE_DIR, START_TIME, RELOAD_CALLBACK, APP
     SETTINGS = settings
     TOOLS = tools
     DEV_MODE = dev_mode
     BASE_DIR = base_dir
     START_TIME = time.time()
-    REQUEST_COUNT = 0
     RELOAD_CALLBACK = reload_callback
     APP = app
 
+    cynit_metrics.init_app(app)
     app.register_blueprint(bp)
@@ -0,0 +1,540 @@
+#!/usr/bin/env python3
+"""
+cynit_metrics.py
+
+Kleine, thread-safe metrics-registry voor CyNiT Tools (Prometheus text
+exposition format 0.0.4), zonder extra dependency.
+
+- Counter / Gauge / Histogram, elk met optionele labels
+- REGISTRY.expose() -> tekst voor /metrics
+- init_app(app): per-route request metrics via before/after_request:
+    cynit_http_requests_total{method,endpoint,status}
+    cynit_http_request_duration_seconds{method,endpoint}      (histogram)
+    cynit_http_response_size_bytes{method,endpoint}           (histogram)
+    cynit_http_requests_in_flight                             (gauge)
+
+'endpoint' is de route-regel (bv. /cert/export/<fmt>), niet het ruwe pad,
+zodat het aantal series begrensd blijft; onbekende paden -> "unmatched".
+
+Uitgaande calls (DCBaaS, token endpoint, openssl, signal-cli, ffmpeg) via
+track_dependency(); per dependency + omgeving:
+    cynit_dependency_calls_total{dependency,env,outcome}
+    cynit_dependency_errors_total{dependency,env,error}
+    cynit_dependency_duration_seconds{dependency,env}          (histogram)
+    cynit_dependency_payload_bytes{dependency,env,direction}   (histogram)
+plus een overzicht (dependency_summary / recent_calls) voor /debug/timings.
+
+Met meerdere worker-processen (CYNIT_STATE_DIR gezet, zie cynit_state) schrijft
+elke worker periodiek een snapshot naar <state dir>/metrics/<pid>.json en
+voegt expose() die samen: counters en histogrammen worden opgeteld, gauges
+enkel van workers die nog leven. /debug/timings blijft per worker.
+
+Gebruik:
+    import cynit_metrics
+    cynit_metrics.init_app(app)
+    body = cynit_metrics.REGISTRY.expose()
+
+    with cynit_metrics.track_dependency("dcbaas", env="DEV", sent=len(body)) as call:
+        resp = requests.post(...)
+        call.received = len(resp.content)
+        if resp.status_code >= 400:
+            call.fail(f"http_{resp.status_code}")
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from flask import Flask, g, request
+
+import cynit_state
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DEFAULT_SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _fmt(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+# =========================
+# Metric types
+# =========================
+
+class _Metric:
+    mtype = "untyped"
+
+    def __init__(self, name: str, help_txt: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help_txt
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: labels {sorted(labels)} != {sorted(self.labelnames)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.mtype}"]
+
+    def _copy(self) -> Dict[LabelValues, Any]:
+        with self._lock:
+            return {k: (list(v) if isinstance(v, list) else v) for k, v in self._values.items()}  # type: ignore[attr-defined]
+
+    def dump(self) -> List[List[Any]]:
+        """JSON-vriendelijke snapshot: [[labelwaarden], waarde of histogram-rij]."""
+        return [[list(k), v] for k, v in self._copy().items()]
+
+    def _merged(self, others: Sequence[List[List[Any]]] = ()) -> List[Tuple[LabelValues, Any]]:
+        values = self._copy()
+        for rows in others:
+            for key, value in rows:
+                key = tuple(key)
+                cur = values.get(key)
+                if isinstance(value, list):
+                    if cur is None:
+                        values[key] = list(value)
+                    elif len(cur) == len(value):
+                        values[key] = [a + b for a, b in zip(cur, value)]
+                else:
+                    values[key] = (cur or 0.0) + value
+        return sorted(values.items())
+
+    def samples(self, others: Sequence[List[List[Any]]] = ()) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    mtype = "counter"
+
+    def __init__(self, name: str, help_txt: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help_txt, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def total(self) -> float:
+        with self._lock:
+            return sum(self._values.values())
+
+    def samples(self, others: Sequence[List[List[Any]]] = ()) -> List[str]:
+        items = self._merged(others)
+        return [f"{self.name}{_labels(self.labelnames, k)} {_fmt(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    mtype = "gauge"
+
+    def __init__(self, name: str, help_txt: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help_txt, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        if not self.labelnames:
+            self._values[()] = 0.0
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def samples(self, others: Sequence[List[List[Any]]] = ()) -> List[str]:
+        items = self._merged(others)
+        return [f"{self.name}{_labels(self.labelnames, k)} {_fmt(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    mtype = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_txt: str,
+        labelnames: Sequence[str] = (),
+        buckets: Iterable[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_txt, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets)) + (math.inf,)
+        # per label-set: [counts per bucket (niet cumulatief)..., sum, count]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        idx = next(i for i, b in enumerate(self.buckets) if value <= b)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            row[idx] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def samples(self, others: Sequence[List[List[Any]]] = ()) -> List[str]:
+        items = self._merged(others)
+        out: List[str] = []
+        for key, row in items:
+            cumulative = 0.0
+            for i, bound in enumerate(self.buckets):
+                cumulative += row[i]
+                out.append(f"{self.name}_bucket{_labels(self.labelnames, key, ('le', _fmt(bound)))} {_fmt(cumulative)}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_fmt(row[-2])}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, key)} {_fmt(row[-1])}")
+        return out
+
+
+# =========================
+# Registry
+# =========================
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _add(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} bestaat al met een ander type/labels")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_txt: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help_txt, labelnames))  # type: ignore[return-value]
+
+    def gauge(self, name: str, help_txt: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(name, help_txt, labelnames))  # type: ignore[return-value]
+
+    def histogram(
+        self,
+        name: str,
+        help_txt: str,
+        labelnames: Sequence[str] = (),
+        buckets: Iterable[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._add(Histogram(name, help_txt, labelnames, buckets))  # type: ignore[return-value]
+
+    def dump(self) -> Dict[str, List[List[Any]]]:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {m.name: m.dump() for m in metrics}
+
+    def lines(self, merge_workers: bool = True) -> List[str]:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        peers = peer_snapshots() if merge_workers else []
+        out: List[str] = []
+        for m in metrics:
+            others = [snap[m.name] for alive, snap in peers if m.name in snap and (alive or m.mtype != "gauge")]
+            out += m.header()
+            out += m.samples(others)
+            out.append("")
+        return out
+
+    def expose(self) -> str:
+        return "\n".join(self.lines()).rstrip("\n") + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "cynit_http_requests_total",
+    "HTTP requests per methode, route en statuscode.",
+    ("method", "endpoint", "status"),
+)
+HTTP_LATENCY = REGISTRY.histogram(
+    "cynit_http_request_duration_seconds",
+    "Verwerkingstijd per request (s).",
+    ("method", "endpoint"),
+)
+HTTP_RESPONSE_SIZE = REGISTRY.histogram(
+    "cynit_http_response_size_bytes",
+    "Grootte van de response body (bytes, enkel als gekend).",
+    ("method", "endpoint"),
+    buckets=DEFAULT_SIZE_BUCKETS,
+)
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    "cynit_http_requests_in_flight",
+    "Requests die op dit moment verwerkt worden.",
+)
+
+
+# =========================
+# Flask integratie
+# =========================
+
+def _endpoint_label() -> str:
+    rule = request.url_rule
+    return rule.rule if rule is not None else "unmatched"
+
+
+def init_app(app: Flask) -> None:
+    """Registreert de request-hooks (één keer per app)."""
+    if app.extensions.get("cynit_metrics"):
+        return
+    app.extensions["cynit_metrics"] = True
+
+    @app.before_request
+    def _metrics_start():
+        g.metrics_started = time.perf_counter()
+        g.metrics_in_flight = True
+        HTTP_IN_FLIGHT.inc()
+
+    if cynit_state.is_multiprocess():
+        atexit.register(write_snapshot, True)
+
+    @app.after_request
+    def _metrics_record(response):
+        started = g.pop("metrics_started", None)
+        if started is None:
+            return response
+        endpoint = _endpoint_label()
+        method = request.method
+        HTTP_LATENCY.observe(time.perf_counter() - started, method=method, endpoint=endpoint)
+        HTTP_REQUESTS.inc(method=method, endpoint=endpoint, status=str(response.status_code))
+        size = response.content_length
+        if size is None and not response.is_streamed:
+            size = response.calculate_content_length()
+        if size is not None:
+            HTTP_RESPONSE_SIZE.observe(size, method=method, endpoint=endpoint)
+        return response
+
+    @app.teardown_request
+    def _metrics_done(_exc=None):
+        # teardown loopt altijd, ook als after_request niet bereikt werd
+        if g.pop("metrics_in_flight", False):
+            HTTP_IN_FLIGHT.dec()
+        write_snapshot()
+
+
+# =========================
+# Meerdere worker-processen
+# =========================
+
+SNAPSHOT_INTERVAL = 2.0  # s; max. vertraging van andere workers in /metrics
+
+_snapshot_lock = threading.Lock()
+_last_snapshot = 0.0
+
+
+def _snapshot_dir() -> Optional[Path]:
+    root = cynit_state.state_dir()
+    return root / "metrics" if root is not None else None
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+def write_snapshot(force: bool = False) -> None:
+    """Schrijft de registry van deze worker weg (max. elke SNAPSHOT_INTERVAL s)."""
+    global _last_snapshot
+    folder = _snapshot_dir()
+    if folder is None:
+        return
+    now = time.monotonic()
+    with _snapshot_lock:
+        if not force and now - _last_snapshot < SNAPSHOT_INTERVAL:
+            return
+        _last_snapshot = now
+    cynit_state.ensure_private_dir(folder)
+    cynit_state.atomic_write(folder / f"{os.getpid()}.json", json.dumps(REGISTRY.dump()).encode("utf-8"))
+
+
+def peer_snapshots() -> List[Tuple[bool, Dict[str, List[List[Any]]]]]:
+    """(leeft nog, snapshot) van de andere workers; leeg in single-process modus."""
+    folder = _snapshot_dir()
+    if folder is None or not folder.is_dir():
+        return []
+    out: List[Tuple[bool, Dict[str, List[List[Any]]]]] = []
+    for path in folder.glob("*.json"):
+        try:
+            pid = int(path.stem)
+        except ValueError:
+            continue
+        if pid == os.getpid():
+            continue
+        try:
+            out.append((_pid_alive(pid), json.loads(path.read_text(encoding="utf-8"))))
+        except (OSError, ValueError):
+            continue
+    return out
+
+
+def cluster_total(counter: Counter) -> float:
+    """Counter-totaal over alle workers."""
+    total = counter.total()
+    for _alive, snap in peer_snapshots():
+        total += sum(v for _k, v in snap.get(counter.name, []))
+    return total
+
+
+# =========================
+# Uitgaande dependencies
+# =========================
+
+DEP_CALLS = REGISTRY.counter(
+    "cynit_dependency_calls_total",
+    "Uitgaande calls per dependency, omgeving en uitkomst (ok/error).",
+    ("dependency", "env", "outcome"),
+)
+DEP_ERRORS = REGISTRY.counter(
+    "cynit_dependency_errors_total",
+    "Mislukte uitgaande calls per fouttype (exception-klasse, http_<code>, exit_<code>).",
+    ("dependency", "env", "error"),
+)
+DEP_LATENCY = REGISTRY.histogram(
+    "cynit_dependency_duration_seconds",
+    "Duur van uitgaande calls (s).",
+    ("dependency", "env"),
+    buckets=DEFAULT_LATENCY_BUCKETS + (60.0, 300.0),
+)
+DEP_PAYLOAD = REGISTRY.histogram(
+    "cynit_dependency_payload_bytes",
+    "Payload van uitgaande calls (bytes; direction=sent/received).",
+    ("dependency", "env", "direction"),
+    buckets=DEFAULT_SIZE_BUCKETS,
+)
+
+RECENT_CALLS = 200
+
+_dep_lock = threading.Lock()
+_dep_recent: Deque[Dict[str, Any]] = deque(maxlen=RECENT_CALLS)
+_dep_summary: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+
+class DependencyCall:
+    """Handle binnen track_dependency(): payload-groottes en niet-exception fouten."""
+
+    def __init__(self, dependency: str, env: str, sent: Optional[int] = None) -> None:
+        self.dependency = dependency
+        self.env = env
+        self.sent = sent
+        self.received: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def fail(self, error: str) -> None:
+        """Markeer de call als mislukt zonder exception (bv. http_500, exit_1)."""
+        self.error = error
+
+
+def _record_dependency(call: DependencyCall, elapsed: float) -> None:
+    labels = {"dependency": call.dependency, "env": call.env}
+    DEP_LATENCY.observe(elapsed, **labels)
+    DEP_CALLS.inc(outcome="error" if call.error else "ok", **labels)
+    if call.error:
+        DEP_ERRORS.inc(error=call.error, **labels)
+    if call.sent is not None:
+        DEP_PAYLOAD.observe(call.sent, direction="sent", **labels)
+    if call.received is not None:
+        DEP_PAYLOAD.observe(call.received, direction="received", **labels)
+
+    with _dep_lock:
+        _dep_recent.append({
+            "time": time.time(),
+            "dependency": call.dependency,
+            "env": call.env,
+            "duration_s": elapsed,
+            "error": call.error,
+            "sent": call.sent,
+            "received": call.received,
+        })
+        agg = _dep_summary.setdefault((call.dependency, call.env), {
+            "dependency": call.dependency,
+            "env": call.env,
+            "count": 0,
+            "errors": 0,
+            "total_s": 0.0,
+            "max_s": 0.0,
+            "last_error": None,
+        })
+        agg["count"] += 1
+        agg["total_s"] += elapsed
+        agg["max_s"] = max(agg["max_s"], elapsed)
+        if call.error:
+            agg["errors"] += 1
+            agg["last_error"] = call.error
+
+
+@contextmanager
+def track_dependency(dependency: str, env: Optional[str] = None, sent: Optional[int] = None) -> Iterator[DependencyCall]:
+    """Meet één uitgaande call; een exception telt als fout (type = klassenaam) en wordt doorgegeven."""
+    call = DependencyCall(dependency, (env or "-").strip() or "-", sent)
+    t0 = time.perf_counter()
+    try:
+        yield call
+    except BaseException as exc:
+        if call.error is None:
+            call.error = type(exc).__name__
+        raise
+    finally:
+        _record_dependency(call, time.perf_counter() - t0)
+
+
+def record_http_response(call: DependencyCall, resp: Any) -> None:
+    """Vul payload-groottes en http-fout in vanuit een requests.Response."""
+    body = getattr(getattr(resp, "request", None), "body", None)
+    if body is not None:
+        call.sent = len(body.encode("utf-8") if isinstance(body, str) else body)
+    call.received = len(resp.content or b"")
+    if resp.status_code >= 400:
+        call.fail(f"http_{resp.status_code}")
+
+
+def dependency_summary() -> List[Dict[str, Any]]:
+    """Per (dependency, env): count, errors, gemiddelde en max duur."""
+    with _dep_lock:
+        rows = [dict(v) for v in _dep_summary.values()]
+    for r in rows:
+        r["avg_s"] = r["total_s"] / r["count"] if r["count"] else 0.0
+    return sorted(rows, key=lambda r: r["total_s"], reverse=True)
+
+
+def recent_calls(limit: int = 50) -> List[Dict[str, Any]]:
+    with _dep_lock:
+        rows = list(_dep_recent)[-limit:]
+    return list(reversed(rows))
@@ -24,6 +24,8 @@ import subprocess
 from pathlib import Path
 from typing import Iterable, List, Dict, Any, Optional
 
+import cynit_metrics
+
 
 BASE_DIR = Path(__file__).resolve().parent
 CONFIG_DIR = BASE_DIR / "config"
@@ -152,12 +154,15 @@ def send_signal_message(
     cmd.extend(recips)
 
     try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=timeout_sec,
-        )
+        with cynit_metrics.track_dependency("signal-cli", sent=len(message.encode("utf-8"))) as call:
+            result = subprocess.run(
+                cmd,
+                capture_output=True,
+                text=True,
+                timeout=timeout_sec,
+            )
+            if result.returncode != 0:
+                call.fail(f"exit_{result.returncode}")
     except subprocess.TimeoutExpired as exc:
         raise SignalError(f"signal-cli timeout na {timeout_sec}s: {exc}") from exc
     except Exception as exc:
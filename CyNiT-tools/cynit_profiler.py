@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+cynit_profiler.py
+
+Opt-in request profiler voor de CyNiT Tools hub (cProfile).
+
+Config (config/settings.json, optioneel):
+
+    "profiler": {
+      "enabled": false,      // false = geen hooks geregistreerd (nul overhead)
+      "sample_rate": 0.0,    // 0.0 - 1.0: fractie van requests automatisch profileren
+      "top_n": 30,           // aantal functies per profiel
+      "keep": 50,            // ringbuffer: aantal bewaarde profielen
+      "token": ""            // admin-token; leeg = enkel requests vanaf localhost
+    }
+
+Per request profileren: header "X-Profile: 1" of query "?_profile=1", enkel
+voor admins (X-Profile-Token / ?profile_token=... gelijk aan token, of env
+CYNIT_PROFILER_TOKEN; zonder token enkel vanaf 127.0.0.1/::1 en niet via een
+reverse proxy: requests met X-Forwarded-For/Forwarded/X-Real-IP vragen altijd
+het token).
+Het profiel-id komt terug in de response header X-Profile-Id.
+
+/debug/profiles         : lijst (admin)
+/debug/profiles/<id>    : top-N functies (cumulatief + eigen tijd), ?format=json
+"""
+
+from __future__ import annotations
+
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from flask import Flask, abort, g, render_template_string, request
+
+TOKEN_ENV = "CYNIT_PROFILER_TOKEN"
+LOOPBACK = ("127.0.0.1", "::1")
+# achter een reverse proxy komt alles van loopback: dan telt enkel het token
+PROXY_HEADERS = ("X-Forwarded-For", "Forwarded", "X-Real-IP")
+
+DEFAULTS: Dict[str, Any] = {
+    "enabled": False,
+    "sample_rate": 0.0,
+    "top_n": 30,
+    "keep": 50,
+    "token": "",
+}
+
+
+class RequestProfiler:
+    def __init__(self, cfg: Optional[Dict[str, Any]] = None) -> None:
+        cfg = {**DEFAULTS, **(cfg or {})}
+        self.enabled = bool(cfg.get("enabled"))
+        self.sample_rate = min(1.0, max(0.0, float(cfg.get("sample_rate") or 0.0)))
+        self.top_n = max(5, int(cfg.get("top_n") or 30))
+        self.token = str(cfg.get("token") or os.environ.get(TOKEN_ENV) or "")
+        self.profiles: Deque[Dict[str, Any]] = deque(maxlen=max(1, int(cfg.get("keep") or 50)))
+        self._lock = threading.Lock()
+        # cProfile (sys.setprofile / sys.monitoring) kan maar één profiel tegelijk actief hebben
+        self._active = threading.Lock()
+
+    # ---------- autorisatie ----------
+
+    def is_admin(self) -> bool:
+        if self.token:
+            given = request.headers.get("X-Profile-Token") or request.args.get("profile_token") or ""
+            return hmac.compare_digest(given.encode("utf-8"), self.token.encode("utf-8"))
+        if any(h in request.headers for h in PROXY_HEADERS):
+            return False
+        return request.remote_addr in LOOPBACK
+
+    def _wanted(self) -> Optional[str]:
+        flag = request.headers.get("X-Profile") == "1" or request.args.get("_profile") == "1"
+        if flag and self.is_admin():
+            return "flag"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sample"
+        return None
+
+    # ---------- hooks ----------
+
+    def start(self) -> None:
+        if request.path.startswith("/debug/profiles"):
+            return
+        reason = self._wanted()
+        if reason is None or not self._active.acquire(blocking=False):
+            return
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+        except ValueError:
+            # ander profiling-tool actief (bv. debugger)
+            self._active.release()
+            return
+        g.profiler = (prof, reason, time.perf_counter())
+
+    def stop(self, response):
+        state = g.pop("profiler", None)
+        if state is None:
+            return response
+        prof, reason, started = state
+        prof.disable()
+        self._active.release()
+        entry = self._store(prof, reason, time.perf_counter() - started, response.status_code)
+        response.headers["X-Profile-Id"] = entry["id"]
+        return response
+
+    def abort_profile(self, _exc=None) -> None:
+        # request zonder after_request (bv. exception in een andere hook)
+        state = g.pop("profiler", None)
+        if state is not None:
+            state[0].disable()
+            self._active.release()
+
+    # ---------- opslag ----------
+
+    def _rows(self, stats: pstats.Stats, sort: str) -> List[Dict[str, Any]]:
+        stats.sort_stats(sort)
+        rows: List[Dict[str, Any]] = []
+        for func in stats.fcn_list[: self.top_n]:  # type: ignore[attr-defined]
+            cc, nc, tt, ct, _callers = stats.stats[func]  # type: ignore[attr-defined]
+            filename, line, name = func
+            rows.append({
+                "function": f"{name} ({os.path.basename(filename)}:{line})" if line else name,
+                "ncalls": nc,
+                "primcalls": cc,
+                "tottime_ms": round(tt * 1000, 3),
+                "cumtime_ms": round(ct * 1000, 3),
+            })
+        return rows
+
+    def _store(self, prof: cProfile.Profile, reason: str, elapsed: float, status: int) -> Dict[str, Any]:
+        stats = pstats.Stats(prof, stream=io.StringIO())
+        entry = {
+            "id": uuid.uuid4().hex[:12],
+            "time": time.time(),
+            "method": request.method,
+            "path": request.full_path.rstrip("?"),
+            "endpoint": request.url_rule.rule if request.url_rule is not None else None,
+            "status": status,
+            "reason": reason,
+            "duration_ms": round(elapsed * 1000, 2),
+            "total_calls": stats.total_calls,  # type: ignore[attr-defined]
+            "cumulative": self._rows(stats, "cumulative"),
+            "tottime": self._rows(stats, "tottime"),
+        }
+        with self._lock:
+            self.profiles.append(entry)
+        return entry
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            items = list(self.profiles)
+        return [
+            {k: v for k, v in e.items() if k not in ("cumulative", "tottime")}
+            for e in reversed(items)
+        ]
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return next((e for e in self.profiles if e["id"] == profile_id), None)
+
+
+PROFILES_TEMPLATE = """
+<!doctype html>
+<html lang="nl">
+<head>
+  <meta charset="utf-8">
+  <title>Debug profiles</title>
+  <style>
+    {{ base_css|safe }}
+    table.prof { border-collapse: collapse; width: 100%; margin-bottom: 24px; font-size: 0.9rem; }
+    table.prof th, table.prof td { border-bottom: 1px solid #333; padding: 4px 8px; text-align: left; }
+    table.prof td.num { text-align: right; font-family: Consolas, monospace; }
+    table.prof td.fn { font-family: Consolas, monospace; }
+  </style>
+  <script>
+    {{ common_js|safe }}
+  </script>
+</head>
+<body>
+  {{ header|safe }}
+  <div class="page">
+  {% if entry %}
+    <h1>Profiel {{ entry.id }}</h1>
+    <p class="muted">
+      {{ entry.method }} {{ entry.path }} → {{ entry.status }} in {{ entry.duration_ms }} ms
+      ({{ entry.reason }}, {{ entry.total_calls }} calls) · <a href="{{ list_url }}">alle profielen</a>
+    </p>
+    {% for title, rows in [("Cumulatieve tijd", entry.cumulative), ("Eigen tijd", entry.tottime)] %}
+    <h2>{{ title }}</h2>
+    <table class="prof">
+      <tr><th>Functie</th><th>Calls</th><th>Eigen (ms)</th><th>Cumulatief (ms)</th></tr>
+      {% for r in rows %}
+      <tr>
+        <td class="fn">{{ r.function }}</td><td class="num">{{ r.ncalls }}</td>
+        <td class="num">{{ r.tottime_ms }}</td><td class="num">{{ r.cumtime_ms }}</td>
+      </tr>
+      {% endfor %}
+    </table>
+    {% endfor %}
+  {% else %}
+    <h1>Request profielen</h1>
+    {% if not enabled %}
+      <p class="muted">Profiler staat uit. Zet <code>profiler.enabled</code> in config/settings.json en herstart.</p>
+    {% else %}
+      <p class="muted">
+        Profileer een request met header <code>X-Profile: 1</code> of <code>?_profile=1</code>;
+        sample rate: {{ sample_rate }}.
+      </p>
+    {% endif %}
+    <table class="prof">
+      <tr><th>Tijd</th><th>Request</th><th>Status</th><th>Duur (ms)</th><th>Reden</th><th></th></tr>
+      {% for e in profiles %}
+      <tr>
+        <td>{{ fmt_time(e.time) }}</td><td>{{ e.method }} {{ e.path }}</td>
+        <td class="num">{{ e.status }}</td><td class="num">{{ e.duration_ms }}</td>
+        <td>{{ e.reason }}</td><td><a href="{{ detail_url(e.id) }}">details</a></td>
+      </tr>
+      {% else %}
+      <tr><td colspan="6" class="muted">Nog geen profielen.</td></tr>
+      {% endfor %}
+    </table>
+  {% endif %}
+  </div>
+  {{ footer|safe }}
+</body>
+</html>
+"""
+
+
+def init_app(app: Flask, cfg: Optional[Dict[str, Any]] = None, page_context=None) -> RequestProfiler:
+    """
+    Registreert /debug/profiles en, enkel als enabled, de request-hooks.
+    page_context() -> dict met base_css/common_js/header/footer voor de pagina.
+    """
+    profiler = RequestProfiler(cfg)
+    app.extensions["cynit_profiler"] = profiler
+
+    if profiler.enabled:
+        app.before_request(profiler.start)
+        app.after_request(profiler.stop)
+        app.teardown_request(profiler.abort_profile)
+
+    def _token_qs() -> str:
+        tok = request.args.get("profile_token")
+        return f"?profile_token={tok}" if tok else ""
+
+    @app.route("/debug/profiles")
+    @app.route("/debug/profiles/<profile_id>")
+    def debug_profiles(profile_id: Optional[str] = None):
+        if not profiler.is_admin():
+            abort(403)
+        entry = None
+        if profile_id is not None:
+            entry = profiler.get(profile_id)
+            if entry is None:
+                abort(404)
+        if request.args.get("format") == "json":
+            return (entry if entry is not None else {"enabled": profiler.enabled, "profiles": profiler.list()}), 200
+
+        ctx = page_context() if page_context else {}
+        return render_template_string(
+            PROFILES_TEMPLATE,
+            base_css=ctx.get("base_css", ""),
+            common_js=ctx.get("common_js", ""),
+            header=ctx.get("header", ""),
+            footer=ctx.get("footer", ""),
+            entry=entry,
+            profiles=profiler.list(),
+            enabled=profiler.enabled,
+            sample_rate=profiler.sample_rate,
+            list_url="/debug/profiles" + _token_qs(),
+            detail_url=lambda pid: f"/debug/profiles/{pid}{_token_qs()}",
+            fmt_time=lambda ts: time.strftime("%H:%M:%S", time.localtime(ts)),
+        )
+
+    return profiler
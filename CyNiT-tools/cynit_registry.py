@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+cynit_registry.py
+
+Lazy tool registry voor de CyNiT Tools hub.
+
+In plaats van alle tool-modules (cert_viewer, voica1, dcbaas_api, ...) bij
+het starten te importeren - en daarmee openpyxl, cryptography, jwt,
+jwcrypto, requests, PIL, tkinter - laadt de hub een module pas bij het
+eerste request op één van zijn web_paths:
+
+- welke modules in aanmerking komen volgt uit TOOLS (tools.json na
+  hidden/installer_config filtering): script -> module, web_path -> prefix
+- bij startup krijgt elke prefix stub-routes (prefix, prefix/ en
+  prefix/<path>); de stub importeert de module bij het eerste request,
+  registreert zijn routes en dispatcht meteen naar de echte route
+- routes worden nooit op de draaiende app geregistreerd: de module
+  registreert in een staging-app, daarna wordt een nieuwe url_map gebouwd
+  en in één toewijzing geplaatst (copy-on-write); requests die al aan het
+  matchen zijn houden hun oude map. Enkel routes en blueprints worden
+  overgenomen; hooks/error handlers van een lazy tool worden geweigerd
+- import- en registratietijd per module wordt gelogd en is op te vragen via
+  report() (/debug/timings)
+
+Gebruik:
+
+    registry = cynit_registry.LazyToolRegistry(app, loaders={
+        "cert_viewer": lambda mod, app: mod.register_web_routes(app, SETTINGS, TOOLS),
+    }, extra_prefixes={"dcb_org_export": ("/dcbaas-org-export",)})
+    registry.configure(TOOLS)
+    registry.load_all()        # optioneel: eager (settings.json -> "lazy_tools": false)
+"""
+
+from __future__ import annotations
+
+import importlib
+import threading
+import time
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from flask import Flask, abort, current_app, request
+from flask.globals import request_ctx
+from werkzeug.routing import Rule
+
+Loader = Callable[[ModuleType, Flask], None]
+
+# Modules die de hub lazy kan laden. PyInstaller ziet importlib-imports niet:
+# exe_builder geeft deze lijst mee als --hidden-import.
+TOOL_MODULES: Tuple[str, ...] = (
+    "cert_viewer",
+    "config_editor",
+    "convert_to_ico",
+    "dcb_org_export",
+    "dcbaas_api",
+    "exe_builder",
+    "useful_links",
+    "voica1",
+)
+
+STUB_ENDPOINT = "cynit_lazy:"  # geen punt: request.blueprint blijft None
+
+# registries die Flask per blueprint/app bijhoudt; een lazy tool mag ze niet vullen
+_HOOK_ATTRS = (
+    "before_request_funcs",
+    "after_request_funcs",
+    "teardown_request_funcs",
+    "url_value_preprocessors",
+    "url_default_functions",
+    "template_context_processors",
+    "error_handler_spec",
+)
+
+
+def _hooks(app: Flask) -> List[Any]:
+    found: List[Any] = []
+    for attr in _HOOK_ATTRS:
+        for value in getattr(app, attr).values():
+            if attr == "error_handler_spec":  # {code: {exc_class: handler}}
+                found += [f for by_exc in value.values() for f in by_exc.values()]
+            else:
+                found += list(value)
+    return found
+
+
+def _copy_rule(rule: Rule) -> Rule:
+    """Ongebonden kopie van een rule (een Rule hoort bij precies één Map)."""
+    new = rule.empty()
+    if hasattr(rule, "provide_automatic_options"):
+        new.provide_automatic_options = rule.provide_automatic_options
+    return new
+
+
+class LazyToolRegistry:
+    def __init__(
+        self,
+        app: Flask,
+        loaders: Dict[str, Loader],
+        extra_prefixes: Optional[Dict[str, Sequence[str]]] = None,
+    ) -> None:
+        self.app = app
+        self.loaders = dict(loaders)
+        self.extra_prefixes = {k: tuple(v) for k, v in (extra_prefixes or {}).items()}
+        self._prefixes: List[Tuple[str, str]] = []   # (prefix, module), langste eerst
+        self._modules: Dict[str, ModuleType] = {}
+        self._timings: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+        app.extensions["cynit_registry"] = self
+
+    # ---------- config ----------
+
+    def configure(self, tools: Iterable[Dict[str, Any]]) -> None:
+        """Bepaal prefix -> module uit de (gefilterde) tools-lijst en zet de stubs."""
+        pairs: List[Tuple[str, str]] = []
+        for t in tools:
+            script = t.get("script") or ""
+            web_path = (t.get("web_path") or "").rstrip("/")
+            name = Path(script).stem
+            if web_path and name in self.loaders:
+                pairs.append((web_path, name))
+        for name, prefixes in self.extra_prefixes.items():
+            pairs += [(p.rstrip("/"), name) for p in prefixes if name in self.loaders]
+        with self._lock:
+            self._prefixes = sorted(set(pairs), key=lambda p: len(p[0]), reverse=True)
+            self._install_stubs()
+
+    def enabled(self) -> List[str]:
+        with self._lock:
+            return sorted({name for _p, name in self._prefixes})
+
+    def module(self, name: str) -> Optional[ModuleType]:
+        """Geladen module of None (zonder te importeren)."""
+        return self._modules.get(name)
+
+    # ---------- url_map (copy-on-write) ----------
+
+    def _swap_rules(self, drop: Callable[[Rule], bool], add: List[Rule]) -> None:
+        """
+        Nieuwe url_map = huidige regels (min drop) + add, in één toewijzing.
+        Elk request bindt zijn eigen adapter aan de map van dat moment, dus
+        concurrent matchen ziet altijd een volledige, ongewijzigde map.
+        """
+        old = self.app.url_map
+        rules = [_copy_rule(r) for r in old.iter_rules() if not drop(r)]
+        self.app.url_map = type(old)(
+            rules + [_copy_rule(r) for r in add],
+            default_subdomain=old.default_subdomain,
+            strict_slashes=old.strict_slashes,
+            merge_slashes=old.merge_slashes,
+            redirect_defaults=old.redirect_defaults,
+            converters=old.converters,
+            sort_parameters=old.sort_parameters,
+            sort_key=old.sort_key,
+            host_matching=old.host_matching,
+        )
+
+    def _install_stubs(self) -> None:
+        stubs: List[Rule] = []
+        for prefix, name in self._prefixes:
+            if name in self._modules:
+                continue
+            endpoint = STUB_ENDPOINT + name
+            self.app.view_functions[endpoint] = self._stub_view(name)
+            for path in (prefix, prefix + "/", prefix + "/<path:_rest>"):
+                rule = self.app.url_rule_class(path, endpoint=endpoint)
+                rule.provide_automatic_options = False
+                stubs.append(rule)
+        self._swap_rules(lambda r: r.endpoint.startswith(STUB_ENDPOINT), stubs)
+
+    def _stub_view(self, name: str) -> Callable[..., Any]:
+        def view(**_kwargs: Any) -> Any:
+            if self.load(name) is None:
+                return f"Tool '{name}' kon niet geladen worden (zie /debug/timings).", 503
+            # opnieuw matchen tegen de nieuwe map; NotFound/RequestRedirect
+            # gaan gewoon via Flask's foutafhandeling
+            adapter = current_app.create_url_adapter(request)
+            rule, args = adapter.match(return_rule=True)
+            if rule.endpoint.startswith(STUB_ENDPOINT):
+                abort(404)
+            request_ctx.url_adapter = adapter  # url_for kent de nieuwe routes
+            request.url_rule, request.view_args = rule, args
+            if request.method == "OPTIONS" and getattr(rule, "provide_automatic_options", False):
+                return current_app.make_default_options_response()
+            return current_app.ensure_sync(current_app.view_functions[rule.endpoint])(**args)
+
+        view.__name__ = f"lazy_{name}"
+        return view
+
+    # ---------- laden ----------
+
+    def _register(self, name: str, mod: ModuleType) -> None:
+        """Module registreert in een staging-app; routes + blueprints gaan naar de hub."""
+        staging = Flask(self.app.import_name, root_path=self.app.root_path, static_folder=None)
+        staging.config.update(self.app.config)
+        staging.url_map.converters.update(self.app.url_map.converters)
+        defaults = _hooks(staging)  # bv. Flask's standaard context processor (ook per blueprint)
+        self.loaders[name](mod, staging)
+        if any(f not in defaults for f in _hooks(staging)):
+            raise RuntimeError(f"{name} registreert hooks of error handlers; de hub neemt enkel routes en blueprints over")
+
+        for endpoint, func in staging.view_functions.items():
+            current = self.app.view_functions.get(endpoint)
+            if current is not None and current is not func:
+                raise RuntimeError(f"endpoint {endpoint!r} bestaat al in de hub")
+        for bp_name in staging.blueprints:
+            if bp_name in self.app.blueprints:
+                raise RuntimeError(f"blueprint {bp_name!r} bestaat al in de hub")
+
+        # eerst views/blueprints, dan pas de map: een rule wijst nooit naar een ontbrekende view
+        self.app.view_functions.update(staging.view_functions)
+        self.app.blueprints.update(staging.blueprints)
+        stub = STUB_ENDPOINT + name
+        self._swap_rules(lambda r: r.endpoint == stub, list(staging.url_map.iter_rules()))
+
+    def load(self, name: str) -> Optional[ModuleType]:
+        """Importeert en registreert één module (één keer); None bij fout."""
+        mod = self._modules.get(name)
+        if mod is not None:
+            return mod
+        with self._lock:
+            if name in self._modules:
+                return self._modules[name]
+            if name in self._timings:  # eerder gefaald: niet bij elk request opnieuw
+                return None
+            t0 = time.perf_counter()
+            try:
+                mod = importlib.import_module(name)
+                t1 = time.perf_counter()
+                self._register(name, mod)
+            except Exception as exc:
+                self._timings[name] = {"module": name, "ok": False, "error": str(exc),
+                                       "import_ms": round((time.perf_counter() - t0) * 1000, 1), "register_ms": 0.0}
+                print(f"   ERROR: {name} laden/registreren FAILED:")
+                print("   -->", exc)
+                return None
+            t2 = time.perf_counter()
+            self._timings[name] = {
+                "module": name,
+                "ok": True,
+                "error": None,
+                "import_ms": round((t1 - t0) * 1000, 1),
+                "register_ms": round((t2 - t1) * 1000, 1),
+            }
+            self._modules[name] = mod
+            print(f" - {name}: import {self._timings[name]['import_ms']} ms, "
+                  f"routes {self._timings[name]['register_ms']} ms")
+            return mod
+
+    def load_all(self) -> None:
+        for name in self.enabled():
+            self.load(name)
+
+    # ---------- rapport ----------
+
+    def report(self) -> List[Dict[str, Any]]:
+        """Per module: status (lazy/geladen/fout), import- en registratietijd."""
+        rows: List[Dict[str, Any]] = []
+        for name in sorted(set(self.enabled()) | set(self._timings)):
+            t = self._timings.get(name)
+            rows.append({
+                "module": name,
+                "status": "lazy" if t is None else ("geladen" if t["ok"] else "fout"),
+                "import_ms": t["import_ms"] if t else None,
+                "register_ms": t["register_ms"] if t else None,
+                "error": t["error"] if t else None,
+            })
+        return rows
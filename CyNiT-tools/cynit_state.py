@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+cynit_state.py
+
+Gedeelde, worker-safe state voor de CyNiT Tools hub.
+
+Met één proces (dev-server, waitress, gunicorn met 1 worker) leeft alles in
+geheugen, beschermd met een lock. Draait de hub met meerdere worker-processen
+(serve.py --workers N), dan zet de launcher CYNIT_STATE_DIR en gaat dezelfde
+API via JSON-bestanden in die map, met een file lock per naam; zo ziet elke
+worker dezelfde tokens, laatste resultaten, voortgang en downloads.
+
+    STATE = cynit_state.shared_dict("dcbaas_api", {"tokens": {}, "last_resp": None})
+    STATE["last_resp"] = {...}
+    token = STATE["tokens"].get(env_id)
+    STATE.update_key("tokens", lambda t: {**t, env_id: token})
+    with STATE.edit() as data:
+        data["done"] += 1
+
+    ZIPS = cynit_state.blob_store("voica1_zips", keep=20)
+    ZIPS.put(token, name, data); ZIPS.get(token) -> (name, data) | None
+
+Waarden in shared_dict moeten JSON-serialiseerbaar zijn.
+
+De map bevat geheimen (DCBaaS bearer tokens, voica1 ZIPs met private keys):
+mappen worden 0700 en bestanden 0600 aangemaakt, en serve.py maakt de map
+bij elke start leeg (reset_state_dir).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+try:
+    import fcntl  # POSIX; multi-process (gunicorn) draait enkel daar
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+
+STATE_DIR_ENV = "CYNIT_STATE_DIR"
+MARKER_NAME = ".cynit-state"  # enkel mappen met deze marker worden leeggemaakt
+
+_NAME_RE = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+def state_dir() -> Optional[Path]:
+    """Map voor gedeelde state, of None (= alles in geheugen)."""
+    value = os.environ.get(STATE_DIR_ENV, "").strip()
+    return Path(value) if value else None
+
+
+def is_multiprocess() -> bool:
+    return state_dir() is not None
+
+
+def ensure_private_dir(path: Path) -> Path:
+    """Map aanmaken met 0700 (ook als ze al bestond met ruimere rechten)."""
+    path.mkdir(mode=0o700, parents=True, exist_ok=True)
+    if os.name != "nt":
+        os.chmod(path, 0o700)
+    return path
+
+
+def reset_state_dir(root: Path) -> None:
+    """Maakt de state-map leeg (tokens, blobs, snapshots) en zet de rechten op 0700."""
+    if root.is_dir() and any(root.iterdir()) and not (root / MARKER_NAME).exists():
+        raise SystemExit(f"{root} is geen CyNiT state-map (marker {MARKER_NAME} ontbreekt); kies een lege map.")
+    ensure_private_dir(root)
+    for child in root.iterdir():
+        if child.name == MARKER_NAME:
+            continue
+        if child.is_dir() and not child.is_symlink():
+            shutil.rmtree(child, ignore_errors=True)
+        else:
+            try:
+                child.unlink()
+            except OSError:
+                pass
+    (root / MARKER_NAME).touch(mode=0o600)
+
+
+def _open_private(path: Path, flags: int):
+    return os.fdopen(os.open(str(path), flags, 0o600), "r+b" if flags & os.O_RDWR else "wb")
+
+
+@contextmanager
+def _file_lock(path: Path) -> Iterator[None]:
+    with _open_private(path, os.O_RDWR | os.O_CREAT) as fh:
+        if fcntl is not None:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+
+def atomic_write(path: Path, data: bytes) -> None:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with _open_private(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC) as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+
+
+# =========================
+# Key/value
+# =========================
+
+class SharedDict:
+    def __init__(self, name: str, defaults: Optional[Dict[str, Any]] = None, root: Optional[Path] = None) -> None:
+        self.name = _NAME_RE.sub("_", name)
+        self.defaults = dict(defaults or {})
+        self._lock = threading.RLock()
+        self._root = root
+        self._mem: Dict[str, Any] = json.loads(json.dumps(self.defaults)) if root is None else {}
+        if root is not None:
+            ensure_private_dir(root)
+            self._path = root / f"{self.name}.json"
+            self._lock_path = root / f"{self.name}.lock"
+
+    # ---------- backend ----------
+
+    def _read(self) -> Dict[str, Any]:
+        data = json.loads(json.dumps(self.defaults))
+        try:
+            data.update(json.loads(self._path.read_text(encoding="utf-8")))
+        except (FileNotFoundError, ValueError):
+            pass
+        return data
+
+    # ---------- API ----------
+
+    @contextmanager
+    def edit(self) -> Iterator[Dict[str, Any]]:
+        """Read-modify-write onder lock; wijzigingen worden bij het verlaten bewaard."""
+        with self._lock:
+            if self._root is None:
+                yield self._mem
+                return
+            with _file_lock(self._lock_path):
+                data = self._read()
+                yield data
+                atomic_write(self._path, json.dumps(data, default=str).encode("utf-8"))
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            if self._root is None:
+                return dict(self._mem)
+            return self._read()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.snapshot().get(key, default)
+
+    def __getitem__(self, key: str) -> Any:
+        return self.snapshot()[key]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        with self.edit() as data:
+            data[key] = value
+
+    def update(self, values: Dict[str, Any]) -> None:
+        with self.edit() as data:
+            data.update(values)
+
+    def update_key(self, key: str, fn: Callable[[Any], Any]) -> Any:
+        """Atomaire read-modify-write van één key; geeft de nieuwe waarde terug."""
+        with self.edit() as data:
+            data[key] = fn(data.get(key, self.defaults.get(key)))
+            return data[key]
+
+
+# =========================
+# Blobs (bv. ZIP-downloads)
+# =========================
+
+class BlobStore:
+    def __init__(self, name: str, keep: int = 20, root: Optional[Path] = None) -> None:
+        self.name = _NAME_RE.sub("_", name)
+        self.keep = max(1, int(keep))
+        self._lock = threading.Lock()
+        self._mem: "OrderedDict[str, Tuple[str, bytes]]" = OrderedDict()
+        self._dir = root / self.name if root is not None else None
+        if self._dir is not None:
+            ensure_private_dir(self._dir)
+
+    def _safe(self, token: str) -> str:
+        return _NAME_RE.sub("_", token)
+
+    def put(self, token: str, name: str, data: bytes) -> None:
+        with self._lock:
+            if self._dir is None:
+                self._mem[token] = (name, data)
+                while len(self._mem) > self.keep:
+                    self._mem.popitem(last=False)
+                return
+            base = self._dir / self._safe(token)
+            atomic_write(base.with_suffix(".bin"), data)
+            atomic_write(base.with_suffix(".json"), json.dumps({"name": name, "created": time.time()}).encode("utf-8"))
+            metas = sorted(self._dir.glob("*.json"), key=lambda p: p.stat().st_mtime)
+            for old in metas[: max(0, len(metas) - self.keep)]:
+                for p in (old, old.with_suffix(".bin")):
+                    try:
+                        p.unlink()
+                    except OSError:
+                        pass
+
+    def get(self, token: str) -> Optional[Tuple[str, bytes]]:
+        with self._lock:
+            if self._dir is None:
+                return self._mem.get(token)
+        base = self._dir / self._safe(token)
+        try:
+            meta = json.loads(base.with_suffix(".json").read_text(encoding="utf-8"))
+            return meta["name"], base.with_suffix(".bin").read_bytes()
+        except (OSError, ValueError, KeyError):
+            return None
+
+
+def shared_dict(name: str, defaults: Optional[Dict[str, Any]] = None) -> SharedDict:
+    return SharedDict(name, defaults, root=state_dir())
+
+
+def blob_store(name: str, keep: int = 20) -> BlobStore:
+    return BlobStore(name, keep, root=state_dir())
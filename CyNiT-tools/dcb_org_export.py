@@ -34,6 +34,7 @@ from flask import Flask, request, render_template_string, send_file
 
 import cynit_theme
 import cynit_layout
+import cynit_metrics
 from openpyxl import Workbook
 from openpyxl.utils import get_column_letter
 
@@ -425,11 +426,13 @@ def request_access_token_for_env(env: EnvConfig) -> Tuple[Optional[str], Optiona
     )
 
     try:
-        resp = requests.post(
-            token_url,
-            data=data,
-            timeout=30,
-        )
+        with cynit_metrics.track_dependency("token_endpoint", env=env.name) as call:
+            resp = requests.post(
+                token_url,
+                data=data,
+                timeout=30,
+            )
+            cynit_metrics.record_http_response(call, resp)
     except Exception as exc:
         msg = f"HTTP-fout bij token endpoint voor env {env.name}: {exc}"
         log_debug(msg)
@@ -527,7 +530,9 @@ def fetch_certificates_for_org(
     }
 
     try:
-        resp = requests.post(url, json=body, headers=headers, timeout=timeout)
+        with cynit_metrics.track_dependency("dcbaas", env=env.name) as call:
+            resp = requests.post(url, json=body, headers=headers, timeout=timeout)
+            cynit_metrics.record_http_response(call, resp)
     except Exception as exc:
         msg = f"HTTP-fout voor org {org_code} in env {env.name}: {exc}"
         log_debug(msg)
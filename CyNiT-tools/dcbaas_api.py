@@ -20,8 +20,9 @@ from __future__ import annotations
 import base64
 import json
 import re
+import threading
 import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
@@ -29,6 +30,8 @@ import requests
 from flask import Blueprint, Flask, request, render_template_string
 
 import cynit_layout
+import cynit_metrics
+import cynit_state
 import cynit_theme
 
 import jwt
@@ -40,6 +43,83 @@ from jwcrypto import jwk
 
 _VAR_RE = re.compile(r"{{\s*([^}]+?)\s*}}")
 
+@dataclass(frozen=True)
+class VarTemplate:
+    """
+    Voorgecompileerde tekst: letterlijke stukken + variabele-slots.
+    parts heeft altijd len(slots) + 1 elementen; render() is een simpele join.
+    """
+    parts: Tuple[str, ...]
+    slots: Tuple[Tuple[str, str], ...]  # (var naam, originele match)
+
+    @property
+    def variables(self) -> frozenset:
+        return frozenset(name for name, _orig in self.slots)
+
+    def render(self, variables: Dict[str, str]) -> str:
+        if not self.slots:
+            return self.parts[0]
+        out = [self.parts[0]]
+        for (name, orig), lit in zip(self.slots, self.parts[1:]):
+            out.append(variables.get(name, orig))
+            out.append(lit)
+        return "".join(out)
+
+def _compile_vars(text: str) -> VarTemplate:
+    # geen cache hier: collection-templates blijven per PMRequest bewaard (compiled,
+    # PMRequests gecachet via _load_collection),
+    # ad-hoc bodies uit de runner zijn willekeurige user-input
+    parts: List[str] = []
+    slots: List[Tuple[str, str]] = []
+    pos = 0
+    for m in _VAR_RE.finditer(text or ""):
+        parts.append(text[pos:m.start()])
+        slots.append((m.group(1).strip(), m.group(0)))
+        pos = m.end()
+    parts.append((text or "")[pos:])
+    return VarTemplate(parts=tuple(parts), slots=tuple(slots))
+
+@dataclass
+class CompiledRequest:
+    """
+    PMRequest eenmalig omgezet naar templates (url, headers, body).
+    required_vars is statisch gekend na compileren.
+    """
+    url: VarTemplate
+    headers: List[Tuple[str, VarTemplate]]
+    body_raw: VarTemplate
+    body_urlencoded: List[Tuple[str, VarTemplate]]
+    required_vars: frozenset
+
+def _compile_request(pm: "PMRequest") -> CompiledRequest:
+    url = _compile_vars(pm.url_raw or "")
+    headers: List[Tuple[str, VarTemplate]] = []
+    for h in pm.headers:
+        k = (h.get("key") or "").strip()
+        if not k:
+            continue
+        headers.append((k, _compile_vars(h.get("value") or "")))
+    form: List[Tuple[str, VarTemplate]] = []
+    for kv in pm.body_urlencoded:
+        if not isinstance(kv, dict) or kv.get("disabled"):
+            continue
+        k = str(kv.get("key") or "").strip()
+        if not k:
+            continue
+        form.append((k, _compile_vars(str(kv.get("value") or ""))))
+    body_raw = _compile_vars(pm.body_raw or "")
+
+    required = set(url.variables) | set(body_raw.variables)
+    for _k, t in headers + form:
+        required |= t.variables
+    return CompiledRequest(
+        url=url,
+        headers=headers,
+        body_raw=body_raw,
+        body_urlencoded=form,
+        required_vars=frozenset(required),
+    )
+
 @dataclass
 class PMRequest:
     key: str               # unieke key (folderpad + name)
@@ -52,14 +132,23 @@ class PMRequest:
     body_mode: str
     body_raw: str
     body_urlencoded: List[Dict[str, Any]]
+    _compiled: Optional[CompiledRequest] = field(default=None, repr=False, compare=False)
+
+    @property
+    def compiled(self) -> CompiledRequest:
+        if self._compiled is None:
+            self._compiled = _compile_request(self)
+        return self._compiled
+
+    @property
+    def required_vars(self) -> frozenset:
+        return self.compiled.required_vars
 
 def _apply_vars(text: str, variables: Dict[str, str]) -> str:
+    """Ad-hoc tekst (runner-formulier): compileren zonder cache."""
     if not text:
         return ""
-    def repl(m):
-        key = m.group(1).strip()
-        return variables.get(key, m.group(0))
-    return _VAR_RE.sub(repl, text)
+    return _compile_vars(text).render(variables)
 
 def _safe_json_pretty(text: str) -> str:
     try:
@@ -68,15 +157,33 @@ def _safe_json_pretty(text: str) -> str:
     except Exception:
         return text
 
+# geparste collection per pad, geldig zolang (mtime_ns, size) niet wijzigt;
+# zo blijven de gecompileerde PMRequests bewaard tussen renders
+_COLLECTION_CACHE: Dict[str, Tuple[Tuple[int, int], Tuple[str, List[PMRequest], List[str]]]] = {}
+_COLLECTION_LOCK = threading.Lock()
+
 def _load_collection(path: Path) -> Tuple[str, List[PMRequest], List[str]]:
     """
     Laadt een Postman collection (v2.1). Ondersteunt nested folders.
+    Het resultaat wordt gecachet tot het bestand wijzigt; niet muteren.
     Returns:
       (collection_name, requests, variables_found)
     """
-    if not path.exists():
+    try:
+        st = path.stat()
+    except OSError:
         return ("(collection niet gevonden)", [], [])
 
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _COLLECTION_LOCK:
+        hit = _COLLECTION_CACHE.get(str(path))
+        if hit is not None and hit[0] == stamp:
+            return hit[1]
+        result = _parse_collection(path)
+        _COLLECTION_CACHE[str(path)] = (stamp, result)
+        return result
+
+def _parse_collection(path: Path) -> Tuple[str, List[PMRequest], List[str]]:
     data = json.loads(path.read_text(encoding="utf-8"))
     info = data.get("info", {}) or {}
     name = info.get("name") or path.stem
@@ -108,38 +215,29 @@ def _load_collection(path: Path) -> Tuple[str, List[PMRequest], List[str]]:
             body_raw = body.get("raw") or ""
             body_urlencoded = body.get("urlencoded") or []
 
-            # vars detectie
-            for s in [
-                url_raw,
-                json.dumps(headers, ensure_ascii=False),
-                body_raw,
-                json.dumps(body_urlencoded, ensure_ascii=False),
-            ]:
-                for m in _VAR_RE.findall(s or ""):
-                    vars_found.add(m.strip())
-
             display = (it.get("name") or "(unnamed)").strip()
             folder_txt = " / ".join(folder_stack)
             key = f"{folder_txt} :: {display}" if folder_txt else display
 
-            reqs.append(
-                PMRequest(
-                    key=key,
-                    name=display,
-                    folder=folder_stack,
-                    depth=len(folder_stack),
-                    method=method,
-                    url_raw=url_raw,
-                    headers=[
-                        {"key": h.get("key", ""), "value": h.get("value", "")}
-                        for h in headers
-                        if isinstance(h, dict)
-                    ],
-                    body_mode=body_mode,
-                    body_raw=body_raw,
-                    body_urlencoded=body_urlencoded if isinstance(body_urlencoded, list) else [],
-                )
+            pm = PMRequest(
+                key=key,
+                name=display,
+                folder=folder_stack,
+                depth=len(folder_stack),
+                method=method,
+                url_raw=url_raw,
+                headers=[
+                    {"key": h.get("key", ""), "value": h.get("value", "")}
+                    for h in headers
+                    if isinstance(h, dict)
+                ],
+                body_mode=body_mode,
+                body_raw=body_raw,
+                body_urlencoded=body_urlencoded if isinstance(body_urlencoded, list) else [],
             )
+            # eenmalig compileren; vars detectie volgt uit de templates
+            vars_found.update(pm.required_vars)
+            reqs.append(pm)
 
     walk(data.get("item", []) or [], [])
 
@@ -151,34 +249,16 @@ def _load_collection(path: Path) -> Tuple[str, List[PMRequest], List[str]]:
     reqs.sort(key=lambda r: ("/".join(r.folder).lower(), r.name.lower(), r.method))
     return (name, reqs, sorted(vars_found, key=lambda x: x.lower()))
 
-def _headers_to_dict(headers: List[Dict[str, str]], variables: Dict[str, str]) -> Dict[str, str]:
-    out: Dict[str, str] = {}
-    for h in headers:
-        k = (h.get("key") or "").strip()
-        v = (h.get("value") or "")
-        if not k:
-            continue
-        out[k] = _apply_vars(v, variables)
-    return out
+def _headers_to_dict(pm: PMRequest, variables: Dict[str, str]) -> Dict[str, str]:
+    return {k: t.render(variables) for k, t in pm.compiled.headers}
 
 def _build_body(pm: PMRequest, variables: Dict[str, str]) -> Tuple[Optional[str], Optional[Dict[str, str]], Optional[str]]:
     mode = (pm.body_mode or "").lower()
     if mode == "urlencoded":
-        form: Dict[str, str] = {}
-        for kv in pm.body_urlencoded:
-            if not isinstance(kv, dict):
-                continue
-            if kv.get("disabled"):
-                continue
-            k = str(kv.get("key") or "").strip()
-            if not k:
-                continue
-            v = str(kv.get("value") or "")
-            form[k] = _apply_vars(v, variables)
+        form = {k: t.render(variables) for k, t in pm.compiled.body_urlencoded}
         return (None, form, "application/x-www-form-urlencoded")
     if mode == "raw":
-        raw = _apply_vars(pm.body_raw or "", variables)
-        return (raw, None, None)
+        return (pm.compiled.body_raw.render(variables), None, None)
     return (None, None, None)
 
 # -------------------- Auth helpers (JWT -> access_token) --------------------
@@ -218,7 +298,7 @@ def _build_jwt(iss_sub: str, aud: str, key, alg: str = "RS256", kid: Optional[st
         headers["kid"] = kid
     return jwt.encode(payload=claims, key=key, algorithm=alg, headers=headers)
 
-def _request_access_token(token_url: str, jwt_token: str, audience: str, timeout: int = 30) -> str:
+def _request_access_token(token_url: str, jwt_token: str, audience: str, timeout: int = 30, env: Optional[str] = None) -> str:
     """
     OAuth2 client_credentials met client_assertion (JWT bearer).
     """
@@ -229,7 +309,9 @@ def _request_access_token(token_url: str, jwt_token: str, audience: str, timeout
         "client_assertion": jwt_token,
         "audience": audience,
     }
-    resp = requests.post(token_url, headers=headers, data=data, timeout=timeout)
+    with cynit_metrics.track_dependency("token_endpoint", env=env) as call:
+        resp = requests.post(token_url, headers=headers, data=data, timeout=timeout)
+        cynit_metrics.record_http_response(call, resp)
     resp.raise_for_status()
     j = resp.json()
     return j.get("access_token", "") or ""
@@ -246,7 +328,7 @@ def _parse_headers_text(txt: str) -> Dict[str, str]:
         out[k.strip()] = v.strip()
     return out
 
-def _do_request(method: str, url: str, headers: Dict[str, str], body_text: str, timeout: int = 60) -> Dict[str, Any]:
+def _do_request(method: str, url: str, headers: Dict[str, str], body_text: str, timeout: int = 60, env: Optional[str] = None) -> Dict[str, Any]:
     """
     Voert de request uit. Body kan JSON, form lines (k=v) of raw text zijn.
     Retourneert een dict (ok/status/elapsed_ms/headers/body).
@@ -273,7 +355,9 @@ def _do_request(method: str, url: str, headers: Dict[str, str], body_text: str,
 
     t0 = time.time()
     try:
-        resp = requests.request(method=method, url=url, headers=headers, json=json_payload, data=data, timeout=timeout)
+        with cynit_metrics.track_dependency("dcbaas", env=env) as call:
+            resp = requests.request(method=method, url=url, headers=headers, json=json_payload, data=data, timeout=timeout)
+            cynit_metrics.record_http_response(call, resp)
         elapsed_ms = int((time.time() - t0) * 1000)
         return {
             "ok": bool(resp.ok),
@@ -312,12 +396,13 @@ def _csr_to_b64(csr_text: str, csr_file) -> str:
 
 bp = Blueprint("dcbaas_api", __name__)
 
-STATE: Dict[str, Any] = {
+# gedeeld over workers (zie cynit_state); geneste waarden enkel via update_key wijzigen
+STATE = cynit_state.shared_dict("dcbaas_api", {
     "tokens": {},        # env_id -> token
     "last_resp": None,   # laatst uitgevoerde request (runner/apps/certs)
     "last_auth": None,   # connect status
     "last_smoke": None,  # smoke result
-}
+})
 
 TEMPLATES = [
     "SSL Server",
@@ -728,8 +813,8 @@ def _render(tab: str = "runner", env_id: str = "DEV", selected_key: str = ""):
     }
 
     if selected:
-        resolved_url = _apply_vars(selected.url_raw, var_values)
-        headers_dict = _headers_to_dict(selected.headers, var_values)
+        resolved_url = selected.compiled.url.render(var_values)
+        headers_dict = _headers_to_dict(selected, var_values)
 
         if "Origin" not in headers_dict:
             headers_dict["Origin"] = origin
@@ -837,12 +922,12 @@ def connect():
 
         jwt_token = _build_jwt(iss_sub=iss_sub, aud=jwt_aud, key=key, kid=(kid or None), exp_offset=exp_offset)
         aud_for_token = token_audience or iss_sub
-        access_token = _request_access_token(token_url=token_url, jwt_token=jwt_token, audience=aud_for_token)
+        access_token = _request_access_token(token_url=token_url, jwt_token=jwt_token, audience=aud_for_token, env=env_id)
 
         if not access_token:
             raise RuntimeError("Geen access_token ontvangen.")
 
-        STATE["tokens"][env_id] = access_token
+        STATE.update_key("tokens", lambda t: {**(t or {}), env_id: access_token})
         STATE["last_auth"] = {"ok": True, "msg": f"Token OK voor {env_id}. (base_url={base_url})"}
 
         # Persist config
@@ -865,7 +950,7 @@ def connect():
             health_path = (cfg.get("health_path") or "/health").strip()
             url = f"{base_url.rstrip('/')}{api_prefix}{health_path}"
             headers = {"Origin": origin, "Accept": "application/json", "Authorization": access_token}
-            last = _do_request("GET", url, headers, body_text="", timeout=30)
+            last = _do_request("GET", url, headers, body_text="", timeout=30, env=env_id)
             STATE["last_resp"] = last
             STATE["last_smoke"] = {
                 "ok": bool(last.get("ok")),
@@ -904,7 +989,7 @@ def run_request():
     body2 = _apply_vars(body_text, var_values)
     headers2 = {k: _apply_vars(v, var_values) for k, v in headers.items()}
 
-    STATE["last_resp"] = _do_request(method, url2, headers2, body2, timeout=60)
+    STATE["last_resp"] = _do_request(method, url2, headers2, body2, timeout=60, env=env_id)
     return _render(tab="runner", env_id=env_id, selected_key=selected_key)
 
 @bp.route("/dcbaas-api/app", methods=["POST"])
@@ -929,7 +1014,7 @@ def app_action():
         hdr = {"Origin": origin, "Accept": "application/json"}
         if token:
             hdr["Authorization"] = token
-        STATE["last_resp"] = _do_request("GET", url, hdr, "")
+        STATE["last_resp"] = _do_request("GET", url, hdr, "", env=env_id)
         return _render(tab="apps", env_id=env_id)
 
     if not name:
@@ -943,11 +1028,11 @@ def app_action():
     if action == "add":
         url = f"{base_url}{api_prefix}/application/add"
         payload = {"name": name, "reason": reason}
-        STATE["last_resp"] = _do_request("POST", url, headers, json.dumps(payload, ensure_ascii=False))
+        STATE["last_resp"] = _do_request("POST", url, headers, json.dumps(payload, ensure_ascii=False), env=env_id)
     elif action == "update":
         url = f"{base_url}{api_prefix}/application/update"
         payload = {"name": name, "reason": reason}
-        STATE["last_resp"] = _do_request("POST", url, headers, json.dumps(payload, ensure_ascii=False))
+        STATE["last_resp"] = _do_request("POST", url, headers, json.dumps(payload, ensure_ascii=False), env=env_id)
     elif action == "delegate":
         try:
             dur_i = int(duration)
@@ -955,11 +1040,11 @@ def app_action():
             dur_i = 1
         url = f"{base_url}{api_prefix}/application/delegate"
         payload = {"name": name, "organization_code_delegated": org_code, "duration": dur_i}
-        STATE["last_resp"] = _do_request("POST", url, headers, json.dumps(payload, ensure_ascii=False))
+        STATE["last_resp"] = _do_request("POST", url, headers, json.dumps(payload, ensure_ascii=False), env=env_id)
     elif action == "delete":
         url = f"{base_url}{api_prefix}/application/delete"
         payload = {"name": name}
-        STATE["last_resp"] = _do_request("POST", url, headers, json.dumps(payload, ensure_ascii=False))
+        STATE["last_resp"] = _do_request("POST", url, headers, json.dumps(payload, ensure_ascii=False), env=env_id)
     else:
         STATE["last_resp"] = {"ok": False, "status": "UNKNOWN ACTION", "elapsed_ms": -1, "headers": "", "body": action}
 
@@ -1012,7 +1097,7 @@ def cert_add():
         "certificate_template": tpl,
         "csr": csr_b64,
     }
-    STATE["last_resp"] = _do_request("POST", url, headers, json.dumps(payload, ensure_ascii=False))
+    STATE["last_resp"] = _do_request("POST", url, headers, json.dumps(payload, ensure_ascii=False), env=env_id)
     return _render(tab="certs", env_id=env_id)
 
 def register_web_routes(app: Flask, settings: dict, tools=None) -> None:
@@ -27,6 +27,7 @@ from PIL import Image
 
 import cynit_theme
 import cynit_layout
+import cynit_registry
 
 
 BASE_DIR = cynit_theme.BASE_DIR
@@ -116,6 +117,8 @@ def run_pyinstaller(
         f"--distpath={str(dist_dir)}",
         f"--workpath={str(pyi_build_dir)}",
         f"--specpath={str(pyi_spec_dir)}",
+        # tools worden lazy via importlib geladen (cynit_registry): expliciet meenemen
+        *[f"--hidden-import={m}" for m in cynit_registry.TOOL_MODULES],
         "ctools.py",
     ]
 
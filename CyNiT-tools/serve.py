@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+serve.py - productie-launcher voor de CyNiT Tools hub
+
+ctools.py start de Flask dev-server (één proces, debug). Voor echte
+deployments draait deze launcher dezelfde app onder een WSGI-server:
+
+- Linux/macOS: gunicorn, N worker-processen met elk T threads (gthread),
+  TLS via cert.pem/key.pem, graceful reload met SIGHUP
+- Windows: waitress (één proces, T threads); geen eigen TLS -> reverse proxy
+  of --no-tls
+
+Gebruik:
+
+    python serve.py                          # auto: gunicorn (POSIX) / waitress (Windows)
+    python serve.py --workers 4 --threads 8
+    python serve.py --server waitress --no-tls --port 5000
+    kill -HUP $(cat serve.pid)               # graceful reload: nieuwe workers, oude werken af
+    curl -X POST -H 'X-Profile-Token: ...' http://host:5000/restart   # idem via de hub (admin)
+
+Config (config/settings.json, optioneel; CLI-opties hebben voorrang):
+
+    "server": {
+      "host": "0.0.0.0",
+      "port": 5000,
+      "workers": 2,            // gunicorn processen
+      "threads": 8,            // threads per worker
+      "timeout": 120,          // s; voica1-batches en DCBaaS calls kunnen lang duren
+      "graceful_timeout": 30,  // s; lopende requests afwerken bij reload/stop
+      "tls": "auto"            // "auto" = HTTPS als cert.pem + key.pem bestaan, true/false
+    }
+
+Met meer dan één worker zet de launcher CYNIT_STATE_DIR (standaard
+<ctools>/state), zodat tokens, laatste resultaten, voortgang, downloads en
+/metrics gedeeld worden over de workers (zie cynit_state / cynit_metrics).
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import cynit_state
+import cynit_theme
+
+BASE_DIR = Path(__file__).resolve().parent
+
+SERVER_ENV = "CYNIT_SERVER"
+
+DEFAULTS: Dict[str, Any] = {
+    "host": "0.0.0.0",
+    "port": 5000,
+    "workers": 2,
+    "threads": 8,
+    "timeout": 120,
+    "graceful_timeout": 30,
+    "tls": "auto",
+}
+
+
+# =========================
+# Config
+# =========================
+
+def load_server_config() -> Dict[str, Any]:
+    try:
+        cfg = cynit_theme.load_settings().get("server") or {}
+    except Exception as exc:
+        print("[WARN] settings.json niet leesbaar:", exc)
+        cfg = {}
+    return {**DEFAULTS, **(cfg if isinstance(cfg, dict) else {})}
+
+
+def resolve_tls(mode: Any) -> Optional[tuple]:
+    """(certfile, keyfile) of None."""
+    cert_path = BASE_DIR / "cert.pem"
+    key_path = BASE_DIR / "key.pem"
+    found = cert_path.exists() and key_path.exists()
+    if mode is False or str(mode).lower() in ("false", "off", "0", "no"):
+        return None
+    if not found:
+        if mode is True or str(mode).lower() in ("true", "on", "1", "yes"):
+            raise SystemExit("TLS gevraagd maar cert.pem/key.pem ontbreken naast ctools.py.")
+        print("HTTPS niet beschikbaar: cert.pem/key.pem ontbreken -> HTTP.")
+        return None
+    return str(cert_path), str(key_path)
+
+
+def pick_server(choice: str) -> str:
+    if choice != "auto":
+        return choice
+    if os.name != "nt":
+        try:
+            import gunicorn  # noqa: F401
+            return "gunicorn"
+        except ImportError:
+            print("[WARN] gunicorn niet geïnstalleerd -> waitress (pip install gunicorn)")
+    return "waitress"
+
+
+def prepare_state_dir(workers: int) -> None:
+    """
+    Gedeelde state voor meerdere workers. Bij elke start leeg (tokens,
+    ZIP-downloads, metrics-snapshots), net zoals de in-memory state vroeger;
+    een graceful reload (SIGHUP) start de launcher niet opnieuw en behoudt ze.
+    """
+    if workers <= 1 and not cynit_state.is_multiprocess():
+        return
+    root = cynit_state.state_dir() or (BASE_DIR / "state")
+    os.environ[cynit_state.STATE_DIR_ENV] = str(root)
+    cynit_state.reset_state_dir(root)
+    print(f">>> Gedeelde state: {root}")
+
+
+# =========================
+# Servers
+# =========================
+
+def run_gunicorn(cfg: Dict[str, Any], tls: Optional[tuple], pidfile: str) -> None:
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        raise SystemExit("gunicorn is niet geïnstalleerd: pip install -r requirements/web.in (of pip install gunicorn).")
+
+    class HubApplication(BaseApplication):
+        def __init__(self, options: Dict[str, Any]) -> None:
+            self.options = options
+            super().__init__()
+
+        def load_config(self) -> None:
+            for key, value in self.options.items():
+                if value is not None and key in self.cfg.settings:
+                    self.cfg.set(key, value)
+
+        def load(self):
+            # geen preload: elke (herstarte) worker importeert ctools opnieuw,
+            # zodat SIGHUP ook code- en configwijzigingen oppikt
+            import ctools
+            return ctools.create_app()
+
+    options = {
+        "bind": f"{cfg['host']}:{cfg['port']}",
+        "workers": int(cfg["workers"]),
+        "threads": int(cfg["threads"]),
+        "worker_class": "gthread",
+        "timeout": int(cfg["timeout"]),
+        "graceful_timeout": int(cfg["graceful_timeout"]),
+        "pidfile": pidfile,
+        "errorlog": "-",
+        "certfile": tls[0] if tls else None,
+        "keyfile": tls[1] if tls else None,
+    }
+    HubApplication(options).run()
+
+
+def run_waitress(cfg: Dict[str, Any], tls: Optional[tuple]) -> None:
+    try:
+        from waitress import serve
+    except ImportError:
+        raise SystemExit("waitress is niet geïnstalleerd: pip install -r requirements/web.in (of pip install waitress).")
+
+    if tls:
+        raise SystemExit(
+            "waitress ondersteunt geen TLS: start met --no-tls achter een reverse proxy "
+            "(IIS/nginx/Caddy) of gebruik de dev-server (python ctools.py)."
+        )
+
+    import ctools
+    serve(ctools.create_app(), host=cfg["host"], port=int(cfg["port"]), threads=int(cfg["threads"]))
+
+
+# =========================
+# Main
+# =========================
+
+def main(argv: Optional[list] = None) -> int:
+    cfg = load_server_config()
+
+    ap = argparse.ArgumentParser(description="CyNiT Tools hub onder een productie WSGI-server.")
+    ap.add_argument("--server", choices=("auto", "gunicorn", "waitress"), default="auto")
+    ap.add_argument("--host", default=cfg["host"])
+    ap.add_argument("--port", type=int, default=cfg["port"])
+    ap.add_argument("--workers", type=int, default=cfg["workers"], help="gunicorn worker-processen")
+    ap.add_argument("--threads", type=int, default=cfg["threads"], help="threads per worker")
+    ap.add_argument("--timeout", type=int, default=cfg["timeout"])
+    ap.add_argument("--no-tls", action="store_true", help="HTTP, ook als cert.pem/key.pem bestaan")
+    ap.add_argument("--pid", default=str(BASE_DIR / "serve.pid"), help="pidfile (gunicorn; voor kill -HUP)")
+    args = ap.parse_args(argv)
+
+    cfg.update(host=args.host, port=args.port, workers=max(1, args.workers),
+               threads=max(1, args.threads), timeout=args.timeout)
+    server = pick_server(args.server)
+    tls = resolve_tls(False if args.no_tls else cfg["tls"])
+
+    if server == "waitress" and int(cfg["workers"]) > 1:
+        print("[INFO] waitress draait in één proces; --workers wordt genegeerd (gebruik --threads).")
+        cfg["workers"] = 1
+    prepare_state_dir(int(cfg["workers"]))
+    os.environ[SERVER_ENV] = server
+
+    scheme = "https" if tls else "http"
+    print(f">>> CyNiT Tools via {server} op {scheme}://{cfg['host']}:{cfg['port']} "
+          f"({cfg['workers']} worker(s) x {cfg['threads']} threads)")
+
+    if server == "gunicorn":
+        run_gunicorn(cfg, tls, args.pid)
+    else:
+        run_waitress(cfg, tls)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
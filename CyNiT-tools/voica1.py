@@ -12,25 +12,38 @@ Features:
 - Debug toggle (default OFF) op pagina
 - Progress overlay bij stap 1 en stap 2
 - Batch log: MM_DD.txt in output map (start met password + type)
+- Parallelle key/CSR generatie (process pool) met live voortgang (/voica1/progress)
+- Headless batch (zonder browser): zie voica1_cli.py
 """
 
 from __future__ import annotations
 
+import io
 import os
 import sys
+import json
+import base64
 import string
 import secrets
 import logging
+import threading
+import time
 import traceback
 import subprocess
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Callable, Dict, List, Optional, Any, Tuple, Union
 
-from flask import Flask, request, render_template_string
+from flask import Flask, request, render_template_string, jsonify, send_file, abort
 
 import cynit_theme
 import cynit_layout
+import cynit_metrics
+import cynit_state
+import voica1_keypool
 
 # =========================
 # Logging (zorgt dat je wél logs ziet in PowerShell)
@@ -77,6 +90,22 @@ VOICA_CFG: Dict[str, Any] = {}
 DEFAULT_ENGINE = "python"   # "python" | "openssl"
 DEBUG_DEFAULT = False
 
+# parallelle generatie: None = os.cpu_count()
+MAX_WORKERS: Optional[int] = None
+
+# PKCS#12 encryptie-profiel: "default" (BestAvailableEncryption), "fast", "legacy"
+P12_PROFILE = "default"
+P12_KDF_ROUNDS: Optional[int] = None
+P12_PROFILES = ("default", "fast", "legacy")
+P12_FAST_ROUNDS = 2048
+
+# phones: ZIP enkel in geheugen houden en als download aanbieden (geen zip op schijf)
+ZIP_DOWNLOAD = False
+ZIP_DOWNLOAD_KEEP = 4
+
+# optionele pool met vooraf gegenereerde keys (voica1.json -> key_pool)
+KEY_POOL: Optional[voica1_keypool.KeyPool] = None
+
 
 class CommandError(Exception):
     """Fout bij extern commando (openssl, ...)."""
@@ -87,8 +116,9 @@ class CommandError(Exception):
 # Config apply
 # =========================
 
-def apply_voica_config(voica_cfg: Dict[str, Any]) -> None:
-    global VOICA_CFG, ROOT_BASE_DIR, PASS_LENGTH, KEY_SIZE_DEFAULT, OPENSSL_BIN, OPENSSL_CONF, DEFAULT_ENGINE, DEBUG_DEFAULT
+def apply_voica_config(voica_cfg: Dict[str, Any], start_key_pool: bool = True) -> None:
+    """start_key_pool=False: geen key pool (bv. CLI-commando's die geen keys genereren)."""
+    global VOICA_CFG, ROOT_BASE_DIR, PASS_LENGTH, KEY_SIZE_DEFAULT, OPENSSL_BIN, OPENSSL_CONF, DEFAULT_ENGINE, DEBUG_DEFAULT, MAX_WORKERS, KEY_POOL, P12_PROFILE, P12_KDF_ROUNDS, ZIP_DOWNLOAD
     VOICA_CFG = voica_cfg or {}
 
     ROOT_BASE_DIR = VOICA_CFG.get("root_base_dir", ROOT_BASE_DIR)
@@ -112,9 +142,35 @@ def apply_voica_config(voica_cfg: Dict[str, Any]) -> None:
 
     DEBUG_DEFAULT = bool(VOICA_CFG.get("debug_default", DEBUG_DEFAULT))
 
+    try:
+        mw = VOICA_CFG.get("max_workers")
+        MAX_WORKERS = int(mw) if mw else None
+    except Exception:
+        MAX_WORKERS = None
+
+    ZIP_DOWNLOAD = bool(VOICA_CFG.get("zip_download", ZIP_DOWNLOAD))
+
+    P12_PROFILE = (VOICA_CFG.get("p12_profile") or "default").strip().lower()
+    if P12_PROFILE not in P12_PROFILES:
+        P12_PROFILE = "default"
+    try:
+        rounds = VOICA_CFG.get("p12_kdf_rounds")
+        P12_KDF_ROUNDS = int(rounds) if rounds else None
+    except Exception:
+        P12_KDF_ROUNDS = None
+
+    if KEY_POOL is not None:
+        KEY_POOL.stop()
+    KEY_POOL = None
+    if start_key_pool:
+        KEY_POOL = voica1_keypool.from_config(VOICA_CFG.get("key_pool") or {}, BASE_DIR, KEY_SIZE_DEFAULT)
+    if KEY_POOL is not None:
+        KEY_POOL.start()
+
     logger.info(
-        "[VOICA1] cfg: root=%r pass_len=%r key_default=%r engine=%r openssl=%r conf=%r debug_default=%r",
-        ROOT_BASE_DIR, PASS_LENGTH, KEY_SIZE_DEFAULT, DEFAULT_ENGINE, OPENSSL_BIN, OPENSSL_CONF, DEBUG_DEFAULT
+        "[VOICA1] cfg: root=%r pass_len=%r key_default=%r engine=%r openssl=%r conf=%r debug_default=%r workers=%r p12=%r/%r",
+        ROOT_BASE_DIR, PASS_LENGTH, KEY_SIZE_DEFAULT, DEFAULT_ENGINE, OPENSSL_BIN, OPENSSL_CONF, DEBUG_DEFAULT, MAX_WORKERS,
+        P12_PROFILE, P12_KDF_ROUNDS
     )
 
 
@@ -216,23 +272,37 @@ def write_batch_log(base_dir: Path, device_type: str, password: str, created_fil
 # Engine: OpenSSL
 # =========================
 
+_ENV_CACHE: Dict[Optional[str], Dict[str, str]] = {}
+
+def _openssl_env() -> Dict[str, str]:
+    """Environment voor openssl subprocessen; één kopie per OPENSSL_CONF i.p.v. per call."""
+    env = _ENV_CACHE.get(OPENSSL_CONF)
+    if env is None:
+        env = os.environ.copy()
+        if OPENSSL_CONF:
+            env["OPENSSL_CONF"] = OPENSSL_CONF
+        _ENV_CACHE[OPENSSL_CONF] = env
+    return env
+
 def run_cmd(cmd: List[str], cwd: Optional[Path] = None) -> str:
-    env = os.environ.copy()
-    if OPENSSL_CONF:
-        env["OPENSSL_CONF"] = OPENSSL_CONF
+    env = _openssl_env()
 
     logger.debug("[VOICA1] run_cmd: cwd=%r cmd=%r", str(cwd) if cwd else None, cmd)
     if OPENSSL_CONF:
         logger.debug("[VOICA1] run_cmd: OPENSSL_CONF=%r", OPENSSL_CONF)
 
     try:
-        result = subprocess.run(
-            cmd,
-            cwd=str(cwd) if cwd else None,
-            capture_output=True,
-            text=True,
-            env=env,
-        )
+        with cynit_metrics.track_dependency("openssl") as call:
+            result = subprocess.run(
+                cmd,
+                cwd=str(cwd) if cwd else None,
+                capture_output=True,
+                text=True,
+                env=env,
+            )
+            call.received = len(result.stdout or "")
+            if result.returncode != 0:
+                call.fail(f"exit_{result.returncode}")
     except FileNotFoundError as e:
         logger.exception("[VOICA1] run_cmd: FileNotFoundError (WinError 2). cmd=%r", cmd)
         raise CommandError(
@@ -253,11 +323,14 @@ def run_cmd(cmd: List[str], cwd: Optional[Path] = None) -> str:
 
     return result.stdout
 
-def openssl_create_key_and_csr(base_dir: Path, cn: str, key_size: int) -> Tuple[Path, Path]:
+def openssl_create_key_and_csr(base_dir: Path, cn: str, key_size: int, key_pem: Optional[bytes] = None) -> Tuple[Path, Path]:
     key_path = base_dir / f"{cn}.key.pem"
     csr_path = base_dir / f"{cn}.csr"
 
-    run_cmd([OPENSSL_BIN, "genrsa", "-out", str(key_path), str(int(key_size))])
+    if key_pem:
+        key_path.write_bytes(key_pem)
+    else:
+        run_cmd([OPENSSL_BIN, "genrsa", "-out", str(key_path), str(int(key_size))])
     run_cmd([
         OPENSSL_BIN, "req", "-new",
         "-key", str(key_path),
@@ -293,11 +366,19 @@ def openssl_cert_to_pem_text(cert_path: Path) -> str:
     except UnicodeDecodeError:
         pass
 
-    # DER -> PEM via openssl
-    out = run_cmd([OPENSSL_BIN, "x509", "-in", str(cert_path), "-outform", "PEM"])
-    return out
+    # DER -> PEM in-process (geen openssl proces per toestel nodig)
+    if _crypto_import():
+        return py_cert_to_pem_text(cert_path)
+    return der_to_pem_text(cert_path.read_bytes())
 
-def openssl_create_p12(base_dir: Path, cn: str, password: str, cert_map: Dict[str, Path]) -> Path:
+def openssl_create_p12(
+    base_dir: Path,
+    cn: str,
+    password: str,
+    cert_map: Dict[str, Path],
+    profile: Optional[str] = None,
+    kdf_rounds: Optional[int] = None,
+) -> Path:
     key_path = base_dir / f"{cn}.key.pem"
     csr_path = base_dir / f"{cn}.csr"
     if not key_path.exists():
@@ -309,14 +390,22 @@ def openssl_create_p12(base_dir: Path, cn: str, password: str, cert_map: Dict[st
     if not cert_path:
         raise CommandError(f"Geen certificaat gevonden in map voor CN {cn}")
 
+    profile = profile or P12_PROFILE
+    rounds = kdf_rounds or P12_KDF_ROUNDS or (P12_FAST_ROUNDS if profile in ("fast", "legacy") else None)
+
     p12_path = base_dir / f"{cn}.p12"
-    run_cmd([
+    cmd = [
         OPENSSL_BIN, "pkcs12", "-export",
         "-inkey", str(key_path),
         "-in", str(cert_path),
         "-out", str(p12_path),
         "-passout", f"pass:{password}",
-    ])
+    ]
+    if profile == "legacy":
+        cmd.append("-legacy")
+    if rounds:
+        cmd += ["-iter", str(int(rounds))]
+    run_cmd(cmd)
     return p12_path
 
 
@@ -324,6 +413,7 @@ def openssl_create_p12(base_dir: Path, cn: str, password: str, cert_map: Dict[st
 # Engine: Python (cryptography)
 # =========================
 
+@lru_cache(maxsize=1)
 def _crypto_import():
     try:
         from cryptography import x509  # noqa
@@ -335,6 +425,12 @@ def _crypto_import():
     except Exception:
         return False
 
+def der_to_pem_text(der: bytes) -> str:
+    """DER certificaat -> PEM tekst (pure Python, base64 in regels van 64)."""
+    b64 = base64.b64encode(der).decode("ascii")
+    lines = [b64[i:i + 64] for i in range(0, len(b64), 64)]
+    return "-----BEGIN CERTIFICATE-----\n" + "\n".join(lines) + "\n-----END CERTIFICATE-----\n"
+
 def py_load_cert(cert_path: Path):
     from cryptography import x509
     data = cert_path.read_bytes()
@@ -361,7 +457,7 @@ def py_cert_to_pem_text(cert_path: Path) -> str:
     cert = py_load_cert(cert_path)
     return cert.public_bytes(serialization.Encoding.PEM).decode("utf-8")
 
-def py_create_key_and_csr(base_dir: Path, cn: str, key_size: int) -> Tuple[Path, Path]:
+def py_create_key_and_csr(base_dir: Path, cn: str, key_size: int, key_pem: Optional[bytes] = None) -> Tuple[Path, Path]:
     if not _crypto_import():
         raise CommandError(
             "Python engine vereist 'cryptography'.\n"
@@ -377,12 +473,16 @@ def py_create_key_and_csr(base_dir: Path, cn: str, key_size: int) -> Tuple[Path,
     key_path = base_dir / f"{cn}.key.pem"
     csr_path = base_dir / f"{cn}.csr"
 
-    private_key = rsa.generate_private_key(public_exponent=65537, key_size=int(key_size))
-    key_pem = private_key.private_bytes(
-        encoding=serialization.Encoding.PEM,
-        format=serialization.PrivateFormat.TraditionalOpenSSL,
-        encryption_algorithm=serialization.NoEncryption(),
-    )
+    if key_pem:
+        # key uit de pool (voica1_keypool)
+        private_key = serialization.load_pem_private_key(key_pem, password=None)
+    else:
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=int(key_size))
+        key_pem = private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.TraditionalOpenSSL,
+            encryption_algorithm=serialization.NoEncryption(),
+        )
     key_path.write_bytes(key_pem)
 
     csr = (
@@ -393,7 +493,38 @@ def py_create_key_and_csr(base_dir: Path, cn: str, key_size: int) -> Tuple[Path,
     csr_path.write_bytes(csr.public_bytes(serialization.Encoding.PEM))
     return key_path, csr_path
 
-def py_create_p12(base_dir: Path, cn: str, password: str, cert_map: Dict[str, Path]) -> Path:
+def _p12_encryption(password: str, profile: Optional[str] = None, kdf_rounds: Optional[int] = None):
+    """
+    Encryptie voor PKCS#12:
+    - default: BestAvailableEncryption (tenzij p12_kdf_rounds gezet is)
+    - fast:    AES-256 / PBKDF2-SHA256 met minder rondes (grote batches)
+    - legacy:  3DES / SHA1 voor oudere toestellen
+    """
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.serialization.pkcs12 import PBES
+
+    profile = profile or P12_PROFILE
+    rounds = kdf_rounds or P12_KDF_ROUNDS
+    pwd = password.encode("utf-8")
+
+    if profile == "default" and not rounds:
+        return serialization.BestAvailableEncryption(pwd)
+
+    builder = serialization.PrivateFormat.PKCS12.encryption_builder().kdf_rounds(int(rounds or P12_FAST_ROUNDS))
+    if profile == "legacy":
+        builder = builder.key_cert_algorithm(PBES.PBESv1SHA1And3KeyTripleDESCBC).hmac_hash(hashes.SHA1())
+    else:
+        builder = builder.key_cert_algorithm(PBES.PBESv2SHA256AndAES256CBC).hmac_hash(hashes.SHA256())
+    return builder.build(pwd)
+
+def py_create_p12(
+    base_dir: Path,
+    cn: str,
+    password: str,
+    cert_map: Dict[str, Path],
+    profile: Optional[str] = None,
+    kdf_rounds: Optional[int] = None,
+) -> Path:
     if not _crypto_import():
         raise CommandError(
             "Python engine vereist 'cryptography'.\n"
@@ -426,7 +557,7 @@ def py_create_p12(base_dir: Path, cn: str, password: str, cert_map: Dict[str, Pa
         key=private_key,
         cert=cert,
         cas=None,
-        encryption_algorithm=serialization.BestAvailableEncryption(password.encode("utf-8")),
+        encryption_algorithm=_p12_encryption(password, profile, kdf_rounds),
     )
 
     p12_path = base_dir / f"{cn}.p12"
@@ -438,32 +569,155 @@ def py_create_p12(base_dir: Path, cn: str, password: str, cert_map: Dict[str, Pa
 # Cert scanning / mapping
 # =========================
 
+def _is_cert_candidate(p: Path) -> bool:
+    name = p.name.lower()
+    if name.endswith(".key.pem") or name.endswith(".csr") or name.endswith(".p12") or name.endswith(".pfx"):
+        return False
+    if name.endswith(".zip") or name.endswith(".combined.pem"):
+        return False
+    return name.endswith(CERT_EXTS)
+
+def scan_cert_cns(paths: List[Path], engine: str) -> Dict[Path, Optional[str]]:
+    """
+    Leest de CN van alle certificaten in één keer.
+    - Met 'cryptography' beschikbaar: alles in-process, ook bij engine 'openssl'
+      (geen openssl proces per bestand).
+    - Zonder 'cryptography': fallback naar openssl per bestand.
+    """
+    out: Dict[Path, Optional[str]] = {}
+    in_process = _crypto_import()
+    logger.debug("[VOICA1] scan_cert_cns: %d bestanden, engine=%r in_process=%r", len(paths), engine, in_process)
+
+    for p in paths:
+        out[p] = py_parse_cert_cn(p) if in_process else openssl_parse_cert_cn(p)
+    return out
+
+CN_INDEX_NAME = ".voica1_cn_index.json"
+CN_INDEX_VERSION = 1
+
+CN_INDEX_VERIFY_SECONDS = 60.0  # volledige stat-ronde (in place overschreven bestanden)
+
+_CN_INDEX_LOCK = threading.Lock()
+_CN_INDEX_MEM: Dict[str, Dict[str, Any]] = {}
+_CN_DIR_STATE: Dict[str, Dict[str, Any]] = {}  # map -> {"dir_mtime_ns", "verified", "mapping"}
+
+def _load_cn_index(base_dir: Path) -> Dict[str, Any]:
+    """Sidecar index (naam -> mtime/size/inode/cn); eerst uit geheugen, anders van schijf."""
+    key = str(base_dir.resolve())
+    idx = _CN_INDEX_MEM.get(key)
+    if idx is not None:
+        return idx
+
+    idx = {"version": CN_INDEX_VERSION, "files": {}}
+    path = base_dir / CN_INDEX_NAME
+    if path.exists():
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if isinstance(data, dict) and data.get("version") == CN_INDEX_VERSION and isinstance(data.get("files"), dict):
+                idx = data
+        except Exception as e:
+            logger.debug("[VOICA1] cn index onleesbaar (%s), wordt herbouwd", e)
+    _CN_INDEX_MEM[key] = idx
+    return idx
+
+def _save_cn_index(base_dir: Path, idx: Dict[str, Any]) -> None:
+    path = base_dir / CN_INDEX_NAME
+    tmp = path.with_suffix(".tmp")
+    try:
+        tmp.write_text(json.dumps(idx, indent=1, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.debug("[VOICA1] cn index niet weggeschreven: %s", e)
+
 def map_certs_by_cn(base_dir: Path, engine: str) -> Dict[str, Path]:
+    """
+    CN -> certificaatpad voor alle certificaten in base_dir.
+    Gebruikt een sidecar index (.voica1_cn_index.json) met (mtime, size, inode)
+    per bestand: enkel nieuwe of gewijzigde bestanden worden opnieuw geparsed.
+
+    Snel pad: is de mtime van de map niet gewijzigd, dan komt het resultaat
+    uit geheugen (geen iterdir, geen stat). Bij een gewijzigde map krijgen enkel
+    nieuwe namen en vervangen bestanden (ander inode) een stat. Elke
+    CN_INDEX_VERIFY_SECONDS volgt één volledige stat-ronde, voor bestanden die
+    in place overschreven werden (dat wijzigt de map-mtime niet).
+    """
     mapping: Dict[str, Path] = {}
-    if not base_dir.exists():
+    try:
+        dir_mtime = base_dir.stat().st_mtime_ns
+    except OSError:
         return mapping
 
-    for p in base_dir.iterdir():
-        if not p.is_file():
-            continue
+    key = str(base_dir.resolve())
+    now = time.monotonic()
 
-        name = p.name.lower()
-        if name.endswith(".key.pem") or name.endswith(".csr") or name.endswith(".p12") or name.endswith(".pfx"):
-            continue
-        if name.endswith(".zip") or name.endswith(".combined.pem"):
-            continue
-        if not name.endswith(CERT_EXTS):
-            continue
+    with _CN_INDEX_LOCK:
+        state = _CN_DIR_STATE.get(key)
+        full = state is None or now - state["verified"] >= CN_INDEX_VERIFY_SECONDS
+        if state is not None and not full and state["dir_mtime_ns"] == dir_mtime:
+            return dict(state["mapping"])
 
-        if engine == "openssl":
-            cn = openssl_parse_cert_cn(p)
-        else:
-            cn = py_parse_cert_cn(p)
+        # vaste volgorde zodat "eerste wint" deterministisch is
+        with os.scandir(base_dir) as it:
+            candidates = sorted(
+                (e for e in it if e.is_file() and _is_cert_candidate(Path(e.path))),
+                key=lambda e: e.name,
+            )
 
-        if cn and cn not in mapping:
-            mapping[cn] = p
+        idx = _load_cn_index(base_dir)
+        files: Dict[str, Any] = idx["files"]
+        changed = False
 
-    logger.debug("[VOICA1] map_certs_by_cn: found CNs=%r", list(mapping.keys()))
+        present = set()
+        stats: Dict[str, Tuple[int, int, int]] = {}
+        stale: List[Path] = []
+        for e in candidates:
+            present.add(e.name)
+            entry = files.get(e.name)
+            try:
+                ino = e.inode()
+                if entry and not full and entry.get("ino") == ino:
+                    continue  # zelfde bestand als bij de vorige ronde: geen stat
+                st = e.stat()
+            except OSError:
+                continue
+            if not entry or entry.get("mtime_ns") != st.st_mtime_ns or entry.get("size") != st.st_size:
+                stats[e.name] = (st.st_mtime_ns, st.st_size, ino)
+                stale.append(Path(e.path))
+            elif entry.get("ino") != ino:
+                entry["ino"] = ino
+                changed = True
+
+        if stale:
+            for p, cn in scan_cert_cns(stale, engine).items():
+                mtime_ns, size, ino = stats[p.name]
+                files[p.name] = {"mtime_ns": mtime_ns, "size": size, "ino": ino, "cn": cn}
+            changed = True
+
+        for name in [n for n in files if n not in present]:
+            del files[name]
+            changed = True
+
+        if changed:
+            _save_cn_index(base_dir, idx)
+            # de sidecar zelf wijzigt de map-mtime; dat is geen nieuwe inhoud
+            try:
+                dir_mtime = base_dir.stat().st_mtime_ns
+            except OSError:
+                pass
+
+        for e in candidates:
+            entry = files.get(e.name)
+            cn = entry.get("cn") if entry else None
+            if cn and cn not in mapping:
+                mapping[cn] = Path(e.path)
+
+        _CN_DIR_STATE[key] = {
+            "dir_mtime_ns": dir_mtime,
+            "verified": now if full else state["verified"],
+            "mapping": dict(mapping),
+        }
+
+    logger.debug("[VOICA1] map_certs_by_cn: found CNs=%r (reparsed=%d)", list(mapping.keys()), len(stale))
     return mapping
 
 
@@ -471,7 +725,8 @@ def map_certs_by_cn(base_dir: Path, engine: str) -> Dict[str, Path]:
 # Output creation (.pem combined, zip)
 # =========================
 
-def create_combined_pem(base_dir: Path, cn: str, cert_map: Dict[str, Path], engine: str) -> Path:
+def build_combined_pem_text(base_dir: Path, cn: str, cert_map: Dict[str, Path], engine: str) -> str:
+    """Key + certificaat als één PEM tekst (nog niet weggeschreven)."""
     key_path = base_dir / f"{cn}.key.pem"
     csr_path = base_dir / f"{cn}.csr"
     if not key_path.exists():
@@ -483,8 +738,6 @@ def create_combined_pem(base_dir: Path, cn: str, cert_map: Dict[str, Path], engi
     if not cert_path:
         raise CommandError(f"Geen certificaat gevonden in map voor CN {cn}")
 
-    combined_path = base_dir / f"{cn}.pem"
-
     key_txt = key_path.read_text(encoding="utf-8")
 
     if engine == "openssl":
@@ -492,40 +745,338 @@ def create_combined_pem(base_dir: Path, cn: str, cert_map: Dict[str, Path], engi
     else:
         cert_pem = py_cert_to_pem_text(cert_path)
 
-    combined = key_txt.rstrip() + "\n" + cert_pem.strip() + "\n"
-    combined_path.write_text(combined, encoding="utf-8")
+    return key_txt.rstrip() + "\n" + cert_pem.strip() + "\n"
+
+def create_combined_pem(base_dir: Path, cn: str, cert_map: Dict[str, Path], engine: str) -> Path:
+    combined_path = base_dir / f"{cn}.pem"
+    combined_path.write_text(build_combined_pem_text(base_dir, cn, cert_map, engine), encoding="utf-8")
     return combined_path
 
 
+class PemZipStream:
+    """
+    AES-versleutelde ZIP (pyzipper) die PEMs opneemt zodra ze klaar zijn.
+    target = pad op schijf of io.BytesIO (download vanuit geheugen).
+    Per entry zit enkel die PEM in geheugen.
+    """
+
+    def __init__(self, target: Union[Path, io.BytesIO], password: Optional[str]) -> None:
+        try:
+            import pyzipper  # type: ignore
+        except ImportError:
+            raise CommandError(
+                "Wachtwoord-zip voor phones vereist 'pyzipper'.\n"
+                "Installeer: pip install pyzipper"
+            )
+        self.target = target
+        self.count = 0
+        self._lock = threading.Lock()
+        try:
+            self._zf = pyzipper.AESZipFile(
+                target,
+                "w",
+                compression=pyzipper.ZIP_DEFLATED,
+                encryption=pyzipper.WZ_AES,
+            )
+            if password:
+                self._zf.setpassword(password.encode("utf-8"))
+                self._zf.setencryption(pyzipper.WZ_AES, nbits=128)
+        except Exception as e:
+            raise CommandError(f"Fout bij maken ZIP: {e}")
+
+    def add(self, arcname: str, data: bytes) -> None:
+        with self._lock:
+            try:
+                self._zf.writestr(arcname, data)
+            except Exception as e:
+                raise CommandError(f"Fout bij maken ZIP: {e}")
+            self.count += 1
+
+    def close(self) -> None:
+        with self._lock:
+            self._zf.close()
+        # lege zip op schijf niet laten staan
+        if self.count == 0 and isinstance(self.target, Path):
+            try:
+                self.target.unlink()
+            except OSError:
+                pass
+
+    def __enter__(self) -> "PemZipStream":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
 def zip_pems(base_dir: Path, pem_files: List[Path], password: Optional[str]) -> Optional[Path]:
     if not pem_files:
         return None
 
-    zip_name = f"{base_dir.name}.zip"
-    zip_path = base_dir / zip_name
+    zip_path = base_dir / f"{base_dir.name}.zip"
+    with PemZipStream(zip_path, password) as zs:
+        for f in pem_files:
+            zs.add(f.name, f.read_bytes())
+    return zip_path
+
+
+_ZIP_DOWNLOADS: Optional[cynit_state.BlobStore] = None
+
+def _zip_downloads() -> cynit_state.BlobStore:
+    # lazy: ZIP_DOWNLOAD_KEEP komt pas uit voica1.json na load_config()
+    global _ZIP_DOWNLOADS
+    if _ZIP_DOWNLOADS is None or _ZIP_DOWNLOADS.keep != ZIP_DOWNLOAD_KEEP:
+        _ZIP_DOWNLOADS = cynit_state.blob_store("voica1_zips", keep=ZIP_DOWNLOAD_KEEP)
+    return _ZIP_DOWNLOADS
+
+def _store_zip_download(name: str, data: bytes) -> str:
+    """Bewaart een ZIP (max ZIP_DOWNLOAD_KEEP, gedeeld over workers) en geeft het download-token."""
+    token = secrets.token_urlsafe(16)
+    _zip_downloads().put(token, name, data)
+    return token
+
+
+# =========================
+# Batch: parallelle key/CSR generatie
+# =========================
+
+# gedeeld over workers: /voica1/progress kan op een andere worker landen dan de batch
+PROGRESS = cynit_state.shared_dict(
+    "voica1_progress", {"phase": "", "total": 0, "done": 0, "failed": 0, "running": False}
+)
 
-    # voorkeur: pyzipper (AES + wachtwoord)
+def _progress_start(phase: str, total: int) -> None:
+    PROGRESS.update({"phase": phase, "total": int(total), "done": 0, "failed": 0, "running": True})
+
+def _progress_tick(ok: bool) -> None:
+    with PROGRESS.edit() as data:
+        data["done"] += 1
+        if not ok:
+            data["failed"] += 1
+
+def _progress_stop() -> None:
+    PROGRESS["running"] = False
+
+def progress_snapshot() -> Dict[str, Any]:
+    return PROGRESS.snapshot()
+
+def _worker_count(n_items: int) -> int:
+    workers = MAX_WORKERS or os.cpu_count() or 1
+    return max(1, min(int(workers), int(n_items)))
+
+def _generate_one(
+    base_dir: str,
+    cn: str,
+    key_size: int,
+    engine: str,
+    openssl_bin: str,
+    openssl_conf: Optional[str],
+    key_pem: Optional[bytes] = None,
+) -> Tuple[bool, str]:
+    """
+    Worker voor één toestel. Draait in een apart proces, dus de openssl
+    instellingen worden expliciet meegegeven (config is daar niet toegepast).
+    """
+    global OPENSSL_BIN, OPENSSL_CONF
+    OPENSSL_BIN = openssl_bin
+    OPENSSL_CONF = openssl_conf
     try:
-        import pyzipper  # type: ignore
-        with pyzipper.AESZipFile(
-            zip_path,
-            "w",
-            compression=pyzipper.ZIP_DEFLATED,
-            encryption=pyzipper.WZ_AES,
-        ) as zf:
-            if password:
-                zf.setpassword(password.encode("utf-8"))
-                zf.setencryption(pyzipper.WZ_AES, nbits=128)
-            for f in pem_files:
-                zf.write(f, arcname=f.name)
-        return zip_path
-    except ImportError:
-        raise CommandError(
-            "Wachtwoord-zip voor phones vereist 'pyzipper'.\n"
-            "Installeer: pip install pyzipper"
-        )
+        if engine == "openssl":
+            key_path, csr_path = openssl_create_key_and_csr(Path(base_dir), cn, key_size, key_pem)
+        else:
+            key_path, csr_path = py_create_key_and_csr(Path(base_dir), cn, key_size, key_pem)
+        src = " (key uit pool)" if key_pem else ""
+        return True, f"Key + CSR aangemaakt{src}: {key_path.name}, {csr_path.name}"
+    except Exception as e:
+        return False, str(e)
+
+def _run_parallel(
+    phase_devices: List[str],
+    fn,
+    args,
+    use_processes: bool,
+    record,
+    max_workers: Optional[int] = None,
+) -> None:
+    """
+    Voert fn(*args(dev)) uit voor alle devices, parallel in een process- of
+    thread pool. record(dev, *resultaat) wordt in de hoofdthread opgeroepen.
+    Valt terug op sequentieel als de process pool niet bruikbaar is.
+    """
+    done: set = set()
+
+    def _rec(dev: str, res: Tuple[Any, ...]) -> None:
+        done.add(dev)
+        record(dev, *res)
+
+    workers = max_workers or _worker_count(len(phase_devices))
+    if workers <= 1 or len(phase_devices) <= 1:
+        for dev in phase_devices:
+            _rec(dev, fn(*args(dev)))
+        return
+
+    pool_cls = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    logger.debug("[VOICA1] %s: %s workers=%d devices=%d", fn.__name__, pool_cls.__name__, workers, len(phase_devices))
+    try:
+        with pool_cls(max_workers=workers) as pool:
+            futures = {pool.submit(fn, *args(dev)): dev for dev in phase_devices}
+            for fut in as_completed(futures):
+                dev = futures[fut]
+                try:
+                    res = fut.result()
+                except BrokenProcessPool:
+                    raise
+                except Exception as e:
+                    res = (False, str(e))
+                _rec(dev, res)
+    except (BrokenProcessPool, OSError) as e:
+        # bv. frozen EXE zonder multiprocessing support -> sequentieel verder
+        logger.warning("[VOICA1] process pool niet bruikbaar (%s), sequentiële fallback", e)
+        for dev in phase_devices:
+            if dev not in done:
+                _rec(dev, fn(*args(dev)))
+
+def generate_batch(
+    base_dir: Path,
+    cns: Dict[str, str],
+    key_size: int,
+    engine: str,
+    max_workers: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Genereert key + CSR voor alle toestellen (device -> CN) parallel.
+    - python engine: ProcessPoolExecutor (RSA keygen is CPU-bound)
+    - openssl engine: ThreadPoolExecutor (werk zit in de subprocessen)
+    Fouten worden per toestel opgevangen; resultaten volgen de input-volgorde.
+    Keys uit KEY_POOL (indien actief) worden eerst gebruikt; enkel de rest
+    gaat naar de (process) pool.
+    """
+    all_devices = list(cns.keys())
+    results: Dict[str, Dict[str, Any]] = {}
+    _progress_start("generate", len(all_devices))
+
+    def _record(dev: str, ok: bool, msg: str) -> None:
+        results[dev] = {"device": dev, "ok": ok, "message": msg}
+        _progress_tick(ok)
+        if not ok:
+            logger.error("[VOICA1] generate error for %r: %s", dev, msg)
+
+    def args(dev: str) -> Tuple[Any, ...]:
+        return (str(base_dir), cns[dev], int(key_size), engine, OPENSSL_BIN, OPENSSL_CONF)
+
+    try:
+        devices: List[str] = []
+        for dev in all_devices:
+            key_pem = KEY_POOL.take(key_size) if KEY_POOL is not None else None
+            if key_pem is None:
+                devices.append(dev)
+                continue
+            # CSR tekenen met een pool-key is goedkoop -> inline
+            _record(dev, *_generate_one(*args(dev), key_pem))
+
+        _run_parallel(devices, _generate_one, args, engine != "openssl", _record, max_workers)
+    finally:
+        _progress_stop()
+
+    return [results[d] for d in all_devices if d in results]
+
+def _assemble_one(
+    base_dir: str,
+    cn: str,
+    device_type: str,
+    engine: str,
+    password: str,
+    cert_path: Optional[str],
+    openssl_bin: str,
+    openssl_conf: Optional[str],
+    p12_profile: str,
+    p12_kdf_rounds: Optional[int],
+    debug: bool = False,
+) -> Tuple[bool, str, Optional[str], Optional[bytes]]:
+    """
+    Stap 2 voor één toestel: key + cert laden, .p12 of gecombineerde PEM
+    maken en wegschrijven. Draait (voor .p12 met python engine) in een
+    apart proces; instellingen worden expliciet meegegeven.
+    """
+    global OPENSSL_BIN, OPENSSL_CONF
+    OPENSSL_BIN = openssl_bin
+    OPENSSL_CONF = openssl_conf
+    cert_map = {cn: Path(cert_path)} if cert_path else {}
+    try:
+        if device_type == "pc":
+            if engine == "openssl":
+                out = openssl_create_p12(Path(base_dir), cn, password, cert_map, p12_profile, p12_kdf_rounds)
+            else:
+                out = py_create_p12(Path(base_dir), cn, password, cert_map, p12_profile, p12_kdf_rounds)
+            return True, f".p12 aangemaakt: {out.name}", str(out), None
+        # PEM inhoud meegeven zodat de ZIP niet opnieuw van schijf moet lezen
+        data = build_combined_pem_text(Path(base_dir), cn, cert_map, engine=engine).encode("utf-8")
+        pem = Path(base_dir) / f"{cn}.pem"
+        pem.write_bytes(data)
+        return True, f"PEM aangemaakt: {pem.name}", str(pem), data
     except Exception as e:
-        raise CommandError(f"Fout bij maken ZIP: {e}")
+        msg = str(e) if not debug else (str(e) + "\n" + traceback.format_exc())
+        return False, msg, None, None
+
+def process_batch(
+    base_dir: Path,
+    cns: Dict[str, str],
+    device_type: str,
+    engine: str,
+    password: str,
+    cert_map: Dict[str, Path],
+    debug: bool = False,
+    max_workers: Optional[int] = None,
+    on_output: Optional[Callable[[str, Path, Optional[bytes]], None]] = None,
+) -> Tuple[List[Dict[str, Any]], Dict[str, Path]]:
+    """
+    Stap 2 voor alle toestellen parallel (.p12 of gecombineerde PEM).
+    - .p12 met python engine: ProcessPoolExecutor (PKCS#12 KDF is CPU-bound)
+    - PEM / openssl: ThreadPoolExecutor
+    on_output(device, pad, data) wordt opgeroepen zodra een toestel klaar is
+    (bv. PemZipStream.add); data is de PEM inhoud (None voor .p12).
+    Returns (results in input-volgorde, device -> aangemaakt bestand).
+    """
+    devices = list(cns.keys())
+    results: Dict[str, Dict[str, Any]] = {}
+    outputs: Dict[str, Path] = {}
+    _progress_start("process", len(devices))
+
+    def _record(dev: str, ok: bool, msg: str, out: Optional[str] = None, data: Optional[bytes] = None) -> None:
+        if ok and out:
+            outputs[dev] = Path(out)
+            if on_output is not None:
+                try:
+                    on_output(dev, Path(out), data)
+                except Exception as e:
+                    ok, msg = False, f"{msg} — maar toevoegen aan ZIP faalde: {e}"
+                    outputs.pop(dev, None)
+        results[dev] = {"device": dev, "ok": ok, "message": msg}
+        _progress_tick(ok)
+        if not ok:
+            logger.error("[VOICA1] process error for %r: %s", dev, msg)
+
+    def args(dev: str) -> Tuple[Any, ...]:
+        cert_path = cert_map.get(cns[dev])
+        return (
+            str(base_dir), cns[dev], device_type, engine, password,
+            str(cert_path) if cert_path else None,
+            OPENSSL_BIN, OPENSSL_CONF, P12_PROFILE, P12_KDF_ROUNDS, debug,
+        )
+
+    use_processes = device_type == "pc" and engine != "openssl"
+    try:
+        _run_parallel(devices, _assemble_one, args, use_processes, _record, max_workers)
+    finally:
+        _progress_stop()
+
+    return [results[d] for d in devices if d in results], {d: outputs[d] for d in devices if d in outputs}
+
+def metrics_lines() -> List[str]:
+    """Prometheus-regels voor /metrics in ctools (leeg als de key pool uit staat)."""
+    if KEY_POOL is None:
+        return []
+    return KEY_POOL.metrics_lines()
 
 
 # =========================
@@ -631,6 +1182,25 @@ PAGE_TEMPLATE = """
       if (!overlay || !label) return;
       label.textContent = stepText || "Bezig met verwerken...";
       overlay.style.display = 'flex';
+      voicaPollProgress(stepText);
+    }
+
+    function voicaPollProgress(stepText) {
+      var label = document.getElementById('voica-progress-text');
+      var count = document.getElementById('voica-progress-count');
+      window.setInterval(function() {
+        fetch('/voica1/progress', {cache: 'no-store'})
+          .then(function(r) { return r.json(); })
+          .then(function(p) {
+            if (!p || !p.running || !p.total) return;
+            if (label) label.textContent = stepText;
+            if (count) {
+              count.textContent = p.done + " / " + p.total + " toestellen"
+                + (p.failed ? " (" + p.failed + " fout)" : "");
+            }
+          })
+          .catch(function() {});
+      }, 700);
     }
 
     window.addEventListener('load', function() {
@@ -653,7 +1223,7 @@ PAGE_TEMPLATE = """
     <div class="voica-progress-box">
       <div class="voica-progress-title" id="voica-progress-text">Bezig met verwerken...</div>
       <div class="voica-progress-bar-outer"><div class="voica-progress-bar-inner"></div></div>
-      <div class="muted" style="margin-top:10px;">Even geduld…</div>
+      <div class="muted" id="voica-progress-count" style="margin-top:10px;">Even geduld…</div>
     </div>
   </div>
 
@@ -783,6 +1353,9 @@ PAGE_TEMPLATE = """
 
         {% if zip_path %}
           <p class="muted">Phone ZIP: {{ zip_path }}</p>
+          {% if zip_download_url %}
+            <p><a href="{{ zip_download_url }}"><button type="button">Download ZIP</button></a></p>
+          {% endif %}
         {% endif %}
       </div>
 
@@ -845,6 +1418,7 @@ def _render(
     missing_certs: List[Dict[str, Any]],
     engine: str,
     debug_enabled: bool,
+    zip_download_url: Optional[str] = None,
 ):
     colors = SETTINGS.get("colors", {})
     ui = SETTINGS.get("ui", {})
@@ -889,6 +1463,7 @@ def _render(
         missing_certs=missing_certs,
         engine=engine,
         debug_enabled=debug_enabled,
+        zip_download_url=zip_download_url,
     )
 
 
@@ -1012,18 +1587,22 @@ def register_web_routes(app, settings, tools, voica_cfg):
 
         cns: Dict[str, str] = {}
         dev_list: List[str] = []
+        results: List[Dict[str, Any]] = []
 
         try:
             for dev in devices:
                 dev_id = validate_device_id(dev)
-                cn = build_cn(dev_id, device_type)
-                cns[dev_id] = cn
+                if dev_id in cns:
+                    continue
+                cns[dev_id] = build_cn(dev_id, device_type)
                 dev_list.append(dev_id)
 
-                if engine == "openssl":
-                    openssl_create_key_and_csr(base_dir, cn, key_size)
-                else:
-                    py_create_key_and_csr(base_dir, cn, key_size)
+            results = generate_batch(base_dir, cns, key_size, engine)
+            failed = [r for r in results if not r["ok"]]
+            if failed:
+                error = f"Fout bij aanmaken key/CSR voor {len(failed)}/{len(results)} toestel(len)."
+                if debug_enabled:
+                    error += "\n" + "\n".join(f"{r['device']}: {r['message']}" for r in failed)
 
         except Exception as e:
             if debug_enabled:
@@ -1049,7 +1628,7 @@ def register_web_routes(app, settings, tools, voica_cfg):
             cns=cns,
             devices_str=devices_str,
             password=password,
-            results=[],
+            results=results,
             zip_path=None,
             certmail_text="",
             ots_text="",
@@ -1060,6 +1639,18 @@ def register_web_routes(app, settings, tools, voica_cfg):
             debug_enabled=debug_enabled,
         )
 
+    @app.route("/voica1/progress", methods=["GET"])
+    def voica1_progress():
+        return jsonify(progress_snapshot())
+
+    @app.route("/voica1/download/<token>", methods=["GET"])
+    def voica1_download(token: str):
+        item = _zip_downloads().get(token)
+        if item is None:
+            abort(404)
+        name, data = item
+        return send_file(io.BytesIO(data), mimetype="application/zip", as_attachment=True, download_name=name)
+
     @app.route("/voica1/process", methods=["POST"])
     def voica1_process():
         base_dir_str = (request.form.get("base_dir") or "").strip()
@@ -1099,40 +1690,50 @@ def register_web_routes(app, settings, tools, voica_cfg):
             if cn not in cert_map:
                 missing_certs.append({"device": dev, "cn": cn})
 
-        for dev in devices:
-            cn = build_cn(dev, device_type)
+        # phones: encrypted ZIP wordt gevuld zodra elke PEM klaar is
+        zip_stream: Optional[PemZipStream] = None
+        zip_target: Optional[Union[Path, io.BytesIO]] = None
+        if device_type == "ip_phone" and devices:
+            zip_target = io.BytesIO() if ZIP_DOWNLOAD else base_dir / f"{base_dir.name}.zip"
             try:
-                if device_type == "pc":
-                    if engine == "openssl":
-                        out = openssl_create_p12(base_dir, cn, password, cert_map)
-                    else:
-                        out = py_create_p12(base_dir, cn, password, cert_map)
-                    created_files.append(out)
-                    results.append({"device": dev, "ok": True, "message": f".p12 aangemaakt: {out.name}"})
-                else:
-                    pem = create_combined_pem(base_dir, cn, cert_map, engine=engine)
-                    pem_files.append(pem)
-                    created_files.append(pem)
-                    results.append({"device": dev, "ok": True, "message": f"PEM aangemaakt: {pem.name}"})
-
-            except Exception as e:
-                logger.error("[VOICA1] process error for %r: %s", dev, e)
-                logger.debug(traceback.format_exc())
-                msg = str(e) if not debug_enabled else (str(e) + "\n" + traceback.format_exc())
-                results.append({"device": dev, "ok": False, "message": msg})
-
-        zip_path_str = None
-        if device_type == "ip_phone" and pem_files:
-            try:
-                zip_path = zip_pems(base_dir, pem_files, password)
-                if zip_path:
-                    created_files.append(zip_path)
-                    zip_path_str = str(zip_path)
+                zip_stream = PemZipStream(zip_target, password)
             except Exception as e:
                 logger.error("[VOICA1] zip failed: %s", e)
                 logger.debug(traceback.format_exc())
                 results.append({"device": "(zip)", "ok": False, "message": str(e)})
 
+        def _to_zip(dev: str, out: Path, data: Optional[bytes]) -> None:
+            if zip_stream is not None:
+                zip_stream.add(out.name, data if data is not None else out.read_bytes())
+
+        try:
+            batch_results, outputs = process_batch(
+                base_dir, cns, device_type, engine, password, cert_map, debug=debug_enabled,
+                on_output=_to_zip,
+            )
+        finally:
+            if zip_stream is not None:
+                zip_stream.close()
+        results.extend(batch_results)
+        for dev in devices:
+            out = outputs.get(dev)
+            if out is None:
+                continue
+            created_files.append(out)
+            if device_type != "pc":
+                pem_files.append(out)
+
+        zip_path_str = None
+        zip_download_url = None
+        if zip_stream is not None and zip_stream.count:
+            if isinstance(zip_target, io.BytesIO):
+                token = _store_zip_download(f"{base_dir.name}.zip", zip_target.getvalue())
+                zip_download_url = f"/voica1/download/{token}"
+                zip_path_str = f"{base_dir.name}.zip (download, niet op schijf)"
+            elif isinstance(zip_target, Path):
+                created_files.append(zip_target)
+                zip_path_str = str(zip_target)
+
         # mail texts
         certmail_template = load_message_block(MESSAGES_PATH, "CERTMAIL")
         ots_template = load_message_block(MESSAGES_PATH, "OTS")
@@ -1166,6 +1767,7 @@ def register_web_routes(app, settings, tools, voica_cfg):
             password=password,
             results=results,
             zip_path=zip_path_str,
+            zip_download_url=zip_download_url,
             certmail_text=certmail_text,
             ots_text=ots_text,
             wa_text=wa_text,
@@ -1181,8 +1783,6 @@ def register_web_routes(app, settings, tools, voica_cfg):
 # =========================
 
 if __name__ == "__main__":
-    import json
-
     settings = cynit_theme.load_settings()
     tools_cfg = cynit_theme.load_tools()
     tools = tools_cfg.get("tools", [])
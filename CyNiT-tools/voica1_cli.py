@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+voica1_cli.py
+
+Headless batch-runner voor VOICA1 (zonder browser), bv. voor nachtelijke runs.
+
+Gebruik:
+    python voica1_cli.py generate --manifest toestellen.csv --base-dir D:\\VOICA1\\batch1
+    python voica1_cli.py process  --base-dir D:\\VOICA1\\batch1 --report rapport.json
+    python voica1_cli.py run      --manifest toestellen.json --base-dir ...   (beide fases)
+
+Manifest:
+- CSV met kolom 'device' (optioneel 'type': pc | ip_phone), of één device per lijn
+- JSON: lijst van strings of objecten {"device": "...", "type": "..."}
+
+Fase 1 bewaart de batch-gegevens (devices, type, wachtwoord, ...) in
+voica1_batch.json in de doelmap, zodat fase 2 later zonder extra input kan lopen.
+Het rapport (JSON) gaat naar stdout of naar --report.
+Exit code: 0 = alles OK, 1 = minstens één fout, 2 = ongeldige input.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import voica1
+
+STATE_NAME = "voica1_batch.json"
+DEVICE_TYPES = ("pc", "ip_phone")
+
+
+# =========================
+# Manifest / state
+# =========================
+
+def load_manifest(path: Path, default_type: str) -> List[Tuple[str, str]]:
+    """Leest het manifest -> [(device_id, device_type)] in volgorde, zonder dubbels."""
+    text = path.read_text(encoding="utf-8-sig")
+    rows: List[Tuple[str, str]] = []
+
+    if path.suffix.lower() == ".json":
+        data = json.loads(text)
+        if isinstance(data, dict):
+            data = data.get("devices", [])
+        for item in data or []:
+            if isinstance(item, dict):
+                rows.append((str(item.get("device") or ""), str(item.get("type") or default_type)))
+            else:
+                rows.append((str(item), default_type))
+    else:
+        lines = [ln for ln in text.splitlines() if ln.strip()]
+        if lines and "device" in lines[0].lower().split(",")[0]:
+            for rec in csv.DictReader(io.StringIO("\n".join(lines))):
+                rec = {(k or "").strip().lower(): (v or "").strip() for k, v in rec.items()}
+                rows.append((rec.get("device", ""), rec.get("type") or default_type))
+        else:
+            rows = [(ln.split(",")[0], default_type) for ln in lines]
+
+    out: List[Tuple[str, str]] = []
+    seen = set()
+    for dev, dtype in rows:
+        dev = voica1.validate_device_id(dev)
+        dtype = dtype.strip().lower()
+        if dtype not in DEVICE_TYPES:
+            raise ValueError(f"Onbekend device type {dtype!r} voor {dev}")
+        if (dev, dtype) in seen:
+            continue
+        seen.add((dev, dtype))
+        out.append((dev, dtype))
+    return out
+
+def _state_path(base_dir: Path) -> Path:
+    return base_dir / STATE_NAME
+
+def save_state(base_dir: Path, state: Dict[str, Any]) -> None:
+    _state_path(base_dir).write_text(json.dumps(state, indent=2, ensure_ascii=False), encoding="utf-8")
+
+def load_state(base_dir: Path) -> Dict[str, Any]:
+    p = _state_path(base_dir)
+    if not p.exists():
+        raise ValueError(f"Geen {STATE_NAME} in {base_dir}. Draai eerst 'generate' of geef --manifest en --password mee.")
+    return json.loads(p.read_text(encoding="utf-8"))
+
+def _group_by_type(devices: List[Tuple[str, str]]) -> Dict[str, List[str]]:
+    groups: Dict[str, List[str]] = {}
+    for dev, dtype in devices:
+        groups.setdefault(dtype, []).append(dev)
+    return groups
+
+
+# =========================
+# Fases
+# =========================
+
+def phase_generate(
+    base_dir: Path,
+    devices: List[Tuple[str, str]],
+    key_size: int,
+    engine: str,
+    workers: Optional[int],
+    password: Optional[str],
+) -> Dict[str, Any]:
+    base_dir.mkdir(parents=True, exist_ok=True)
+    password = password or voica1.generate_password(voica1.PASS_LENGTH)
+
+    t0 = time.perf_counter()
+    results: List[Dict[str, Any]] = []
+    for dtype, devs in _group_by_type(devices).items():
+        cns = {d: voica1.build_cn(d, dtype) for d in devs}
+        for r in voica1.generate_batch(base_dir, cns, key_size, engine, max_workers=workers):
+            results.append({**r, "type": dtype, "cn": cns[r["device"]]})
+
+    save_state(base_dir, {
+        "devices": [{"device": d, "type": t} for d, t in devices],
+        "key_size": key_size,
+        "engine": engine,
+        "password": password,
+        "generated": time.strftime("%Y-%m-%d %H:%M:%S"),
+    })
+
+    return {
+        "phase": "generate",
+        "base_dir": str(base_dir),
+        "engine": engine,
+        "key_size": key_size,
+        "elapsed_s": round(time.perf_counter() - t0, 3),
+        "results": results,
+    }
+
+def phase_process(
+    base_dir: Path,
+    devices: List[Tuple[str, str]],
+    engine: str,
+    password: str,
+    workers: Optional[int],
+) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    cert_map = voica1.map_certs_by_cn(base_dir, engine=engine)
+
+    results: List[Dict[str, Any]] = []
+    missing: List[Dict[str, Any]] = []
+    zip_path: Optional[str] = None
+
+    for dtype, devs in _group_by_type(devices).items():
+        cns = {d: voica1.build_cn(d, dtype) for d in devs}
+        missing += [{"device": d, "cn": cn, "type": dtype} for d, cn in cns.items() if cn not in cert_map]
+
+        zip_stream: Optional[voica1.PemZipStream] = None
+        if dtype == "ip_phone":
+            try:
+                zip_stream = voica1.PemZipStream(base_dir / f"{base_dir.name}.zip", password)
+            except Exception as e:
+                results.append({"device": "(zip)", "type": dtype, "ok": False, "message": str(e)})
+
+        def _to_zip(dev: str, out: Path, data: Optional[bytes]) -> None:
+            if zip_stream is not None:
+                zip_stream.add(out.name, data if data is not None else out.read_bytes())
+
+        try:
+            batch, outputs = voica1.process_batch(
+                base_dir, cns, dtype, engine, password, cert_map,
+                max_workers=workers, on_output=_to_zip,
+            )
+        finally:
+            if zip_stream is not None:
+                zip_stream.close()
+
+        for r in batch:
+            out = outputs.get(r["device"])
+            results.append({**r, "type": dtype, "cn": cns[r["device"]], "output": str(out) if out else None})
+        created: List[Path] = [outputs[d] for d in devs if d in outputs]
+
+        if zip_stream is not None and zip_stream.count:
+            zp = base_dir / f"{base_dir.name}.zip"
+            created.append(zp)
+            zip_path = str(zp)
+
+        try:
+            voica1.write_batch_log(base_dir, dtype, password, created)
+        except Exception as e:
+            voica1.logger.error("[VOICA1] write_batch_log failed: %s", e)
+
+    return {
+        "phase": "process",
+        "base_dir": str(base_dir),
+        "engine": engine,
+        "elapsed_s": round(time.perf_counter() - t0, 3),
+        "results": results,
+        "missing_certs": missing,
+        "zip": zip_path,
+    }
+
+
+# =========================
+# CLI
+# =========================
+
+def _load_cfg(path: Optional[str]) -> Dict[str, Any]:
+    p = Path(path) if path else voica1.CONFIG_DIR / "voica1.json"
+    if not p.exists():
+        return {}
+    return json.loads(p.read_text(encoding="utf-8"))
+
+def _summary(report: Dict[str, Any]) -> Dict[str, Any]:
+    results = report.get("results", [])
+    report["ok"] = sum(1 for r in results if r.get("ok"))
+    report["failed"] = sum(1 for r in results if not r.get("ok"))
+    return report
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(prog="voica1_cli", description="VOICA1 batch (headless): key/CSR generatie en P12/PEM/ZIP verwerking.")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    def common(p: argparse.ArgumentParser) -> None:
+        p.add_argument("--base-dir", required=True, help="Doelmap van de batch")
+        p.add_argument("--engine", choices=("python", "openssl"), default=None, help="Default: uit voica1.json")
+        p.add_argument("--workers", type=int, default=None, help="Aantal parallelle workers (default: cores)")
+        p.add_argument("--config", default=None, help="Pad naar voica1.json")
+        p.add_argument("--report", default=None, help="Rapport (JSON) naar dit bestand i.p.v. stdout")
+        p.add_argument("--debug", action="store_true")
+
+    for name in ("generate", "run"):
+        p = sub.add_parser(name, help="Fase 1: key + CSR" if name == "generate" else "Fase 1 + 2 na elkaar")
+        common(p)
+        p.add_argument("--manifest", required=True, help="CSV of JSON met devices")
+        p.add_argument("--type", choices=DEVICE_TYPES, default="pc", help="Default device type")
+        p.add_argument("--key-size", type=int, default=None)
+        p.add_argument("--password", default=None, help="Batch-wachtwoord (default: random)")
+
+    p = sub.add_parser("process", help="Fase 2: P12 (pc) of PEM + ZIP (ip_phone)")
+    common(p)
+    p.add_argument("--manifest", default=None, help="Optioneel; anders uit voica1_batch.json")
+    p.add_argument("--type", choices=DEVICE_TYPES, default="pc")
+    p.add_argument("--password", default=None, help="Optioneel; anders uit voica1_batch.json")
+    return ap
+
+def _log_to_stderr() -> None:
+    """voica1 logt naar stdout; in de CLI is stdout voor het JSON-rapport."""
+    for handler in voica1.logger.handlers:
+        if isinstance(handler, logging.StreamHandler) and handler.stream is sys.stdout:
+            handler.setStream(sys.stderr)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    _log_to_stderr()
+    # enkel generate/run maken keys; anders geen refill-proces opstarten
+    voica1.apply_voica_config(_load_cfg(args.config), start_key_pool=args.command in ("generate", "run"))
+    voica1.set_debug_enabled(args.debug)
+
+    base_dir = Path(args.base_dir)
+    engine = (args.engine or voica1.DEFAULT_ENGINE).lower()
+    reports: List[Dict[str, Any]] = []
+
+    try:
+        if args.command in ("generate", "run"):
+            devices = load_manifest(Path(args.manifest), args.type)
+            if not devices:
+                raise ValueError("Manifest bevat geen devices.")
+            key_size = args.key_size or voica1.KEY_SIZE_DEFAULT
+            reports.append(_summary(phase_generate(base_dir, devices, key_size, engine, args.workers, args.password)))
+
+        if args.command in ("process", "run"):
+            state: Dict[str, Any] = {}
+            if args.command == "run" or not (args.manifest and args.password):
+                state = load_state(base_dir)
+            if args.manifest and args.command == "process":
+                devices = load_manifest(Path(args.manifest), args.type)
+            else:
+                devices = [(d["device"], d["type"]) for d in state.get("devices", [])]
+            password = args.password or state.get("password") or ""
+            if not password:
+                raise ValueError("Geen batch-wachtwoord (geef --password mee).")
+            if not args.engine and state.get("engine"):
+                engine = state["engine"]
+            reports.append(_summary(phase_process(base_dir, devices, engine, password, args.workers)))
+    except (ValueError, OSError) as e:
+        print(f"voica1_cli: {e}", file=sys.stderr)
+        return 2
+
+    report: Dict[str, Any] = reports[0] if len(reports) == 1 else {"phases": reports}
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.report:
+        Path(args.report).write_text(text, encoding="utf-8")
+    else:
+        print(text)
+
+    return 1 if any(r.get("failed") for r in reports) else 0
+
+
+if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()
+    sys.exit(main())
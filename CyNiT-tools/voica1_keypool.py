@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+voica1_keypool.py
+
+Optionele achtergrond-pool met vooraf gegenereerde RSA private keys voor VOICA1.
+
+- Per key_size worden N keys klaargezet in een pool-map (versleuteld op schijf).
+- Een lage-prioriteit worker (1 apart proces) vult de pool bij.
+- voica1 neemt een key met take(); is de pool leeg -> None (dan on-demand genereren).
+
+Config (config/voica1.json):
+
+    "key_pool": {
+      "enabled": true,
+      "depth": 10,
+      "key_sizes": [2048],
+      "dir": "keypool",
+      "refill_interval": 5
+    }
+
+Wachtwoord voor de pool: key_pool.passphrase, env VOICA1_KEYPOOL_PASSPHRASE,
+of een random wachtwoord per proces. In dat laatste geval krijgt elk proces
+(gunicorn workers, voica1_cli) een eigen submap <dir>/proc-<pid>, zodat het
+de keys van een ander proces niet weggooit; mappen van gestopte processen
+worden opgeruimd.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import shutil
+import sys
+import time
+import uuid
+import secrets
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger("voica1")
+
+PASSPHRASE_ENV = "VOICA1_KEYPOOL_PASSPHRASE"
+
+_PROC_DIR_RE = re.compile(r"^proc-(\d+)$")
+
+
+def _lower_priority() -> None:
+    """Initializer voor het worker-proces: zo laag mogelijke CPU-prioriteit."""
+    try:
+        if sys.platform.startswith("win"):
+            import ctypes
+            IDLE_PRIORITY_CLASS = 0x00000040
+            kernel32 = ctypes.windll.kernel32  # type: ignore[attr-defined]
+            kernel32.SetPriorityClass(kernel32.GetCurrentProcess(), IDLE_PRIORITY_CLASS)
+        else:
+            os.nice(19)
+    except Exception:
+        pass
+
+
+def _generate_encrypted_key(key_size: int, passphrase: bytes) -> bytes:
+    """Draait in het worker-proces; de key verlaat het proces enkel versleuteld."""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=int(key_size))
+    return private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.BestAvailableEncryption(passphrase),
+    )
+
+
+class KeyPool:
+    def __init__(
+        self,
+        pool_dir: Path,
+        key_sizes: Iterable[int],
+        depth: int,
+        passphrase: bytes,
+        refill_interval: float = 5.0,
+        purge_on_start: bool = False,
+    ) -> None:
+        self.pool_dir = Path(pool_dir)
+        self.key_sizes: List[int] = sorted({int(k) for k in key_sizes})
+        self.depth = max(0, int(depth))
+        self.refill_interval = max(0.5, float(refill_interval))
+        self._passphrase = passphrase
+        self._purge_on_start = purge_on_start
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # statistieken (voor /metrics)
+        self.generated_total: Dict[int, int] = {k: 0 for k in self.key_sizes}
+        self.taken_total: Dict[int, int] = {k: 0 for k in self.key_sizes}
+        self.misses_total: Dict[int, int] = {k: 0 for k in self.key_sizes}
+        self.refill_rate: Dict[int, float] = {k: 0.0 for k in self.key_sizes}  # keys/sec
+
+    # ---------- opslag ----------
+
+    def _size_dir(self, key_size: int) -> Path:
+        d = self.pool_dir / str(int(key_size))
+        d.mkdir(parents=True, exist_ok=True)
+        return d
+
+    def _entries(self, key_size: int) -> List[Path]:
+        return sorted(self._size_dir(key_size).glob("*.pem"))
+
+    def depth_of(self, key_size: int) -> int:
+        return len(self._entries(key_size))
+
+    # ---------- gebruik ----------
+
+    def take(self, key_size: int) -> Optional[bytes]:
+        """
+        Neemt één key uit de pool en geeft hem terug als onversleutelde PEM
+        (TraditionalOpenSSL, zelfde formaat als py_create_key_and_csr).
+        None als de pool leeg is.
+        """
+        from cryptography.hazmat.primitives import serialization
+
+        key_size = int(key_size)
+        if key_size not in self.key_sizes:
+            return None
+
+        with self._lock:
+            for path in self._entries(key_size):
+                claimed = path.with_suffix(".taking")
+                try:
+                    os.replace(path, claimed)
+                except OSError:
+                    continue
+                try:
+                    data = claimed.read_bytes()
+                    key = serialization.load_pem_private_key(data, password=self._passphrase)
+                except Exception as e:
+                    logger.debug("[VOICA1] keypool: onbruikbare key %s weggegooid (%s)", path.name, e)
+                    continue
+                finally:
+                    try:
+                        claimed.unlink()
+                    except OSError:
+                        pass
+
+                self.taken_total[key_size] += 1
+                self._wake.set()
+                return key.private_bytes(
+                    encoding=serialization.Encoding.PEM,
+                    format=serialization.PrivateFormat.TraditionalOpenSSL,
+                    encryption_algorithm=serialization.NoEncryption(),
+                )
+
+            self.misses_total[key_size] += 1
+            self._wake.set()
+            return None
+
+    # ---------- achtergrond refill ----------
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        if self._purge_on_start:
+            # random wachtwoord per proces: bestaande keys zijn niet meer te openen
+            for key_size in self.key_sizes:
+                for p in self._size_dir(key_size).iterdir():
+                    try:
+                        p.unlink()
+                    except OSError:
+                        pass
+            self._purge_on_start = False
+        self._thread = threading.Thread(target=self._run, name="voica1-keypool", daemon=True)
+        self._thread.start()
+        logger.info(
+            "[VOICA1] keypool gestart: dir=%s sizes=%r depth=%d",
+            self.pool_dir, self.key_sizes, self.depth,
+        )
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self) -> None:
+        try:
+            executor = ProcessPoolExecutor(max_workers=1, initializer=_lower_priority)
+        except Exception as e:
+            logger.warning("[VOICA1] keypool: worker-proces niet beschikbaar (%s)", e)
+            return
+
+        try:
+            while not self._stop.is_set():
+                for key_size in self.key_sizes:
+                    while not self._stop.is_set() and self.depth_of(key_size) < self.depth:
+                        t0 = time.perf_counter()
+                        try:
+                            pem = executor.submit(_generate_encrypted_key, key_size, self._passphrase).result()
+                        except RuntimeError:
+                            # executor afgesloten (interpreter shutdown)
+                            return
+                        except Exception as e:
+                            logger.warning("[VOICA1] keypool: generatie faalde (%s)", e)
+                            self._stop.wait(self.refill_interval)
+                            break
+                        dt = max(time.perf_counter() - t0, 1e-6)
+
+                        target = self._size_dir(key_size) / f"{uuid.uuid4().hex}.pem"
+                        tmp = target.with_suffix(".tmp")
+                        tmp.write_bytes(pem)
+                        os.replace(tmp, target)
+
+                        with self._lock:
+                            self.generated_total[key_size] += 1
+                            # exponentieel gemiddelde van de refill-snelheid
+                            rate = 1.0 / dt
+                            prev = self.refill_rate[key_size]
+                            self.refill_rate[key_size] = rate if prev == 0 else (0.7 * prev + 0.3 * rate)
+
+                self._wake.wait(self.refill_interval)
+                self._wake.clear()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    # ---------- metrics ----------
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            str(k): {
+                "depth": self.depth_of(k),
+                "target_depth": self.depth,
+                "generated_total": self.generated_total[k],
+                "taken_total": self.taken_total[k],
+                "misses_total": self.misses_total[k],
+                "refill_rate": round(self.refill_rate[k], 4),
+            }
+            for k in self.key_sizes
+        }
+
+    def metrics_lines(self) -> List[str]:
+        stats = self.stats()
+        lines: List[str] = []
+        for name, help_txt, mtype, field in [
+            ("cynit_voica1_keypool_depth", "Aantal klaarstaande keys in de pool.", "gauge", "depth"),
+            ("cynit_voica1_keypool_target_depth", "Gewenste pool-diepte per key_size.", "gauge", "target_depth"),
+            ("cynit_voica1_keypool_generated_total", "Door de pool gegenereerde keys.", "counter", "generated_total"),
+            ("cynit_voica1_keypool_taken_total", "Uit de pool genomen keys.", "counter", "taken_total"),
+            ("cynit_voica1_keypool_misses_total", "Pool leeg bij aanvraag (on-demand fallback).", "counter", "misses_total"),
+            ("cynit_voica1_keypool_refill_rate", "Refill-snelheid (keys per seconde).", "gauge", "refill_rate"),
+        ]:
+            lines.append(f"# HELP {name} {help_txt}")
+            lines.append(f"# TYPE {name} {mtype}")
+            for size, st in stats.items():
+                lines.append(f'{name}{{key_size="{size}"}} {st[field]}')
+            lines.append("")
+        return lines
+
+
+def _pid_alive(pid: int) -> bool:
+    if sys.platform.startswith("win"):
+        return True  # os.kill(pid, 0) is geen probe op Windows: niets opruimen
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+def _remove_dead_process_dirs(pool_dir: Path) -> None:
+    """Ruimt proc-<pid> mappen op van processen die niet meer draaien."""
+    if not pool_dir.is_dir():
+        return
+    for d in pool_dir.iterdir():
+        m = _PROC_DIR_RE.match(d.name)
+        if m and d.is_dir() and int(m.group(1)) != os.getpid() and not _pid_alive(int(m.group(1))):
+            shutil.rmtree(d, ignore_errors=True)
+
+
+def from_config(cfg: Dict[str, Any], base_dir: Path, default_key_size: int) -> Optional[KeyPool]:
+    """Bouwt een KeyPool uit voica1.json -> key_pool. None als uitgeschakeld."""
+    if not isinstance(cfg, dict) or not cfg.get("enabled"):
+        return None
+
+    sizes = cfg.get("key_sizes") or [default_key_size]
+    try:
+        sizes = [int(s) for s in sizes]
+    except Exception:
+        sizes = [int(default_key_size)]
+
+    pool_dir = Path(cfg.get("dir") or "keypool")
+    if not pool_dir.is_absolute():
+        pool_dir = base_dir / pool_dir
+
+    passphrase = cfg.get("passphrase") or os.environ.get(PASSPHRASE_ENV)
+    ephemeral = not passphrase
+    if ephemeral:
+        # random wachtwoord: enkel dit proces kan de keys openen -> eigen map
+        passphrase = secrets.token_urlsafe(32)
+        _remove_dead_process_dirs(pool_dir)
+        pool_dir = pool_dir / f"proc-{os.getpid()}"
+
+    try:
+        depth = int(cfg.get("depth", 10))
+    except Exception:
+        depth = 10
+    try:
+        interval = float(cfg.get("refill_interval", 5))
+    except Exception:
+        interval = 5.0
+
+    return KeyPool(
+        pool_dir=pool_dir,
+        key_sizes=sizes,
+        depth=depth,
+        passphrase=str(passphrase).encode("utf-8"),
+        refill_interval=interval,
+        purge_on_start=ephemeral,
+    )
@@ -1,7 +1,9 @@
 import os
 import pathlib
 import subprocess
+import sys
 import threading
+import time
 import uuid
 import yt_dlp
 
@@ -14,8 +16,20 @@ from flask import (
     render_template_string,
     jsonify,
     flash,
+    Response,
 )
 
+# ====== PAD FIX ====== (cynit_metrics staat in CyNiT-tools)
+_PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+for _root in [_PROJECT_ROOT / "CyNiT-tools", _PROJECT_ROOT]:
+    if _root.exists() and str(_root) not in sys.path:
+        sys.path.insert(0, str(_root))
+
+import cynit_metrics
+
+from jobs import JobQueue, JobQueueFull
+from uploads import CHUNK_SIZE, UploadError, UploadStore
+
 # === Basisconfig ===
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 UPLOAD_FOLDER = os.path.join(BASE_DIR, "uploads")
@@ -26,12 +40,31 @@ os.makedirs(DEFAULT_OUTPUT_FOLDER, exist_ok=True)
 
 ALLOWED_EXTENSIONS = {"mp4", "mkv", "mov", "avi", "webm", "flv"}
 
+# Begrenzing: geheugen, schijf en CPU blijven begrensd bij aanhoudend gebruik
+JOB_WORKERS = 2              # gelijktijdige ffmpeg-conversies
+JOB_MAX_QUEUED = 20          # daarboven: "wachtrij vol"
+JOB_TTL = 6 * 3600           # afgewerkte jobs vergeten na 6 uur
+UPLOAD_TTL = 24 * 3600       # achtergelaten uploads opruimen na 24 uur
+JANITOR_INTERVAL = 300       # opruimronde elke 5 minuten
+MAX_UPLOAD_SIZE = 4 * 1024 ** 3  # max. 4 GB per video (formulier én chunked upload)
+
 app = Flask(__name__)
 app.secret_key = "change-me-to-a-random-string"
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_SIZE
+cynit_metrics.init_app(app)  # per-route latency/status + ffmpeg-calls voor /metrics
+
+# Job-queue: vaste pool workers, state bewaard over herstarts heen
+JOBS = JobQueue(
+    pathlib.Path(BASE_DIR) / "app_jobs.json",
+    workers=JOB_WORKERS,
+    max_queued=JOB_MAX_QUEUED,
+    ttl=JOB_TTL,
+)
 
-# Eenvoudige job-tracker in geheugen
-JOBS = {}
+# Chunked / hervatbare uploads (uploads/<upload_id>/...)
+UPLOADS = UploadStore(pathlib.Path(UPLOAD_FOLDER), max_size=MAX_UPLOAD_SIZE)
+_UPLOAD_JOB_LOCK = threading.Lock()
 
 
 # === Helpers ===
@@ -39,12 +72,13 @@ def allowed_file(filename: str) -> bool:
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
-def extract_audio_to_mp3(video_path: str, output_folder: str) -> str:
+def extract_audio_to_mp3(video_path: str, output_folder: str, filename: str = None) -> str:
     """
     Neemt een videobestand en maakt er een MP3 van in output_folder.
+    filename = originele naam (voor de MP3), standaard de naam van video_path.
     Returnt de bestandsnaam van de MP3.
     """
-    video_name = pathlib.Path(video_path).name
+    video_name = filename or pathlib.Path(video_path).name
     stem = pathlib.Path(video_name).stem
     mp3_name = f"{stem}.mp3"
     mp3_path = os.path.join(output_folder, mp3_name)
@@ -64,24 +98,200 @@ def extract_audio_to_mp3(video_path: str, output_folder: str) -> str:
         mp3_path,
     ]
 
-    subprocess.run(cmd, check=True)
+    with cynit_metrics.track_dependency("ffmpeg", env="extract", sent=os.path.getsize(video_path)) as call:
+        subprocess.run(cmd, check=True)
+        call.received = os.path.getsize(mp3_path)
+    return mp3_name
+
+
+def extract_audio_stream_to_mp3(chunks, filename: str, output_folder: str) -> str:
+    """
+    Zelfde als extract_audio_to_mp3, maar ffmpeg leest de video via stdin
+    (chunks = iterator van bytes, bv. een upload die nog binnenkomt).
+    """
+    stem = pathlib.Path(filename).stem
+    mp3_name = f"{stem}.mp3"
+    mp3_path = os.path.join(output_folder, mp3_name)
+
+    os.makedirs(output_folder, exist_ok=True)
+
+    cmd = [
+        "ffmpeg",
+        "-y",
+        "-i",
+        "pipe:0",
+        "-vn",
+        "-acodec",
+        "libmp3lame",
+        "-q:a",
+        "2",
+        mp3_path,
+    ]
+
+    feed_error = []
+    fed = [0]
+
+    def feed():
+        try:
+            for chunk in chunks:
+                proc.stdin.write(chunk)
+                fed[0] += len(chunk)
+        except BrokenPipeError:
+            pass
+        except Exception as e:
+            feed_error.append(e)
+        finally:
+            try:
+                proc.stdin.close()
+            except OSError:
+                pass
+
+    with cynit_metrics.track_dependency("ffmpeg", env="extract_stream") as call:
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+        feeder = threading.Thread(target=feed, daemon=True)
+        feeder.start()
+        rc = proc.wait()
+        feeder.join()
+        call.sent = fed[0]
+        if feed_error:
+            raise feed_error[0]
+        if rc != 0:
+            raise subprocess.CalledProcessError(rc, cmd)
+        call.received = os.path.getsize(mp3_path)
     return mp3_name
 
 
-def run_job(job_id: str, video_path: str, output_folder: str):
+def _remove_upload_file(video_path: str) -> None:
+    """Verwijdert een geüploade video (enkel binnen UPLOAD_FOLDER)."""
+    try:
+        p = pathlib.Path(video_path).resolve()
+        if pathlib.Path(UPLOAD_FOLDER).resolve() in p.parents and p.is_file():
+            p.unlink()
+    except OSError:
+        pass
+
+
+def run_job(job, video_path: str, output_folder: str, cleanup: bool = True, filename: str = None):
     """
-    Draait in aparte thread: doet de conversie en update JOBS-status.
+    Draait in een worker van de job-queue: doet de conversie.
+    De geüploade video (uniek pad per job) wordt nadien verwijderd; de MP3 blijft staan.
     """
-    job = JOBS[job_id]
-    job["status"] = "running"
+    name = filename or pathlib.Path(video_path).name
+    job.item(name, status="running")
     try:
-        mp3_name = extract_audio_to_mp3(video_path, output_folder)
-        job["status"] = "done"
-        job["mp3_name"] = mp3_name
-        job["output_folder"] = output_folder
-    except Exception as e:
-        job["status"] = "error"
-        job["error"] = str(e)
+        mp3_name = extract_audio_to_mp3(video_path, output_folder, filename=name)
+    finally:
+        if cleanup:
+            _remove_upload_file(video_path)
+    job.item(name, status="done")
+    return {"mp3_name": mp3_name, "output_folder": output_folder}
+
+
+def run_upload_job(job, upload_id: str, output_folder: str):
+    """
+    Job voor een chunked upload: is de upload al volledig, dan gewoon vanaf
+    schijf; anders leest ffmpeg mee terwijl de rest nog binnenkomt.
+    """
+    up = UPLOADS.get(upload_id)
+    if up is None:
+        raise RuntimeError("Upload niet gevonden")
+    try:
+        if up.complete:
+            return run_job(job, str(up.path), output_folder, cleanup=False)
+
+        name = up.meta["filename"]
+        job.item(name, status="streaming")
+        try:
+            mp3_name = extract_audio_stream_to_mp3(UPLOADS.iter_growing(up), name, output_folder)
+        except Exception as e:
+            # lopende upload stopzetten; de janitor ruimt de map later op
+            UPLOADS.update(up, failed=f"Conversie mislukt: {e}")
+            raise
+        job.item(name, status="done")
+        return {"mp3_name": mp3_name, "output_folder": output_folder}
+    finally:
+        if up.complete:
+            UPLOADS.discard(upload_id)
+
+
+def _maybe_start_upload_job(up):
+    """Start de extractie zodra de upload volledig is, of vroeger als het formaat dat toelaat."""
+    with _UPLOAD_JOB_LOCK:
+        if up.meta.get("job_id") or not UPLOADS.can_start_early(up):
+            return up.meta.get("job_id")
+        # force: de upload werd al aanvaard, dus niet meer weigeren
+        job_id = JOBS.submit(
+            "extract_upload",
+            {"upload_id": up.id, "output_folder": up.meta["output_folder"]},
+            force=True,
+        )
+        UPLOADS.update(up, job_id=job_id)
+        return job_id
+
+
+def _path_age(p: pathlib.Path) -> float:
+    """Seconden sinds de laatste wijziging (voor mappen: jongste bestand erin)."""
+    try:
+        mtimes = [p.stat().st_mtime]
+        if p.is_dir():
+            mtimes += [c.stat().st_mtime for c in p.iterdir()]
+        return time.time() - max(mtimes)
+    except OSError:
+        return 0.0
+
+
+def cleanup_once() -> dict:
+    """Eén opruimronde: verlopen jobs + achtergelaten uploads."""
+    evicted = JOBS.evict_expired()
+
+    active = set()
+    for params in JOBS.active_params():
+        if params.get("upload_id"):
+            active.add(params["upload_id"])
+        if params.get("video_path"):
+            active.add(pathlib.Path(params["video_path"]).name)
+
+    removed = 0
+    for entry in pathlib.Path(UPLOAD_FOLDER).iterdir():
+        if entry.name in active or _path_age(entry) < UPLOAD_TTL:
+            continue
+        if entry.is_dir():
+            UPLOADS.discard(entry.name)
+        else:
+            try:
+                entry.unlink()
+            except OSError:
+                continue
+        removed += 1
+
+    if evicted or removed:
+        app.logger.info("[CLEANUP] %d job(s) vergeten, %d upload(s) verwijderd", len(evicted), removed)
+    return {"jobs_evicted": len(evicted), "uploads_removed": removed}
+
+
+def _janitor():
+    while True:
+        time.sleep(JANITOR_INTERVAL)
+        try:
+            cleanup_once()
+        except Exception as e:
+            app.logger.error("[CLEANUP] mislukt: %s", e)
+
+
+def _uploads_usage() -> dict:
+    count = 0
+    total = 0
+    for p in pathlib.Path(UPLOAD_FOLDER).rglob("*"):
+        if p.is_file():
+            count += 1
+            total += p.stat().st_size
+    return {"files": count, "bytes": total}
+
+
+JOBS.register("extract", run_job)
+JOBS.register("extract_upload", run_upload_job)
+JOBS.start()
+threading.Thread(target=_janitor, name="sp-yt-janitor", daemon=True).start()
 
 
 # === HTML template met CyNiT theme ===
@@ -312,7 +522,7 @@ INDEX_HTML = """
                     {% endwith %}
                 </div>
 
-                <form method="post" enctype="multipart/form-data" action="{{ url_for('convert') }}">
+                <form method="post" enctype="multipart/form-data" action="{{ url_for('convert') }}" id="upload-form">
                     <label for="output_folder">Output map (op deze machine):</label>
                     <input type="text" id="output_folder" name="output_folder"
                            value="{{ default_output }}" placeholder="bv. D:\\Audio\\CyNiTExports">
@@ -329,10 +539,105 @@ INDEX_HTML = """
                     </button>
                 </form>
 
-                <div class="status-info">
+                <div class="status-info" id="upload-progress">
                     De conversie gebeurt lokaal met ffmpeg. Afhankelijk van de lengte van de video kan dit even duren.
                 </div>
 
+                <script>
+                    // Chunked upload (hervatbaar); zonder JS/fetch valt het formulier terug op /convert
+                    (function () {
+                        const form = document.getElementById("upload-form");
+                        if (!form || !window.fetch || !window.File || !File.prototype.slice) return;
+
+                        const CHUNK = {{ chunk_size }};
+                        const uploadsUrl = "{{ url_for('upload_create') }}";
+                        const indexUrl = "{{ url_for('index') }}";
+                        const label = document.getElementById("upload-progress");
+                        const sleep = (ms) => new Promise((r) => setTimeout(r, ms));
+
+                        async function sha256hex(buf) {
+                            if (!(window.crypto && crypto.subtle)) return null;
+                            const d = await crypto.subtle.digest("SHA-256", buf);
+                            return Array.from(new Uint8Array(d)).map((b) => b.toString(16).padStart(2, "0")).join("");
+                        }
+
+                        async function currentOffset(id) {
+                            const r = await fetch(uploadsUrl + "/" + id, { cache: "no-store" });
+                            if (!r.ok) return null;
+                            return await r.json();
+                        }
+
+                        form.addEventListener("submit", async function (ev) {
+                            const file = document.getElementById("file").files[0];
+                            if (!file) return;
+                            ev.preventDefault();
+
+                            const key = "cynit-upload:" + file.name + ":" + file.size + ":" + file.lastModified;
+                            try {
+                                let up = null;
+                                const saved = localStorage.getItem(key);
+                                if (saved) up = await currentOffset(saved);
+                                if (!up || up.complete) {
+                                    const r = await fetch(uploadsUrl, {
+                                        method: "POST",
+                                        headers: { "Content-Type": "application/json" },
+                                        body: JSON.stringify({
+                                            filename: file.name,
+                                            size: file.size,
+                                            output_folder: document.getElementById("output_folder").value,
+                                        }),
+                                    });
+                                    up = await r.json();
+                                    if (!r.ok) throw new Error(up.error || ("HTTP " + r.status));
+                                    localStorage.setItem(key, up.upload_id);
+                                }
+
+                                let offset = up.offset;
+                                let jobId = up.job_id;
+                                let failures = 0;
+                                while (offset < file.size) {
+                                    const buf = await file.slice(offset, offset + CHUNK).arrayBuffer();
+                                    const headers = { "Content-Type": "application/octet-stream" };
+                                    const sum = await sha256hex(buf);
+                                    if (sum) headers["X-Chunk-SHA256"] = sum;
+                                    try {
+                                        const r = await fetch(uploadsUrl + "/" + up.upload_id + "?offset=" + offset, {
+                                            method: "PUT", headers: headers, body: buf,
+                                        });
+                                        const data = await r.json();
+                                        if (!r.ok) {
+                                            if (data.offset != null && r.status < 500 && r.status !== 413) {
+                                                offset = data.offset;
+                                                if (++failures > 5) throw new Error(data.error);
+                                                continue;
+                                            }
+                                            throw new Error(data.error || ("HTTP " + r.status));
+                                        }
+                                        failures = 0;
+                                        offset = data.offset;
+                                        jobId = data.job_id || jobId;
+                                    } catch (e) {
+                                        if (++failures > 5) throw e;
+                                        await sleep(1000 * failures);
+                                        const st = await currentOffset(up.upload_id).catch(() => null);
+                                        if (st) offset = st.offset;
+                                    }
+                                    label.textContent = "Upload: " + Math.floor(offset * 100 / file.size) + "%" +
+                                        (jobId ? " · conversie loopt al mee" : "");
+                                }
+                                localStorage.removeItem(key);
+                                if (!jobId) {
+                                    const st = await currentOffset(up.upload_id);
+                                    jobId = st && st.job_id;
+                                }
+                                window.location = indexUrl + "?job=" + encodeURIComponent(jobId);
+                            } catch (e) {
+                                label.textContent = "Upload onderbroken (" + e.message + "). Kies hetzelfde bestand opnieuw om te hervatten.";
+                            }
+                        });
+                    })();
+                </script>
+
                 <div class="footer">
                     <span class="cynit">CyNiT</span>
                     <span>Focus. Automate. Repeat.</span>
@@ -437,10 +742,12 @@ INDEX_HTML = """
 # === Routes ===
 @app.route("/", methods=["GET"])
 def index():
+    job_id = request.args.get("job")
     return render_template_string(
         INDEX_HTML,
-        job_id=None,
+        job_id=job_id if job_id and JOBS.get(job_id) else None,
         default_output=DEFAULT_OUTPUT_FOLDER,
+        chunk_size=CHUNK_SIZE,
     )
 
 
@@ -455,6 +762,10 @@ def convert():
     if not os.path.isabs(output_folder):
         output_folder = os.path.join(BASE_DIR, output_folder)
 
+    if JOBS.is_full():
+        flash("De wachtrij is vol, probeer het straks opnieuw.")
+        return redirect(url_for("index"))
+
     file = request.files.get("file")
     if not file or file.filename == "":
         flash("Geen videobestand geselecteerd.")
@@ -466,33 +777,109 @@ def convert():
         flash("Bestandstype niet ondersteund. Gebruik mp4, mkv, mov, avi, webm of flv.")
         return redirect(url_for("index"))
 
-    # Opslaan in uploads
-    video_path = os.path.join(UPLOAD_FOLDER, filename)
+    # Opslaan in uploads, onder een uniek pad: twee uploads met dezelfde naam
+    # mogen elkaars bestand niet overschrijven of opruimen
+    video_path = os.path.join(UPLOAD_FOLDER, f"{uuid.uuid4().hex}_{filename}")
     file.save(video_path)
 
-    # Job aanmaken
-    job_id = str(uuid.uuid4())
-    JOBS[job_id] = {
-        "status": "pending",
-        "video_path": video_path,
-        "output_folder": output_folder,
-        "mp3_name": None,
-        "error": None,
-    }
-
-    # Thread starten
-    t = threading.Thread(
-        target=run_job,
-        args=(job_id, video_path, output_folder),
-        daemon=True,
-    )
-    t.start()
+    # Job inplannen
+    try:
+        job_id = JOBS.submit(
+            "extract",
+            {"video_path": video_path, "output_folder": output_folder, "filename": filename},
+        )
+    except JobQueueFull:
+        _remove_upload_file(video_path)
+        flash("De wachtrij is vol, probeer het straks opnieuw.")
+        return redirect(url_for("index"))
 
     # Render zelfde template maar in 'progress mode'
     return render_template_string(
         INDEX_HTML,
         job_id=job_id,
         default_output=DEFAULT_OUTPUT_FOLDER,
+        chunk_size=CHUNK_SIZE,
+    )
+
+
+def _resolve_output_folder(value) -> str:
+    output_folder = (value or "").strip() or DEFAULT_OUTPUT_FOLDER
+    if not os.path.isabs(output_folder):
+        output_folder = os.path.join(BASE_DIR, output_folder)
+    return output_folder
+
+
+def _upload_error(e: UploadError):
+    return jsonify({"error": str(e), "offset": e.offset}), e.status
+
+
+@app.route("/uploads", methods=["POST"])
+def upload_create():
+    """Nieuwe chunked upload: JSON {filename, size, sha256?, output_folder?}."""
+    data = request.get_json(silent=True) or {}
+    if JOBS.is_full():
+        return jsonify({"error": "De wachtrij is vol, probeer het straks opnieuw."}), 503
+    filename = pathlib.Path(str(data.get("filename") or "")).name
+    if not allowed_file(filename):
+        return jsonify({"error": "Bestandstype niet ondersteund. Gebruik mp4, mkv, mov, avi, webm of flv."}), 400
+    try:
+        size = int(data.get("size") or 0)
+        up = UPLOADS.create(
+            filename,
+            size,
+            sha256=data.get("sha256"),
+            output_folder=_resolve_output_folder(data.get("output_folder")),
+        )
+    except (ValueError, TypeError):
+        return jsonify({"error": "Ongeldige bestandsgrootte"}), 400
+    except UploadError as e:
+        return _upload_error(e)
+    return jsonify(up.status()), 201
+
+
+@app.route("/uploads/<upload_id>", methods=["GET", "HEAD"])
+def upload_status(upload_id):
+    up = UPLOADS.get(upload_id)
+    if up is None:
+        return jsonify({"error": "Upload niet gevonden"}), 404
+    return jsonify(up.status())
+
+
+@app.route("/uploads/<upload_id>", methods=["PUT", "PATCH"])
+def upload_chunk(upload_id):
+    """Eén chunk op ?offset=N (body = ruwe bytes, optioneel header X-Chunk-SHA256)."""
+    up = UPLOADS.get(upload_id)
+    if up is None:
+        return jsonify({"error": "Upload niet gevonden"}), 404
+    try:
+        offset = int(request.args.get("offset", request.headers.get("Upload-Offset", "")))
+    except ValueError:
+        return jsonify({"error": "offset ontbreekt", "offset": up.offset}), 400
+
+    try:
+        new_offset = UPLOADS.write_chunk(
+            up,
+            offset,
+            request.stream,
+            request.content_length,
+            request.headers.get("X-Chunk-SHA256"),
+        )
+    except UploadError as e:
+        return _upload_error(e)
+
+    job_id = _maybe_start_upload_job(up)
+    return jsonify({"offset": new_offset, "complete": up.complete, "job_id": job_id})
+
+
+@app.route("/status")
+def status_overview():
+    """Overzicht: wachtrij (diepte, lopend), jobs en schijfgebruik van uploads."""
+    return jsonify(
+        {
+            "queue": JOBS.stats(),
+            "jobs": JOBS.list(),
+            "uploads": _uploads_usage(),
+        }
     )
 
 
@@ -504,22 +891,44 @@ def job_status(job_id):
 
     # Als klaar en download_url nog niet teruggegeven → uitrekenen
     download_url = None
-    if job["status"] == "done" and job.get("mp3_name"):
+    result = job.get("result") or {}
+    if job["status"] == "done" and result.get("mp3_name"):
         download_url = url_for(
             "download_file",
-            filename=job["mp3_name"],
-            folder=job["output_folder"],
+            filename=result["mp3_name"],
+            folder=result["output_folder"],
         )
 
     return jsonify(
         {
-            "status": job["status"],
+            "status": "pending" if job["status"] == "queued" else job["status"],
             "error": job.get("error"),
             "download_url": download_url,
         }
     )
 
 
+@app.route("/jobs/<job_id>")
+def job_detail(job_id):
+    """Volledige job-status als JSON, of als Server-Sent Events met ?stream=1."""
+    job = JOBS.get(job_id)
+    if not job:
+        return jsonify({"status": "unknown", "error": "Job niet gevonden"}), 404
+    if request.args.get("stream") == "1" or "text/event-stream" in (request.headers.get("Accept") or ""):
+        return Response(
+            JOBS.stream_events(job_id),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+    return jsonify(job)
+
+
+@app.route("/metrics")
+def metrics():
+    """Prometheus metrics: requests per route + ffmpeg-calls (duur, fouten, bytes)."""
+    return cynit_metrics.REGISTRY.expose(), 200, {"Content-Type": "text/plain; version=0.0.4"}
+
+
 @app.route("/download/<path:filename>")
 def download_file(filename):
     folder = request.args.get("folder", DEFAULT_OUTPUT_FOLDER)
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+archive.py - download-archief / dedup-index voor SP-YT
+
+Persistente index (yt_archive.json) van alles wat al gedownload is, gekeyed op
+YouTube video-ID, met content-hash van het resulterende bestand:
+
+    {"version": 1, "videos": {"<id>": {"url", "path", "hash", "title", "artist", "mode", "added"}}}
+
+- URLs waarvan de ID al in het archief zit (en het bestand nog bestaat) worden
+  meteen overgeslagen, zonder netwerkverkeer
+- zelfde inhoud onder een andere ID (re-upload) -> bestaand bestand hergebruiken
+- naamconflicten krijgen een deterministisch achtervoegsel: 'Artist - Titel [<id>].ext'
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+import time
+import logging
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+log = logging.getLogger("cynit-yt")
+
+ARCHIVE_VERSION = 1
+
+_ID_RE = re.compile(r"^[A-Za-z0-9_-]{11}$")
+
+
+def video_id_from_url(url: str) -> Optional[str]:
+    """YouTube video-ID uit een URL (watch, youtu.be, shorts, embed, live); None als onbekend."""
+    url = (url or "").strip()
+    if _ID_RE.match(url):
+        return url
+    try:
+        p = urlparse(url if "://" in url else "https://" + url)
+    except ValueError:
+        return None
+    host = (p.hostname or "").lower()
+    candidate: Optional[str] = None
+    if host.endswith("youtu.be"):
+        candidate = p.path.strip("/").split("/")[0]
+    elif host.endswith("youtube.com") or host.endswith("youtube-nocookie.com"):
+        if p.path == "/watch":
+            candidate = (parse_qs(p.query).get("v") or [None])[0]
+        else:
+            parts = [x for x in p.path.split("/") if x]
+            if len(parts) >= 2 and parts[0] in ("shorts", "embed", "live", "v"):
+                candidate = parts[1]
+    if candidate and _ID_RE.match(candidate):
+        return candidate
+    return None
+
+
+def reserve_path(path: Path) -> bool:
+    """Maakt `path` atomair aan als leeg placeholder-bestand (O_EXCL); False als het al bestaat."""
+    try:
+        fd = os.open(str(path), os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+    except FileExistsError:
+        return False
+    os.close(fd)
+    return True
+
+
+def release_path(path: Optional[Path]) -> None:
+    """Ruimt een niet-gebruikte reservering (leeg placeholder-bestand) op."""
+    if path is None:
+        return
+    try:
+        if path.stat().st_size == 0:
+            path.unlink()
+    except OSError:
+        pass
+
+
+class DownloadArchive:
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._lock = threading.RLock()
+        self._videos: Dict[str, Dict[str, Any]] = {}
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            if data.get("version") == ARCHIVE_VERSION:
+                self._videos = dict(data.get("videos") or {})
+        except Exception as e:
+            log.warning("[ARCHIVE] archief onleesbaar, begin leeg: %s", e)
+
+    def _save(self) -> None:
+        tmp = self.path.with_suffix(".tmp")
+        try:
+            tmp.write_text(
+                json.dumps({"version": ARCHIVE_VERSION, "videos": self._videos}, indent=1, ensure_ascii=False),
+                encoding="utf-8",
+            )
+            os.replace(tmp, self.path)
+        except Exception as e:
+            log.error("[ARCHIVE] archief niet opgeslagen: %s", e)
+
+    # ---------- opvragen ----------
+
+    def get(self, video_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Entry voor video_id, enkel als het bestand nog bestaat."""
+        if not video_id:
+            return None
+        with self._lock:
+            entry = self._videos.get(video_id)
+        if entry and Path(entry.get("path", "")).exists():
+            return dict(entry, video_id=video_id)
+        return None
+
+    def find_hash(self, digest: str, exclude_id: Optional[str] = None) -> Optional[Tuple[str, Dict[str, Any]]]:
+        with self._lock:
+            for vid, entry in self._videos.items():
+                if vid != exclude_id and entry.get("hash") == digest and Path(entry.get("path", "")).exists():
+                    return vid, dict(entry)
+        return None
+
+    def lookup(self, url: str) -> Dict[str, Any]:
+        vid = video_id_from_url(url)
+        entry = self.get(vid)
+        return {"url": url, "video_id": vid, "in_library": entry is not None, "entry": entry}
+
+    # ---------- schrijven ----------
+
+    def claim_path(self, path: Path, video_id: Optional[str]) -> Path:
+        """
+        Doelpad zonder stille overschrijving: is `path` al van een andere video
+        (of van een onbekend bestand), dan 'stem [<id>].ext'.
+        Het gekozen pad wordt onder de lock gereserveerd (leeg bestand, O_EXCL),
+        zodat parallelle workers nooit hetzelfde doel krijgen; release_path()
+        ruimt de reservering op als de download faalt.
+        """
+        if not video_id:
+            return path
+        fallback = path.with_name(f"{path.stem} [{video_id}]{path.suffix}")
+        with self._lock:
+            owner = next(
+                (vid for vid, e in self._videos.items() if Path(e.get("path", "")) == path),
+                None,
+            )
+            if owner == video_id:
+                return path
+            if owner is None and reserve_path(path):
+                return path
+            # '[<id>]' bestaat al: zelfde video, overschrijven mag
+            reserve_path(fallback)
+        return fallback
+
+    def add(
+        self,
+        video_id: str,
+        url: str,
+        path: Path,
+        digest: Optional[str],
+        title: Optional[str] = None,
+        artist: Optional[str] = None,
+        mode: str = "download",
+    ) -> None:
+        with self._lock:
+            self._videos[video_id] = {
+                "url": url,
+                "path": str(path),
+                "hash": digest,
+                "title": title,
+                "artist": artist,
+                "mode": mode,
+                "added": time.strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            self._save()
@@ -4,6 +4,18 @@ import time
 import subprocess
 from flask import Flask, request, render_template_string, jsonify
 import threading
+from pathlib import Path
+
+# ====== PAD FIX ====== (cynit_metrics staat in CyNiT-tools)
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent
+for _root in [_PROJECT_ROOT / "CyNiT-tools", _PROJECT_ROOT]:
+    if _root.exists() and str(_root) not in sys.path:
+        sys.path.insert(0, str(_root))
+
+import cynit_metrics
+
+from convert_pool import ConvertTask, ffprobe_for, run_conversions
+import encoder_profile
 
 # --- Tkinter voor folderselectie (lokaal) ---
 try:
@@ -14,13 +26,15 @@ except ImportError:
     filedialog = None
 
 app = Flask(__name__)
+cynit_metrics.init_app(app)  # per-route latency/status + ffmpeg-calls voor /metrics
 
 # ---------- Audio conversie helpers ----------
 
-def convert_to_mp3(input_file, output_file):
+def convert_to_mp3(input_file, output_file, threads=None):
     """
     Converteer één audio/video bestand naar .mp3 via ffmpeg.
     Ondersteunt bv. .m4a, .mp4, .webm, ... zolang ffmpeg het snapt.
+    threads: ffmpeg -threads (uit het encoder-profiel), None = ffmpeg default.
     """
     cmd = [
         "ffmpeg",
@@ -28,16 +42,20 @@ def convert_to_mp3(input_file, output_file):
         "-i", input_file,
         "-codec:a", "libmp3lame",
         "-q:a", "2",  # kwaliteit (0-9, lager = beter)
-        output_file,
     ]
+    if threads:
+        cmd += ["-threads", str(threads)]
+    cmd.append(output_file)
 
     try:
-        subprocess.run(
-            cmd,
-            check=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-        )
+        with cynit_metrics.track_dependency("ffmpeg", env="bmm", sent=os.path.getsize(input_file)) as call:
+            subprocess.run(
+                cmd,
+                check=True,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+            call.received = os.path.getsize(output_file)
         return True
     except subprocess.CalledProcessError:
         return False
@@ -79,13 +97,29 @@ def batch_convert(input_folder, output_folder):
     if not files:
         return result
 
-    for file in files:
-        input_path = os.path.join(input_folder, file)
-        output_name = file.rsplit(".", 1)[0] + ".mp3"
-        output_path = os.path.join(output_folder, output_name)
+    tasks = [
+        ConvertTask(
+            Path(input_folder) / file,
+            Path(output_folder) / (file.rsplit(".", 1)[0] + ".mp3"),
+        )
+        for file in files
+    ]
+
+    # parallel: N ffmpeg processen tegelijk (N/threads uit het encoder-profiel
+    # van bmm's eigen encode, anders N = aantal cores), 2 pogingen per bestand
+    workers, threads = encoder_profile.recommended("ffmpeg", encode="bmm")
+    run = run_conversions(
+        tasks,
+        lambda t: convert_to_mp3(str(t.input_path), str(t.output_path), threads),
+        workers=workers,
+        retries=2,
+        ffprobe_bin=ffprobe_for("ffmpeg"),
+    )
+    result["stats"] = run["stats"]
 
-        ok = convert_to_mp3(input_path, output_path)
-        if ok:
+    for r in run["results"]:
+        file = r["task"].input_path.name
+        if r["ok"]:
             result["converted"] += 1
             result["details"].append((file, "OK"))
         else:
@@ -382,6 +416,9 @@ PAGE_TEMPLATE = """
                     <div>Output: {{ result.output_folder }}</div>
                     <div>Gevonden bestanden (.m4a/.mp4/.webm): {{ result.files_found }}</div>
                     <div>Succesvol geconverteerd: {{ result.converted }}</div>
+                    {% if result.stats %}
+                    <div>Throughput: {{ result.stats.files_per_min }} bestanden/min · {{ result.stats.audio_sec_per_sec }} audio-s/s ({{ result.stats.workers }} workers)</div>
+                    {% endif %}
                 </div>
 
                 {% if result.details %}
@@ -492,6 +529,12 @@ def index():
     )
 
 
+@app.route("/metrics")
+def metrics():
+    """Prometheus metrics: requests per route + ffmpeg-calls (duur, fouten, bytes)."""
+    return cynit_metrics.REGISTRY.expose(), 200, {"Content-Type": "text/plain; version=0.0.4"}
+
+
 @app.route("/choose_folder", methods=["GET"])
 def choose_folder():
     kind = request.args.get("kind", "input")
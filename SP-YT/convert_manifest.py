@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+convert_manifest.py - incrementele conversie voor SP-YT batch_convert
+
+Per outputmap houdt een manifest (.cynit_convert_manifest.json) bij welke bron
+met welke instellingen naar welke mp3 geconverteerd werd:
+
+    {"version": 1, "files": {"<bronnaam>": {"size", "mtime_ns", "hash", "settings", "output"}}}
+
+Beslissing per bron (snel pad eerst):
+- geen output of andere instellingen  -> converteren
+- size + mtime_ns ongewijzigd          -> overslaan (geen file I/O behalve stat)
+- enkel mtime gewijzigd, hash gelijk   -> overslaan (manifest bijwerken)
+- anders                               -> converteren
+
+Een bestaande mp3 zonder manifest-entry die nieuwer is dan de bron wordt
+overgenomen (eerste run op een bestaande bibliotheek), zonder te hashen.
+
+file_hash cachet op (pad, size, mtime_ns): needs_convert, de loudnorm-meting
+en record() lezen een geconverteerde bron dus maar één keer volledig.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+from loudnorm import file_hash
+
+log = logging.getLogger("cynit-yt")
+
+MANIFEST_NAME = ".cynit_convert_manifest.json"
+MANIFEST_VERSION = 1
+
+
+class ConvertManifest:
+    def __init__(self, output_folder: Path, settings_key: str) -> None:
+        self.path = Path(output_folder) / MANIFEST_NAME
+        self.settings_key = settings_key
+        self._lock = threading.Lock()
+        self._files: Dict[str, Dict[str, Any]] = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            if data.get("version") == MANIFEST_VERSION:
+                self._files = dict(data.get("files") or {})
+        except Exception as e:
+            log.warning("[CONVERT] manifest onleesbaar, volledige run: %s", e)
+            self._files = {}
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            tmp = self.path.with_suffix(".tmp")
+            try:
+                tmp.write_text(
+                    json.dumps({"version": MANIFEST_VERSION, "files": self._files}, indent=1),
+                    encoding="utf-8",
+                )
+                os.replace(tmp, self.path)
+                self._dirty = False
+            except Exception as e:
+                log.error("[CONVERT] manifest niet opgeslagen: %s", e)
+
+    def needs_convert(self, src: Path, dst: Path) -> bool:
+        try:
+            st = src.stat()
+            dst_st = dst.stat()
+        except FileNotFoundError:
+            return True
+
+        entry = self._files.get(src.name)
+        if entry is None:
+            # bestaande bibliotheek: mp3 nieuwer dan bron -> overnemen
+            if dst_st.st_mtime_ns >= st.st_mtime_ns:
+                self._put(src.name, st, None, dst)
+                return False
+            return True
+
+        if entry.get("settings") != self.settings_key or entry.get("output") != dst.name:
+            return True
+        if entry.get("size") == st.st_size and entry.get("mtime_ns") == st.st_mtime_ns:
+            return False
+        if entry.get("size") != st.st_size or not entry.get("hash"):
+            return True
+
+        # enkel aangeraakt? inhoud vergelijken
+        try:
+            digest = file_hash(src)
+        except OSError:
+            return True
+        if digest != entry["hash"]:
+            return True
+        self._put(src.name, st, digest, dst)
+        return False
+
+    def record(self, src: Path, dst: Path) -> None:
+        """Na een geslaagde conversie."""
+        try:
+            st = src.stat()
+            digest: Optional[str] = file_hash(src)
+        except OSError as e:
+            log.warning("[CONVERT] manifest: kan %s niet lezen: %s", src.name, e)
+            return
+        self._put(src.name, st, digest, dst)
+
+    def prune(self, present: Iterable[str]) -> None:
+        """Verwijder entries van bronnen die niet meer bestaan."""
+        keep = set(present)
+        with self._lock:
+            gone = [k for k in self._files if k not in keep]
+            for k in gone:
+                del self._files[k]
+            if gone:
+                self._dirty = True
+
+    def _put(self, name: str, st: os.stat_result, digest: Optional[str], dst: Path) -> None:
+        with self._lock:
+            self._files[name] = {
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+                "hash": digest,
+                "settings": self.settings_key,
+                "output": dst.name,
+            }
+            self._dirty = True
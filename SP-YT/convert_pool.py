@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+convert_pool.py - parallelle ffmpeg conversie-engine voor SP-YT
+
+Gebruikt door yt.py en bmm.py (batch_convert):
+- N ffmpeg processen tegelijk (default = aantal cores)
+- retries per bestand (de conversiefunctie zelf doet de eigenlijke ffmpeg call)
+- resultaten in dezelfde volgorde als de input
+- throughput: bestanden/min en audio-seconden per seconde
+"""
+
+from __future__ import annotations
+
+import os
+import subprocess
+import time
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+log = logging.getLogger("cynit-yt")
+
+
+@dataclass
+class ConvertTask:
+    input_path: Path
+    output_path: Path
+
+
+def default_workers() -> int:
+    return max(1, os.cpu_count() or 1)
+
+
+def ffprobe_for(ffmpeg_bin: str) -> str:
+    """Leid het ffprobe pad af van het ffmpeg pad (zelfde map, zelfde extensie)."""
+    p = Path(ffmpeg_bin)
+    if p.parent != Path(".") and "ffmpeg" in p.name.lower():
+        return str(p.with_name(p.name.lower().replace("ffmpeg", "ffprobe")))
+    return "ffprobe"
+
+
+def ffprobe_duration(path: Path, ffprobe_bin: str = "ffprobe") -> Optional[float]:
+    """Duur van een audio/video bestand in seconden (None als onbekend)."""
+    try:
+        out = subprocess.run(
+            [
+                ffprobe_bin, "-v", "error",
+                "-show_entries", "format=duration",
+                "-of", "default=noprint_wrappers=1:nokey=1",
+                str(path),
+            ],
+            capture_output=True,
+            text=True,
+            timeout=30,
+        )
+        return float(out.stdout.strip())
+    except Exception:
+        return None
+
+
+def run_conversions(
+    tasks: List[ConvertTask],
+    convert_fn: Callable[[ConvertTask], bool],
+    workers: Optional[int] = None,
+    retries: int = 1,
+    ffprobe_bin: Optional[str] = None,
+    on_done: Optional[Callable[[ConvertTask, bool], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Voert convert_fn uit voor alle taken met een pool van `workers` threads
+    (elk ffmpeg proces is zelf single-threaded, dus threads volstaan).
+
+    Returns:
+      {"results": [{"task", "ok", "attempts", "seconds", "audio_seconds"}...],
+       "stats": {...}}
+    """
+    workers = max(1, min(int(workers or default_workers()), max(1, len(tasks))))
+    retries = max(1, int(retries))
+    t0 = time.perf_counter()
+
+    lock = threading.Lock()
+    results: List[Optional[Dict[str, Any]]] = [None] * len(tasks)
+
+    def work(idx: int, task: ConvertTask) -> Dict[str, Any]:
+        started = time.perf_counter()
+        ok = False
+        attempts = 0
+        for attempts in range(1, retries + 1):
+            try:
+                ok = bool(convert_fn(task))
+            except Exception as e:
+                log.error("[CONVERT] %s: %s", task.input_path.name, e)
+                ok = False
+            if ok:
+                break
+            log.warning("[CONVERT] %s mislukt (poging %d/%d)", task.input_path.name, attempts, retries)
+
+        audio_seconds = None
+        if ok and ffprobe_bin:
+            audio_seconds = ffprobe_duration(task.output_path, ffprobe_bin)
+
+        if on_done is not None:
+            with lock:
+                on_done(task, ok)
+
+        return {
+            "task": task,
+            "ok": ok,
+            "attempts": attempts,
+            "seconds": round(time.perf_counter() - started, 3),
+            "audio_seconds": audio_seconds,
+        }
+
+    log.info("[CONVERT] %d bestanden, %d workers", len(tasks), workers)
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        futs = {ex.submit(work, i, t): i for i, t in enumerate(tasks)}
+        for fut in as_completed(futs):
+            results[futs[fut]] = fut.result()
+
+    elapsed = max(time.perf_counter() - t0, 1e-6)
+    done = [r for r in results if r is not None]
+    ok_count = sum(1 for r in done if r["ok"])
+    audio_total = sum(r["audio_seconds"] or 0.0 for r in done if r["ok"])
+
+    stats = {
+        "files": len(tasks),
+        "ok": ok_count,
+        "failed": len(tasks) - ok_count,
+        "workers": workers,
+        "elapsed_s": round(elapsed, 2),
+        "files_per_min": round(ok_count * 60.0 / elapsed, 2),
+        "audio_seconds": round(audio_total, 1),
+        "audio_sec_per_sec": round(audio_total / elapsed, 2),
+    }
+    log.info(
+        "[CONVERT] klaar: %d/%d OK in %.1fs (%.1f files/min, %.1f audio-s/s)",
+        ok_count, len(tasks), elapsed, stats["files_per_min"], stats["audio_sec_per_sec"],
+    )
+    return {"results": done, "stats": stats}
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+encoder_profile.py - ffmpeg encoder-profiel per machine (autotuning)
+
+Benchmarkt de lokale machine één keer per encode (synthetische audio via
+lavfi, exact de encode van de converter):
+- "yt":  loudnorm + libmp3lame 192k (yt.py)
+- "bmm": libmp3lame -q:a 2, geen loudnorm (bmm.py)
+- encode-snelheid per ffmpeg -threads waarde (1 job)
+- totale doorvoer bij P parallelle jobs
+- geheugen (RSS) per ffmpeg proces
+en bewaart het resultaat in encoder_profile.json (bmm: encoder_profile_bmm.json),
+samen met de hardware-info uit hain.py. Een nieuw profiel wordt gemaakt als
+CPU of ffmpeg-versie wijzigt. De fingerprint (ffmpeg -version) wordt per
+ffmpeg_bin één keer per proces bepaald; een mislukte benchmark wordt voor de
+rest van het proces onthouden (dan defaults, geen nieuwe poging per batch).
+
+De converters gebruiken profile["recommended"] = {"workers", "threads"}.
+
+CLI:
+    python encoder_profile.py [--ffmpeg PAD] [--encode yt|bmm] [--force]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import threading
+import time
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import loudnorm
+
+log = logging.getLogger("cynit-yt")
+
+BASE_DIR = Path(__file__).parent.resolve()
+PROFILE_FILE = BASE_DIR / "encoder_profile.json"
+PROFILE_VERSION = 1
+
+BENCH_SECONDS = 30.0   # lengte van de synthetische audio
+GAIN_THRESHOLD = 1.05  # minstens 5% winst om meer threads/workers te kiezen
+
+# encode-argumenten per converter; de benchmark meet exact deze encode
+ENCODES: Dict[str, List[str]] = {
+    "yt": ["-af", loudnorm.target_filter(), "-acodec", "libmp3lame", "-b:a", "192k"],
+    "bmm": ["-acodec", "libmp3lame", "-q:a", "2"],
+}
+DEFAULT_ENCODE = "yt"
+
+_lock = threading.Lock()
+_cached: Dict[str, Dict[str, Any]] = {}                 # encode -> profiel
+_fingerprints: Dict[str, Dict[str, Any]] = {}           # ffmpeg_bin -> fingerprint
+_failed: Dict[Tuple[str, str], str] = {}                # (ffmpeg_bin, encode) -> fout
+
+
+# =========================
+# Machine / fingerprint
+# =========================
+
+def _cores() -> int:
+    return max(1, os.cpu_count() or 1)
+
+
+def machine_info() -> Dict[str, Any]:
+    """CPU/RAM/GPU via hain.py (psutil); minimale fallback zonder psutil."""
+    try:
+        import hain
+        return {"cpu": hain.get_cpu_info(), "ram": hain.get_ram_info(), "gpu": hain.get_gpu_info()}
+    except Exception:
+        return {"cpu": {"cpu_name": platform.processor(), "total_cores": _cores()}, "ram": {}, "gpu": {}}
+
+
+def ffmpeg_version(ffmpeg_bin: str) -> Optional[str]:
+    try:
+        out = subprocess.run([ffmpeg_bin, "-hide_banner", "-version"], capture_output=True, text=True, timeout=15)
+        return (out.stdout.splitlines() or [""])[0].strip() or None
+    except Exception:
+        return None
+
+
+def fingerprint(ffmpeg_bin: str) -> Dict[str, Any]:
+    """CPU + ffmpeg-versie; per ffmpeg_bin één keer per proces bepaald."""
+    fp = _fingerprints.get(ffmpeg_bin)
+    if fp is None:
+        fp = {
+            "cpu": platform.processor() or platform.machine(),
+            "cores": _cores(),
+            "ffmpeg": ffmpeg_version(ffmpeg_bin),
+        }
+        _fingerprints[ffmpeg_bin] = fp
+    return dict(fp)
+
+
+# =========================
+# Benchmark
+# =========================
+
+def _bench_cmd(ffmpeg_bin: str, threads: int, seconds: float, encode: str = DEFAULT_ENCODE) -> List[str]:
+    return [
+        ffmpeg_bin, "-hide_banner", "-loglevel", "error", "-nostdin",
+        "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=44100:duration={seconds:g}",
+        "-ac", "2",
+        "-threads", str(threads),
+        *ENCODES[encode],
+        "-f", "null", "-",
+    ]
+
+
+def _peak_rss_mb(procs: List[subprocess.Popen]) -> Optional[float]:
+    """Wacht op alle processen en meet onderweg de hoogste RSS per proces (MB)."""
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+
+    peak = 0.0
+    handles = []
+    if psutil is not None:
+        for p in procs:
+            try:
+                handles.append(psutil.Process(p.pid))
+            except Exception:
+                pass
+
+    while any(p.poll() is None for p in procs):
+        for h in handles:
+            try:
+                peak = max(peak, h.memory_info().rss / (1024 * 1024))
+            except Exception:
+                pass
+        time.sleep(0.02)
+    return round(peak, 1) if handles and peak else None
+
+
+def _run_parallel(
+    ffmpeg_bin: str, jobs: int, threads: int, seconds: float, encode: str = DEFAULT_ENCODE
+) -> Tuple[float, Optional[float]]:
+    """Start `jobs` encodes tegelijk; geeft (audio-seconden per seconde, peak RSS MB)."""
+    t0 = time.perf_counter()
+    procs = [subprocess.Popen(_bench_cmd(ffmpeg_bin, threads, seconds, encode)) for _ in range(jobs)]
+    rss = _peak_rss_mb(procs)
+    elapsed = max(time.perf_counter() - t0, 1e-6)
+    if any(p.returncode != 0 for p in procs):
+        raise RuntimeError("ffmpeg benchmark faalde (libmp3lame/lavfi beschikbaar?)")
+    return round(jobs * seconds / elapsed, 2), rss
+
+
+def _levels(limit: int) -> List[int]:
+    out, n = [], 1
+    while n < limit:
+        out.append(n)
+        n *= 2
+    out.append(limit)
+    return sorted(set(out))
+
+
+def _best(scores: Dict[int, float]) -> int:
+    best_n = min(scores)
+    for n in sorted(scores):
+        if scores[n] > scores[best_n] * GAIN_THRESHOLD:
+            best_n = n
+    return best_n
+
+
+def recommend(profile: Dict[str, Any]) -> Dict[str, int]:
+    """Kies workers + threads per job uit de meetresultaten."""
+    cores = int(profile.get("fingerprint", {}).get("cores") or _cores())
+    parallel = {int(k): v for k, v in profile["parallel"].items()}
+    threads = {int(k): v for k, v in profile["threads"].items()}
+
+    workers = _best(parallel)
+
+    # niet meer jobs dan de helft van het vrije RAM toelaat
+    rss = profile.get("rss_mb_per_job")
+    avail_gb = (profile.get("machine", {}).get("ram") or {}).get("available_ram_gb")
+    if rss and avail_gb:
+        workers = max(1, min(workers, int(avail_gb * 1024 * 0.5 // rss)))
+
+    per_job = max(1, min(_best(threads), cores // workers))
+    return {"workers": workers, "threads": per_job}
+
+
+def run_benchmark(ffmpeg_bin: str, seconds: float = BENCH_SECONDS, encode: str = DEFAULT_ENCODE) -> Dict[str, Any]:
+    """Meet de machine voor één encode en bewaart het profiel."""
+    cores = _cores()
+    log.info("[PROFILE] benchmark gestart (%d cores, %s, encode=%s)", cores, ffmpeg_bin, encode)
+
+    threads: Dict[str, float] = {}
+    for t in _levels(cores):
+        threads[str(t)], _ = _run_parallel(ffmpeg_bin, 1, t, seconds, encode)
+
+    parallel: Dict[str, float] = {}
+    rss: Optional[float] = None
+    for p in _levels(cores):
+        parallel[str(p)], peak = _run_parallel(ffmpeg_bin, p, 1, seconds, encode)
+        if p == 1:
+            rss = peak
+
+    profile: Dict[str, Any] = {
+        "version": PROFILE_VERSION,
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "ffmpeg_bin": ffmpeg_bin,
+        "encode": encode,
+        "fingerprint": fingerprint(ffmpeg_bin),
+        "machine": machine_info(),
+        "bench_seconds": seconds,
+        "threads": threads,      # audio-s/s voor 1 job met -threads N
+        "parallel": parallel,    # audio-s/s totaal voor P jobs (-threads 1)
+        "rss_mb_per_job": rss,
+    }
+    profile["recommended"] = recommend(profile)
+    save_profile(profile)
+    log.info("[PROFILE] klaar: %s", profile["recommended"])
+    return profile
+
+
+# =========================
+# Opslag / gebruik
+# =========================
+
+def profile_file(encode: str = DEFAULT_ENCODE) -> Path:
+    return PROFILE_FILE if encode == DEFAULT_ENCODE else BASE_DIR / f"encoder_profile_{encode}.json"
+
+
+def load_profile(encode: str = DEFAULT_ENCODE) -> Optional[Dict[str, Any]]:
+    path = profile_file(encode)
+    if not path.exists():
+        return None
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except Exception as e:
+        log.warning("[PROFILE] %s onleesbaar: %s", path.name, e)
+        return None
+    return data if data.get("version") == PROFILE_VERSION else None
+
+
+def save_profile(profile: Dict[str, Any]) -> None:
+    encode = profile.get("encode") or DEFAULT_ENCODE
+    path = profile_file(encode)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(profile, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+    _cached[encode] = profile
+
+
+def get_profile(
+    ffmpeg_bin: str, benchmark_if_missing: bool = True, encode: str = DEFAULT_ENCODE
+) -> Optional[Dict[str, Any]]:
+    """Profiel voor deze machine + ffmpeg + encode; benchmarkt (één keer) als het ontbreekt of verouderd is."""
+    with _lock:
+        profile = _cached.get(encode) or load_profile(encode)
+        if profile and profile.get("fingerprint") == fingerprint(ffmpeg_bin):
+            _cached[encode] = profile
+            return profile
+        if not benchmark_if_missing or (ffmpeg_bin, encode) in _failed:
+            return None
+        try:
+            return run_benchmark(ffmpeg_bin, encode=encode)
+        except Exception as e:
+            # niet bij elke batch opnieuw proberen (en _lock vasthouden)
+            _failed[(ffmpeg_bin, encode)] = str(e)
+            log.warning("[PROFILE] benchmark niet mogelijk, defaults gebruikt: %s", e)
+            return None
+
+
+def recommended(
+    ffmpeg_bin: str, benchmark_if_missing: bool = True, encode: str = DEFAULT_ENCODE
+) -> Tuple[Optional[int], Optional[int]]:
+    """(workers, threads) voor batch-conversie, of (None, None) zonder profiel."""
+    profile = get_profile(ffmpeg_bin, benchmark_if_missing, encode)
+    if not profile:
+        return None, None
+    rec = profile.get("recommended") or {}
+    return rec.get("workers"), rec.get("threads")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark ffmpeg en bewaar het encoder-profiel.")
+    ap.add_argument("--ffmpeg", default="ffmpeg", help="Pad naar ffmpeg (default: ffmpeg in PATH)")
+    ap.add_argument("--force", action="store_true", help="Opnieuw meten, ook als er al een profiel is")
+    ap.add_argument("--seconds", type=float, default=BENCH_SECONDS, help="Lengte van de test-audio")
+    ap.add_argument("--encode", choices=sorted(ENCODES), default=DEFAULT_ENCODE, help="Welke converter-encode meten")
+    args = ap.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s: %(message)s", datefmt="%H:%M:%S")
+    if args.force:
+        profile = run_benchmark(args.ffmpeg, args.seconds, args.encode)
+    else:
+        profile = get_profile(args.ffmpeg, encode=args.encode)
+    if not profile:
+        return 1
+    print(json.dumps(profile, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -23,7 +23,7 @@ def get_ram_info():
 
 def get_nvidia_gpu():
     try:
-        output = subprocess.check_output("nvidia-smi --query-gpu=name,memory.total --format=csv,noheader", shell=True)
+        output = subprocess.check_output("nvidia-smi --query-gpu=name,memory.total --format=csv,noheader", shell=True, stderr=subprocess.DEVNULL)
         lines = output.decode().strip().split("\n")
         gpus = []
         for line in lines:
@@ -38,7 +38,7 @@ def get_nvidia_gpu():
 
 def get_amd_gpu():
     try:
-        output = subprocess.check_output("wmic path win32_VideoController get Name,AdapterRAM", shell=True)
+        output = subprocess.check_output("wmic path win32_VideoController get Name,AdapterRAM", shell=True, stderr=subprocess.DEVNULL)
         lines = output.decode().strip().split("\n")[1:]
         gpus = []
         for line in lines:
@@ -67,15 +67,16 @@ def get_gpu_info():
 
 # ---- RUN EVERYTHING ----
 
-cpu = get_cpu_info()
-ram = get_ram_info()
-gpu = get_gpu_info()
+if __name__ == "__main__":
+    cpu = get_cpu_info()
+    ram = get_ram_info()
+    gpu = get_gpu_info()
 
-print("=== CPU INFO ===")
-print(cpu)
+    print("=== CPU INFO ===")
+    print(cpu)
 
-print("\n=== RAM INFO ===")
-print(ram)
+    print("\n=== RAM INFO ===")
+    print(ram)
 
-print("\n=== GPU INFO ===")
-print(gpu)
+    print("\n=== GPU INFO ===")
+    print(gpu)
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+jobs.py - achtergrond job-queue voor SP-YT (yt.py en app.py)
+
+- vaste pool van N worker-threads (geen thread per job)
+- jobs + voortgang worden bewaard in een JSON state-bestand; na een herstart
+  worden jobs die nog 'queued' of 'running' waren opnieuw ingepland
+- per-item voortgang (bv. per URL of per bestand) via job.item(...)
+- status als JSON (snapshot) of als Server-Sent Events (stream_events)
+- optioneel begrensd: max_queued (JobQueueFull bij submit) en ttl voor
+  afgewerkte jobs (evict_expired)
+
+Gebruik:
+
+    JOBS = JobQueue(BASE_DIR / "yt_jobs.json", workers=2)
+    JOBS.register("convert", lambda job, **p: batch_convert(..., on_item=job.item))
+    JOBS.start()
+    job_id = JOBS.submit("convert", {"input_folder": "...", ...})
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+import logging
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+log = logging.getLogger("cynit-yt")
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_ERROR = "error"
+FINAL_STATUSES = (STATUS_DONE, STATUS_ERROR)
+
+
+class JobQueueFull(RuntimeError):
+    """Te veel jobs in de wachtrij."""
+
+
+class Job:
+    """Eén job; alle mutaties lopen via de queue-lock zodat snapshots consistent zijn."""
+
+    def __init__(self, owner: "JobQueue", data: Dict[str, Any]) -> None:
+        self._owner = owner
+        self.data = data
+
+    @property
+    def id(self) -> str:
+        return self.data["id"]
+
+    def progress(self, done: int, total: Optional[int] = None) -> None:
+        with self._owner._cond:
+            self.data["progress"]["done"] = int(done)
+            if total is not None:
+                self.data["progress"]["total"] = int(total)
+            self._owner._changed(self)
+
+    def item(self, key: str, **fields: Any) -> None:
+        """Per-item voortgang, bv. item(url, status="downloading", percent=42.0)."""
+        with self._owner._cond:
+            items = self.data["items"]
+            cur = items.setdefault(str(key), {})
+            cur.update(fields)
+            prog = self.data["progress"]
+            prog["total"] = max(prog.get("total") or 0, len(items))
+            prog["done"] = sum(1 for it in items.values() if it.get("status") in ("done", "error", "skipped"))
+            self._owner._changed(self)
+
+
+class JobQueue:
+    def __init__(
+        self,
+        state_file: Path,
+        workers: int = 2,
+        keep: int = 100,
+        save_interval: float = 2.0,
+        max_queued: Optional[int] = None,
+        ttl: Optional[float] = None,
+    ) -> None:
+        self.state_file = Path(state_file)
+        self.workers = max(1, int(workers))
+        self.keep = max(1, int(keep))
+        self.save_interval = float(save_interval)
+        self.max_queued = int(max_queued) if max_queued else None
+        self.ttl = float(ttl) if ttl else None
+
+        self._handlers: Dict[str, Callable[..., Any]] = {}
+        self._jobs: Dict[str, Job] = {}
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._last_save = 0.0
+        self._dirty = False
+        self._load()
+
+    # ---------- registratie / submit ----------
+
+    def register(self, kind: str, fn: Callable[..., Any]) -> None:
+        """fn(job, **params) -> resultaat (JSON-serialiseerbaar)."""
+        self._handlers[kind] = fn
+
+    def submit(self, kind: str, params: Optional[Dict[str, Any]] = None, force: bool = False) -> str:
+        """Plant een job in; JobQueueFull als max_queued bereikt is (tenzij force)."""
+        if kind not in self._handlers:
+            raise ValueError(f"Onbekend job type: {kind}")
+        job_id = uuid.uuid4().hex
+        data = {
+            "id": job_id,
+            "kind": kind,
+            "params": dict(params or {}),
+            "status": STATUS_QUEUED,
+            "created": time.time(),
+            "started": None,
+            "finished": None,
+            "progress": {"done": 0, "total": 0},
+            "items": {},
+            "result": None,
+            "error": None,
+            "version": 0,
+        }
+        with self._cond:
+            if not force and self.is_full():
+                raise JobQueueFull(f"Wachtrij is vol ({self.max_queued} jobs)")
+            self._jobs[job_id] = Job(self, data)
+            self._prune()
+            self._changed(self._jobs[job_id], force_save=True)
+        self._queue.put(job_id)
+        return job_id
+
+    # ---------- opvragen ----------
+
+    def is_full(self) -> bool:
+        if not self.max_queued:
+            return False
+        with self._cond:
+            queued = sum(1 for j in self._jobs.values() if j.data["status"] == STATUS_QUEUED)
+        return queued >= self.max_queued
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            counts: Dict[str, int] = {}
+            for j in self._jobs.values():
+                counts[j.data["status"]] = counts.get(j.data["status"], 0) + 1
+        return {
+            "workers": self.workers,
+            "running": counts.get(STATUS_RUNNING, 0),
+            "queue_depth": counts.get(STATUS_QUEUED, 0),
+            "max_queued": self.max_queued,
+            "done": counts.get(STATUS_DONE, 0),
+            "error": counts.get(STATUS_ERROR, 0),
+            "total": sum(counts.values()),
+            "ttl": self.ttl,
+        }
+
+    def active_params(self) -> List[Dict[str, Any]]:
+        """Params van jobs die nog moeten lopen of lopen (voor cleanup)."""
+        with self._cond:
+            return [
+                dict(j.data["params"]) for j in self._jobs.values()
+                if j.data["status"] not in FINAL_STATUSES
+            ]
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._cond:
+            job = self._jobs.get(job_id)
+            return self._snapshot(job) if job else None
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._cond:
+            jobs = sorted(self._jobs.values(), key=lambda j: j.data["created"], reverse=True)
+            return [{k: v for k, v in self._snapshot(j).items() if k not in ("items", "result")} for j in jobs]
+
+    def wait(self, job_id: str, version: int, timeout: float = 15.0) -> Optional[Dict[str, Any]]:
+        """Blokkeert tot de job een hogere versie heeft dan `version` (of timeout)."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return None
+                if job.data["version"] > version or job.data["status"] in FINAL_STATUSES:
+                    return self._snapshot(job)
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return self._snapshot(job)
+                self._cond.wait(left)
+
+    def stream_events(self, job_id: str, heartbeat: float = 15.0) -> Iterator[str]:
+        """Generator voor een text/event-stream response."""
+        version = -1
+        while True:
+            snap = self.wait(job_id, version, timeout=heartbeat)
+            if snap is None:
+                yield "event: error\ndata: {\"error\": \"Job niet gevonden\"}\n\n"
+                return
+            if snap["version"] == version and snap["status"] not in FINAL_STATUSES:
+                yield ": keepalive\n\n"
+                continue
+            version = snap["version"]
+            yield f"data: {json.dumps(snap)}\n\n"
+            if snap["status"] in FINAL_STATUSES:
+                return
+
+    # ---------- workers ----------
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"sp-yt-job-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        log.info("[JOBS] %d workers gestart (%s)", self.workers, self.state_file.name)
+
+    def _worker(self) -> None:
+        while True:
+            job_id = self._queue.get()
+            with self._cond:
+                job = self._jobs.get(job_id)
+                if job is None or job.data["status"] != STATUS_QUEUED:
+                    continue
+                job.data["status"] = STATUS_RUNNING
+                job.data["started"] = time.time()
+                self._changed(job, force_save=True)
+                fn = self._handlers.get(job.data["kind"])
+                params = dict(job.data["params"])
+
+            try:
+                if fn is None:
+                    raise RuntimeError(f"Geen handler voor job type {job.data['kind']}")
+                result = fn(job, **params)
+                with self._cond:
+                    job.data["status"] = STATUS_DONE
+                    job.data["result"] = result
+            except Exception as e:
+                log.exception("[JOBS] job %s (%s) faalde", job_id, job.data["kind"])
+                with self._cond:
+                    job.data["status"] = STATUS_ERROR
+                    job.data["error"] = str(e)
+            with self._cond:
+                job.data["finished"] = time.time()
+                self._changed(job, force_save=True)
+
+    # ---------- intern ----------
+
+    def _snapshot(self, job: Job) -> Dict[str, Any]:
+        return json.loads(json.dumps(job.data, default=str))
+
+    def _changed(self, job: Job, force_save: bool = False) -> None:
+        # caller houdt self._cond vast
+        job.data["version"] += 1
+        self._dirty = True
+        self._cond.notify_all()
+        now = time.monotonic()
+        if force_save or now - self._last_save >= self.save_interval:
+            self._save()
+            self._last_save = now
+
+    def evict_expired(self) -> List[Dict[str, Any]]:
+        """Verwijdert afgewerkte jobs ouder dan ttl (en boven `keep`); geeft ze terug."""
+        with self._cond:
+            evicted = self._prune()
+            if evicted:
+                self._dirty = True
+                self._save()
+        return evicted
+
+    def _prune(self) -> List[Dict[str, Any]]:
+        finished = sorted(
+            (j for j in self._jobs.values() if j.data["status"] in FINAL_STATUSES),
+            key=lambda j: j.data["finished"] or 0,
+        )
+        drop = finished[: max(0, len(finished) - self.keep)]
+        if self.ttl:
+            cutoff = time.time() - self.ttl
+            drop += [j for j in finished[len(drop):] if (j.data["finished"] or 0) < cutoff]
+        for j in drop:
+            del self._jobs[j.id]
+        return [j.data for j in drop]
+
+    def _save(self) -> None:
+        if not self._dirty:
+            return
+        tmp = self.state_file.with_suffix(".tmp")
+        try:
+            tmp.write_text(
+                json.dumps({"jobs": [j.data for j in self._jobs.values()]}, default=str),
+                encoding="utf-8",
+            )
+            os.replace(tmp, self.state_file)
+            self._dirty = False
+        except Exception as e:
+            log.error("[JOBS] state niet opgeslagen: %s", e)
+
+    def _load(self) -> None:
+        if not self.state_file.exists():
+            return
+        try:
+            data = json.loads(self.state_file.read_text(encoding="utf-8"))
+        except Exception as e:
+            log.warning("[JOBS] state onleesbaar, begin leeg: %s", e)
+            return
+
+        requeue: List[Dict[str, Any]] = []
+        for d in data.get("jobs", []):
+            if not isinstance(d, dict) or "id" not in d:
+                continue
+            if d.get("status") in (STATUS_QUEUED, STATUS_RUNNING):
+                # onderbroken door herstart: opnieuw inplannen
+                d["status"] = STATUS_QUEUED
+                d["started"] = None
+                d["resumed"] = True
+                requeue.append(d)
+            self._jobs[d["id"]] = Job(self, d)
+
+        for d in sorted(requeue, key=lambda d: d.get("created") or 0):
+            self._queue.put(d["id"])
+        if requeue:
+            log.info("[JOBS] %d onderbroken job(s) opnieuw ingepland", len(requeue))
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+loudnorm.py - two-pass loudnorm met gecachte metingen voor SP-YT
+
+Pass 1 (analyse) draait één keer per inputbestand; de gemeten waarden
+(I/TP/LRA/thresh/offset) worden bewaard in loudnorm_cache.json, gekeyed op
+de hash van het bestand + het doel (I/TP/LRA). Re-encodes (andere bitrate)
+en retries na een fout slaan de analyse dus volledig over.
+Pass 2 gebruikt de metingen met linear=true.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+# ====== PAD FIX ====== (cynit_metrics staat in CyNiT-tools; ook standalone, bv. encoder_profile CLI)
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent
+for _root in [_PROJECT_ROOT / "CyNiT-tools", _PROJECT_ROOT]:
+    if _root.exists() and str(_root) not in sys.path:
+        sys.path.insert(0, str(_root))
+
+import cynit_metrics
+
+log = logging.getLogger("cynit-yt")
+
+BASE_DIR = Path(__file__).parent.resolve()
+CACHE_FILE = BASE_DIR / "loudnorm_cache.json"
+
+# doel: zelfde waarden als de vroegere single-pass filter
+TARGET: Dict[str, float] = {"I": -14.0, "TP": -1.5, "LRA": 11.0}
+
+_MEASURE_KEYS = ("input_i", "input_tp", "input_lra", "input_thresh", "target_offset")
+
+_lock = threading.Lock()
+_cache: Optional[Dict[str, Dict[str, str]]] = None
+
+
+# (pad, size, mtime_ns) -> hash; manifest, loudnorm en archief hashen zo
+# elk bestand maar één keer zolang het niet wijzigt
+_HASH_CACHE_MAX = 4096
+_hash_cache: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+_hash_lock = threading.Lock()
+
+
+def file_hash(path: Path, chunk_size: int = 1 << 20) -> str:
+    path = Path(path)
+    st = path.stat()
+    key = (str(path.resolve()), st.st_size, st.st_mtime_ns)
+    with _hash_lock:
+        digest = _hash_cache.get(key)
+        if digest is not None:
+            _hash_cache.move_to_end(key)
+            return digest
+
+    h = hashlib.blake2b(digest_size=20)
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+
+    after = path.stat()
+    if (after.st_size, after.st_mtime_ns) == (st.st_size, st.st_mtime_ns):  # niet gewijzigd tijdens lezen
+        with _hash_lock:
+            _hash_cache[key] = digest
+            while len(_hash_cache) > _HASH_CACHE_MAX:
+                _hash_cache.popitem(last=False)
+    return digest
+
+
+def target_filter(target: Optional[Dict[str, float]] = None) -> str:
+    """Single-pass filter (fallback als meten niet lukt)."""
+    t = target or TARGET
+    return f"loudnorm=I={t['I']:g}:TP={t['TP']:g}:LRA={t['LRA']:g}"
+
+
+def _cache_key(digest: str, target: Dict[str, float]) -> str:
+    return f"{digest}|I={target['I']:g}|TP={target['TP']:g}|LRA={target['LRA']:g}"
+
+
+def _load_cache() -> Dict[str, Dict[str, str]]:
+    global _cache
+    if _cache is None:
+        try:
+            _cache = json.loads(CACHE_FILE.read_text(encoding="utf-8")) if CACHE_FILE.exists() else {}
+        except Exception as e:
+            log.warning("[LOUDNORM] cache onleesbaar, opnieuw beginnen: %s", e)
+            _cache = {}
+    return _cache
+
+
+def _save_cache() -> None:
+    tmp = CACHE_FILE.with_suffix(".tmp")
+    try:
+        tmp.write_text(json.dumps(_cache, indent=1), encoding="utf-8")
+        os.replace(tmp, CACHE_FILE)
+    except Exception as e:
+        log.warning("[LOUDNORM] cache niet opgeslagen: %s", e)
+
+
+def _parse_measurement(stderr: str) -> Optional[Dict[str, str]]:
+    # loudnorm print_format=json: laatste {...} blok in stderr
+    blocks = re.findall(r"\{[^{}]*\}", stderr or "", flags=re.S)
+    if not blocks:
+        return None
+    try:
+        data = json.loads(blocks[-1])
+    except ValueError:
+        return None
+    if not all(k in data for k in _MEASURE_KEYS):
+        return None
+    return {k: str(data[k]) for k in _MEASURE_KEYS}
+
+
+def analyze(input_path: Path, ffmpeg_bin: str, target: Optional[Dict[str, float]] = None) -> Optional[Dict[str, str]]:
+    """Pass 1: meet de loudness van input_path (zonder cache)."""
+    cmd = [
+        ffmpeg_bin, "-hide_banner", "-nostats",
+        "-i", str(input_path),
+        "-vn",
+        "-af", target_filter(target) + ":print_format=json",
+        "-f", "null", "-",
+    ]
+    try:
+        with cynit_metrics.track_dependency("ffmpeg", env="loudnorm") as call:
+            proc = subprocess.run(cmd, capture_output=True, text=True, errors="replace")
+            if proc.returncode != 0:
+                call.fail(f"exit_{proc.returncode}")
+    except FileNotFoundError:
+        log.error("[LOUDNORM] ffmpeg niet gevonden. ffmpeg_bin=%s", ffmpeg_bin)
+        return None
+    if proc.returncode != 0:
+        log.error("[LOUDNORM] analyse faalde voor %s: %s", input_path, proc.stderr[-500:])
+        return None
+    return _parse_measurement(proc.stderr)
+
+
+def measurement(input_path: Path, ffmpeg_bin: str, target: Optional[Dict[str, float]] = None) -> Optional[Dict[str, str]]:
+    """Gecachte meting voor input_path (analyse enkel als de hash nog niet gekend is)."""
+    t = target or TARGET
+    try:
+        key = _cache_key(file_hash(input_path), t)
+    except OSError as e:
+        log.error("[LOUDNORM] kan %s niet lezen: %s", input_path, e)
+        return None
+
+    with _lock:
+        hit = _load_cache().get(key)
+    if hit:
+        log.info("[LOUDNORM] cache hit: %s", Path(input_path).name)
+        return hit
+
+    m = analyze(input_path, ffmpeg_bin, t)
+    if m:
+        with _lock:
+            _load_cache()[key] = m
+            _save_cache()
+    return m
+
+
+def second_pass_filter(m: Dict[str, str], target: Optional[Dict[str, float]] = None) -> str:
+    """Pass 2 filter op basis van de meting (lineaire normalisatie)."""
+    return (
+        target_filter(target)
+        + f":measured_I={m['input_i']}"
+        + f":measured_TP={m['input_tp']}"
+        + f":measured_LRA={m['input_lra']}"
+        + f":measured_thresh={m['input_thresh']}"
+        + f":offset={m['target_offset']}"
+        + ":linear=true"
+    )
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+ratelimit.py - gedeelde rate limiter + adaptieve concurrency voor YouTube downloads
+
+- TokenBucket: globaal max. N requests/sec (met burst); bij throttling (429)
+  wordt de bucket een tijdje "gepauzeerd" voor alle workers samen
+- AdaptiveConcurrency: AIMD
+    * succes  -> na `limit` successen op rij: limit + 1 (additive increase)
+    * throttle -> limit / 2 (multiplicative decrease)
+    * te veel fouten in het venster -> limit - 1
+- backoff_delay: exponentiële backoff met "full jitter"
+"""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+import logging
+from collections import deque
+from typing import Deque, Optional
+
+log = logging.getLogger("cynit-yt")
+
+OUTCOME_OK = "ok"
+OUTCOME_ERROR = "error"
+OUTCOME_THROTTLE = "throttle"
+
+_THROTTLE_MARKERS = (
+    "429",
+    "too many requests",
+    "rate limit",
+    "rate-limit",
+    "confirm you're not a bot",
+    "confirm you’re not a bot",
+)
+
+
+def is_throttle_error(message: Optional[str]) -> bool:
+    msg = (message or "").lower()
+    return any(m in msg for m in _THROTTLE_MARKERS)
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full jitter: uniform(0, min(cap, base * 2^(attempt-1)))."""
+    ceiling = min(cap, base * (2 ** max(0, attempt - 1)))
+    return random.uniform(0, ceiling)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        self.rate = max(0.01, float(rate))
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self) -> None:
+        """Blokkeert tot er een token is (en de bucket niet gepauzeerd is)."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._paused_until and self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait = max(self._paused_until - now, (1.0 - self._tokens) / self.rate)
+            time.sleep(min(max(wait, 0.01), 5.0))
+
+    def pause(self, seconds: float) -> None:
+        """Globale cooldown (bv. na een 429): geen nieuwe requests tot dan."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+
+class AdaptiveConcurrency:
+    def __init__(
+        self,
+        max_limit: int,
+        min_limit: int = 1,
+        initial: Optional[int] = None,
+        window: int = 10,
+        error_threshold: float = 0.5,
+    ) -> None:
+        self.max_limit = max(1, int(max_limit))
+        self.min_limit = max(1, min(int(min_limit), self.max_limit))
+        start = initial if initial is not None else max(self.min_limit, self.max_limit // 2)
+        self.limit = max(self.min_limit, min(int(start), self.max_limit))
+        self.error_threshold = float(error_threshold)
+
+        self.in_flight = 0
+        self.throttled_total = 0
+        self._successes = 0
+        self._recent: Deque[str] = deque(maxlen=max(2, int(window)))
+        self._cond = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self.in_flight >= self.limit:
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self, outcome: str) -> None:
+        with self._cond:
+            self.in_flight = max(0, self.in_flight - 1)
+            self._recent.append(outcome)
+            old = self.limit
+
+            if outcome == OUTCOME_THROTTLE:
+                self.throttled_total += 1
+                self.limit = max(self.min_limit, self.limit // 2)
+                self._successes = 0
+            elif outcome == OUTCOME_OK:
+                self._successes += 1
+                if self._successes >= self.limit:
+                    self.limit = min(self.max_limit, self.limit + 1)
+                    self._successes = 0
+            else:
+                self._successes = 0
+                errors = sum(1 for o in self._recent if o != OUTCOME_OK)
+                if len(self._recent) >= 4 and errors / len(self._recent) > self.error_threshold:
+                    self.limit = max(self.min_limit, self.limit - 1)
+                    self._recent.clear()
+
+            if self.limit != old:
+                log.info("[YT] concurrency %d -> %d (%s)", old, self.limit, outcome)
+            self._cond.notify_all()
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+uploads.py - chunked / hervatbare uploads voor SP-YT app.py
+
+Protocol (offset-gebaseerd, vergelijkbaar met tus):
+
+    POST /uploads                 {"filename", "size", "sha256"?}  -> {"upload_id", "offset", "chunk_size"}
+    PUT  /uploads/<id>?offset=N   body = bytes, header X-Chunk-SHA256  -> {"offset", "complete"}
+    GET  /uploads/<id>                                               -> {"offset", "size", "complete"}
+
+- elke chunk wordt rechtstreeks naar schijf gestreamd (geen volledige request in geheugen)
+- checksum per chunk; bij mismatch wordt de chunk teruggedraaid (offset blijft staan)
+- de offset in upload.json is de 'committed' offset: die schuift pas op nadat
+  de chunk gecontroleerd is; offset/iter_growing komen nooit voorbij die grens
+- offset != huidige grootte -> 409 met de juiste offset, zodat de client kan hervatten
+- state staat op schijf (uploads/<id>/upload.json), dus hervatten kan ook na een herstart
+
+Voor streambare containers (webm/mkv/flv, mp4 met 'moov' vooraan) kan de
+audio-extractie al starten terwijl de upload nog loopt: iter_growing() levert
+de bytes zodra ze binnen zijn.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import struct
+import threading
+import time
+import uuid
+import logging
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, Optional
+
+log = logging.getLogger("cynit-yt")
+
+META_NAME = "upload.json"
+CHUNK_SIZE = 8 * 1024 * 1024          # aangeraden chunkgrootte voor clients
+MAX_CHUNK = 64 * 1024 * 1024          # max. bytes per PUT
+EARLY_START_BYTES = 2 * 1024 * 1024   # minimum voor vroege start (streambare formaten)
+STREAMABLE_EXTS = {"webm", "mkv", "flv"}
+
+_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+class UploadError(Exception):
+    def __init__(self, status: int, message: str, offset: Optional[int] = None) -> None:
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+class Upload:
+    def __init__(self, folder: Path, meta: Dict[str, Any]) -> None:
+        self.folder = folder
+        self.meta = meta
+        self.lock = threading.Lock()
+
+    @property
+    def id(self) -> str:
+        return self.meta["id"]
+
+    @property
+    def path(self) -> Path:
+        return self.folder / self.meta["filename"]
+
+    @property
+    def size(self) -> int:
+        return int(self.meta["size"])
+
+    @property
+    def complete(self) -> bool:
+        return bool(self.meta.get("complete"))
+
+    @property
+    def offset(self) -> int:
+        """Gecontroleerde (committed) bytes; het bestand kan tijdelijk langer zijn."""
+        return int(self.meta.get("offset") or 0)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "upload_id": self.id,
+            "filename": self.meta["filename"],
+            "size": self.size,
+            "offset": self.offset,
+            "complete": self.complete,
+            "job_id": self.meta.get("job_id"),
+            "chunk_size": CHUNK_SIZE,
+        }
+
+
+class UploadStore:
+    def __init__(self, root: Path, max_size: Optional[int] = None) -> None:
+        self.root = Path(root)
+        self.max_size = max_size  # bytes per upload; None = onbeperkt
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._uploads: Dict[str, Upload] = {}
+        self._lock = threading.Lock()
+        self._cond = threading.Condition()
+
+    # ---------- beheer ----------
+
+    def create(self, filename: str, size: int, sha256: Optional[str] = None, **extra: Any) -> Upload:
+        if size <= 0:
+            raise UploadError(400, "Ongeldige bestandsgrootte")
+        if self.max_size is not None and size > self.max_size:
+            raise UploadError(413, f"Bestand te groot (max. {self.max_size // (1024 * 1024)} MB)")
+        upload_id = uuid.uuid4().hex
+        folder = self.root / upload_id
+        folder.mkdir(parents=True)
+        meta = {
+            "id": upload_id,
+            "filename": Path(filename).name,
+            "size": int(size),
+            "sha256": (sha256 or "").lower() or None,
+            "created": time.time(),
+            "complete": False,
+            "offset": 0,
+            "job_id": None,
+            **extra,
+        }
+        up = Upload(folder, meta)
+        up.path.touch()
+        self._save_meta(up)
+        with self._lock:
+            self._uploads[upload_id] = up
+        return up
+
+    def get(self, upload_id: str) -> Optional[Upload]:
+        if not _ID_RE.match(upload_id or ""):
+            return None
+        with self._lock:
+            up = self._uploads.get(upload_id)
+            if up is not None:
+                return up
+            meta_path = self.root / upload_id / META_NAME
+            if not meta_path.exists():
+                return None
+            try:
+                meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            except Exception:
+                return None
+            up = Upload(meta_path.parent, meta)
+            if "offset" not in meta:
+                # state van vóór de committed offset: bestandsgrootte was de offset
+                try:
+                    meta["offset"] = min(up.path.stat().st_size, up.size)
+                except FileNotFoundError:
+                    meta["offset"] = 0
+            self._uploads[upload_id] = up
+            return up
+
+    def discard(self, upload_id: str) -> None:
+        """Verwijdert de upload (map + state)."""
+        with self._lock:
+            self._uploads.pop(upload_id, None)
+        shutil.rmtree(self.root / upload_id, ignore_errors=True)
+
+    def update(self, up: Upload, **fields: Any) -> None:
+        up.meta.update(fields)
+        self._save_meta(up)
+        with self._cond:
+            self._cond.notify_all()
+
+    def _save_meta(self, up: Upload) -> None:
+        meta_path = up.folder / META_NAME
+        tmp = meta_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(up.meta), encoding="utf-8")
+        os.replace(tmp, meta_path)
+
+    # ---------- schrijven ----------
+
+    def write_chunk(
+        self,
+        up: Upload,
+        offset: int,
+        stream: BinaryIO,
+        length: Optional[int],
+        chunk_sha256: Optional[str] = None,
+    ) -> int:
+        """Schrijft één chunk op `offset`; geeft de nieuwe offset terug."""
+        with up.lock:
+            current = up.offset
+            if up.meta.get("failed"):
+                raise UploadError(410, up.meta["failed"], current)
+            if up.complete:
+                raise UploadError(409, "Upload is al volledig", current)
+            if offset != current:
+                raise UploadError(409, "Offset komt niet overeen", current)
+            if length is not None and (length > MAX_CHUNK or offset + length > up.size):
+                raise UploadError(413, "Chunk te groot", current)
+
+            h = hashlib.sha256()
+            written = 0
+            limit = min(MAX_CHUNK, up.size - offset)
+            with up.path.open("r+b") as f:
+                # restanten van een afgebroken/geweigerde chunk voorbij de committed offset weg
+                f.truncate(offset)
+                f.seek(offset)
+                while True:
+                    buf = stream.read(1024 * 1024)
+                    if not buf:
+                        break
+                    written += len(buf)
+                    if written > limit:
+                        f.truncate(offset)
+                        raise UploadError(413, "Chunk te groot", offset)
+                    h.update(buf)
+                    f.write(buf)
+
+                if chunk_sha256 and h.hexdigest() != chunk_sha256.strip().lower():
+                    f.truncate(offset)
+                    raise UploadError(400, "Checksum van de chunk klopt niet", offset)
+                if length is not None and written != length:
+                    f.truncate(offset)
+                    raise UploadError(400, "Chunk onvolledig ontvangen", offset)
+
+            # pas nu (checksum en lengte ok) wordt de chunk zichtbaar voor lezers
+            new_offset = offset + written
+            up.meta["offset"] = new_offset
+            self._save_meta(up)
+            if new_offset >= up.size:
+                self._finish(up)
+            with self._cond:
+                self._cond.notify_all()
+            return new_offset
+
+    def _finish(self, up: Upload) -> None:
+        expected = up.meta.get("sha256")
+        if expected:
+            h = hashlib.sha256()
+            with up.path.open("rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    h.update(chunk)
+            if h.hexdigest() != expected:
+                self.update(up, failed="Checksum van het volledige bestand klopt niet")
+                raise UploadError(400, "Checksum van het volledige bestand klopt niet", up.offset)
+        self.update(up, complete=True, completed=time.time())
+        log.info("[UPLOAD] %s klaar (%d bytes)", up.meta["filename"], up.size)
+
+    # ---------- lezen terwijl de upload loopt ----------
+
+    def can_start_early(self, up: Upload) -> bool:
+        """Kan ffmpeg al beginnen lezen (streambaar formaat en genoeg data)?"""
+        if up.complete:
+            return True
+        if up.offset < min(EARLY_START_BYTES, up.size):
+            return False
+        ext = up.meta["filename"].rsplit(".", 1)[-1].lower()
+        if ext in STREAMABLE_EXTS:
+            return True
+        if ext in ("mp4", "mov"):
+            return _mp4_moov_first(up.path, up.offset) is True
+        return False
+
+    def iter_growing(self, up: Upload, idle_timeout: float = 300.0) -> Iterator[bytes]:
+        """Leest het bestand terwijl het groeit (tot de committed offset), tot de upload volledig is."""
+        pos = 0
+        idle_since = time.monotonic()
+        with up.path.open("rb") as f:
+            while True:
+                available = up.offset
+                data = b""
+                if pos < available:
+                    f.seek(pos)
+                    data = f.read(min(1024 * 1024, available - pos))
+                if data:
+                    pos += len(data)
+                    idle_since = time.monotonic()
+                    yield data
+                    continue
+                if up.complete and pos >= up.size:
+                    return
+                if up.meta.get("failed"):
+                    raise UploadError(400, up.meta["failed"], pos)
+                if time.monotonic() - idle_since > idle_timeout:
+                    raise UploadError(408, "Upload staat stil", pos)
+                with self._cond:
+                    self._cond.wait(1.0)
+
+
+def _mp4_moov_first(path: Path, available: int) -> Optional[bool]:
+    """True als 'moov' voor 'mdat' staat (progressive mp4), False als omgekeerd, None = nog onbekend."""
+    pos = 0
+    try:
+        with path.open("rb") as f:
+            while pos + 8 <= available:
+                f.seek(pos)
+                size, kind = struct.unpack(">I4s", f.read(8))
+                if kind == b"moov":
+                    return True
+                if kind == b"mdat":
+                    return False
+                if size == 1:
+                    if pos + 16 > available:
+                        return None
+                    size = struct.unpack(">Q", f.read(8))[0]
+                if size < 8:
+                    return None
+                pos += size
+    except (OSError, struct.error):
+        return None
+    return None
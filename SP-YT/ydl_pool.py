@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+ydl_pool.py - herbruikbare yt_dlp.YoutubeDL instanties voor SP-YT
+
+Een nieuwe YoutubeDL per URL (en per retry) initialiseert telkens opnieuw de
+extractors, de cookie jar en de HTTP-handlers. Deze pool houdt instanties vast
+over URLs en batches heen:
+
+- per set opties (format, outtmpl, ...) een vrije lijst; een worker leent een
+  instantie exclusief (lease) en geeft ze daarna terug -> in de praktijk één
+  instantie per gelijktijdige worker
+- alle instanties delen één cookie jar (sessie/consent-cookies)
+- extractor-objecten (_ies_instances) en HTTP-verbindingen blijven gecachet
+- progress hook per lease (de hook van de vorige URL lekt niet door)
+- na `max_uses` leases of na een onverwachte fout wordt de instantie gesloten
+
+Gebruik:
+
+    with YDL_POOL.lease(opts, progress_hook=hook) as ydl:
+        info = ydl.extract_info(url, download=True)
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import yt_dlp
+from yt_dlp.utils import YoutubeDLError
+
+log = logging.getLogger("cynit-yt")
+
+ProgressHook = Callable[[Dict[str, Any]], None]
+
+
+class _Entry:
+    def __init__(self, ydl: yt_dlp.YoutubeDL) -> None:
+        self.ydl = ydl
+        self.hook: Optional[ProgressHook] = None
+        self.uses = 0
+
+    def dispatch(self, d: Dict[str, Any]) -> None:
+        hook = self.hook
+        if hook is not None:
+            hook(d)
+
+
+class YDLPool:
+    def __init__(self, max_uses: int = 200, max_idle_per_key: int = 8) -> None:
+        self.max_uses = max(1, int(max_uses))
+        self.max_idle_per_key = max(1, int(max_idle_per_key))
+        self._idle: Dict[str, List[_Entry]] = {}
+        self._lock = threading.Lock()
+        self._cookiejar = None
+        self.created = 0
+        self.reused = 0
+
+    @staticmethod
+    def _key(opts: Dict[str, Any]) -> str:
+        return json.dumps(opts, sort_keys=True, default=str)
+
+    def _create(self, opts: Dict[str, Any]) -> _Entry:
+        params = dict(opts)
+        params.pop("progress_hooks", None)
+        ydl = yt_dlp.YoutubeDL(params)
+        entry = _Entry(ydl)
+        ydl.add_progress_hook(entry.dispatch)
+        with self._lock:
+            # cookiejar is een lazy property in YoutubeDL: vóór het eerste request zetten
+            if self._cookiejar is None:
+                self._cookiejar = ydl.cookiejar
+            else:
+                ydl.cookiejar = self._cookiejar
+            self.created += 1
+        return entry
+
+    @staticmethod
+    def _close(entry: _Entry) -> None:
+        try:
+            entry.ydl.close()
+        except Exception as e:
+            log.debug("[YDL] sluiten faalde: %s", e)
+
+    @contextmanager
+    def lease(self, opts: Dict[str, Any], progress_hook: Optional[ProgressHook] = None) -> Iterator[yt_dlp.YoutubeDL]:
+        """Leent een YoutubeDL voor `opts` (exclusief voor de duur van de with-blok)."""
+        key = self._key({k: v for k, v in opts.items() if k != "progress_hooks"})
+        with self._lock:
+            idle = self._idle.get(key)
+            entry = idle.pop() if idle else None
+            if entry is not None:
+                self.reused += 1
+        if entry is None:
+            entry = self._create(opts)
+
+        entry.hook = progress_hook
+        entry.uses += 1
+        keep = True
+        try:
+            yield entry.ydl
+        except YoutubeDLError:
+            # gewone download-/extractorfout: instantie blijft bruikbaar
+            raise
+        except BaseException:
+            keep = False
+            raise
+        finally:
+            entry.hook = None
+            if keep and entry.uses < self.max_uses:
+                with self._lock:
+                    idle = self._idle.setdefault(key, [])
+                    if len(idle) < self.max_idle_per_key:
+                        idle.append(entry)
+                        entry = None
+            if entry is not None:
+                self._close(entry)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "created": self.created,
+                "reused": self.reused,
+                "idle": sum(len(v) for v in self._idle.values()),
+            }
+
+    def close_all(self) -> None:
+        with self._lock:
+            entries = [e for idle in self._idle.values() for e in idle]
+            self._idle.clear()
+        for e in entries:
+            self._close(e)
+
+
+YDL_POOL = YDLPool()
+atexit.register(YDL_POOL.close_all)
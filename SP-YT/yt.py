@@ -10,6 +10,7 @@ Tabs:
 Extra:
 - Bestandsnaam na download proberen te zetten als "Artist - Titel.ext"
 - Bij MP3-export ID3-tags 'artist' en 'title' invullen op basis van bestandsnaam
+- Pipeline-modus: YouTube → MP3 in één pass (yt-dlp stream → ffmpeg, geen tussenbestand)
 """
 
 from __future__ import annotations
@@ -18,11 +19,14 @@ from pathlib import Path
 import sys
 import yt_dlp
 import logging
+import os
 import json
 import time
+import subprocess
+import tempfile
 import threading
-from concurrent.futures import ThreadPoolExecutor
-from typing import List, Dict, Any, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List, Dict, Any, Optional, Tuple
 
 # ====== PAD FIX ======
 BASE_DIR = Path(__file__).parent.resolve()
@@ -35,9 +39,22 @@ for root in [CYNT_ROOT, PROJECT_ROOT]:
 
 import cynit_theme
 import cynit_layout
+import cynit_metrics
+
+from convert_pool import ConvertTask, ffprobe_duration, ffprobe_for, run_conversions
+import loudnorm
+import encoder_profile
+from convert_manifest import ConvertManifest
+from jobs import JobQueue
+from archive import DownloadArchive, release_path, reserve_path, video_id_from_url
+from ydl_pool import YDL_POOL
+from ratelimit import (
+    OUTCOME_ERROR, OUTCOME_OK, OUTCOME_THROTTLE,
+    AdaptiveConcurrency, TokenBucket, backoff_delay, is_throttle_error,
+)
 
 # ====== HIER MOET DEZE STAAN! ======
-from flask import Flask, render_template_string, request, redirect, send_from_directory
+from flask import Flask, Response, jsonify, render_template_string, request, redirect, send_from_directory, url_for
 
 
 
@@ -62,7 +79,26 @@ DEFAULT_SETTINGS: Dict[str, Any] = {
     "yt": {
         "max_workers": 3,
         "max_retries": 6,
-        "sleep_between_retries": 2.0,
+        "sleep_between_retries": 2.0,   # basis voor exponentiële backoff (met jitter)
+        "backoff_cap": 60.0,            # max. wachttijd tussen pogingen (s)
+        "rate_per_sec": 1.0,            # globale limiet nieuwe requests/sec
+        "burst": 3,
+        "adaptive": True,               # AIMD: concurrency zakt bij throttling
+        "throttle_cooldown": 30.0,      # globale pauze na een 429 (s)
+        "pipeline": False,  # True = yt-dlp -> ffmpeg -> MP3 zonder tussenbestand
+        "archive": True,    # al gedownloade video-ID's overslaan (yt_archive.json)
+    },
+    "convert": {
+        "workers": 0,   # 0 = automatisch (encoder-profiel, anders aantal cores)
+        "threads": 0,   # ffmpeg -threads per job; 0 = automatisch
+        "autotune": True,  # machine 1x benchmarken (encoder_profile.json)
+        "retries": 3,
+        "bitrate": "192k",
+        "two_pass": True,  # loudnorm analyse (gecachet) + lineaire 2e pass
+        "incremental": True,  # enkel nieuwe/gewijzigde bronnen (manifest in outputmap)
+    },
+    "jobs": {
+        "workers": 2,   # aantal jobs (download/convert) tegelijk
     },
 }
 
@@ -112,6 +148,9 @@ def save_yt_settings(data: Dict[str, Any]) -> None:
 
 SETTINGS = load_yt_settings()
 
+# download-archief (video-ID -> bestand + hash)
+ARCHIVE = DownloadArchive(BASE_DIR / "yt_archive.json")
+
 # ====== HULP: bestandsnaam & metadata ======
 
 def safe_filename(name: str) -> str:
@@ -138,18 +177,67 @@ def parse_artist_title_from_basename(basename: str) -> Tuple[Optional[str], Opti
 
 # ====== FFMPEG CONVERT + NORMALISATIE ======
 
+def _run_ffmpeg_with_progress(
+    cmd: List[str],
+    duration: Optional[float],
+    on_progress: Callable[[float], None],
+    stdin: Any = None,
+) -> None:
+    """ffmpeg met -progress pipe:1; roept on_progress(percent) op. Raise zoals check_call."""
+    full = cmd[:-1] + ["-nostats", "-progress", "pipe:1", cmd[-1]]
+    proc = subprocess.Popen(full, stdin=stdin, stdout=subprocess.PIPE, text=True, errors="replace")
+    assert proc.stdout is not None
+    for line in proc.stdout:
+        key, _, value = line.strip().partition("=")
+        if key == "out_time_us" and duration:
+            try:
+                on_progress(min(100.0, round(int(value) / 1e6 / duration * 100.0, 1)))
+            except ValueError:
+                pass
+        elif key == "progress" and value == "end":
+            on_progress(100.0)
+    rc = proc.wait()
+    if rc != 0:
+        raise subprocess.CalledProcessError(rc, full)
+
+
 def convert_to_mp3_normalized(
     input_path: Path,
     output_path: Path,
     ffmpeg_bin: str,
     max_retries: int = 3,
+    bitrate: str = "192k",
+    two_pass: bool = True,
+    on_progress: Optional[Callable[[float], None]] = None,
+    threads: Optional[int] = None,
 ) -> bool:
     """
     Converteer audio naar MP3 met loudnorm en vul metadata in:
     - artist/title op basis van bestandsnaam 'Artist - Titel.mp3'
+    - two_pass: meting 1x per bestand (cache op file hash), daarna lineaire pass;
+      retries en re-encodes aan een andere bitrate hergebruiken de meting
+    - schrijft naar een tijdelijk bestand en vervangt output_path atomair
+    - on_progress(percent): voortgang van de encode (ffmpeg -progress)
+    - threads: ffmpeg -threads (uit het encoder-profiel)
     """
     artist, title = parse_artist_title_from_basename(output_path.stem)
 
+    tmp_path = output_path.with_name(f".{output_path.stem}.part.mp3")
+
+    af = loudnorm.target_filter()
+    if two_pass:
+        m = loudnorm.measurement(input_path, ffmpeg_bin)
+        if m:
+            af = loudnorm.second_pass_filter(m)
+        else:
+            log.warning("[FFMPEG] Geen loudnorm-meting voor %s, single-pass fallback", input_path.name)
+
+    duration = ffprobe_duration(input_path, ffprobe_for(ffmpeg_bin)) if on_progress else None
+    try:
+        src_size: Optional[int] = input_path.stat().st_size
+    except OSError:
+        src_size = None
+
     for attempt in range(1, max_retries + 1):
         log.info(
             "[FFMPEG] (%d/%d) Converteer + normaliseer: %s -> %s",
@@ -170,10 +258,12 @@ def convert_to_mp3_normalized(
             "-acodec",
             "libmp3lame",
             "-b:a",
-            "192k",
+            bitrate,
             "-af",
-            "loudnorm=I=-14:TP=-1.5:LRA=11",
+            af,
         ]
+        if threads:
+            cmd += ["-threads", str(threads)]
 
         # Metadata instellen
         if artist:
@@ -181,24 +271,43 @@ def convert_to_mp3_normalized(
         if title:
             cmd += ["-metadata", f"title={title}"]
 
-        cmd.append(str(output_path))
+        cmd.append(str(tmp_path))
 
         try:
-            import subprocess
-
-            subprocess.check_call(cmd)
+            with cynit_metrics.track_dependency("ffmpeg", env="convert", sent=src_size) as call:
+                if on_progress is not None:
+                    _run_ffmpeg_with_progress(cmd, duration, on_progress)
+                else:
+                    subprocess.check_call(cmd)
+                call.received = tmp_path.stat().st_size
+            os.replace(tmp_path, output_path)
             return True
         except subprocess.CalledProcessError as e:
             log.error("[FFMPEG] Fout bij conversie: %s", e)
             time.sleep(1.0 * attempt)
         except FileNotFoundError:
             log.error("[FFMPEG] ffmpeg niet gevonden. ffmpeg_bin=%s", ffmpeg_bin)
-            return False
+            break
+        except OSError as e:
+            log.error("[FFMPEG] Kon %s niet vervangen: %s", output_path, e)
+            time.sleep(1.0 * attempt)
 
+    try:
+        tmp_path.unlink()
+    except OSError:
+        pass
     return False
 
 
-def batch_convert(input_folder: str, output_folder: str) -> Dict[str, Any]:
+def batch_convert(
+    input_folder: str,
+    output_folder: str,
+    on_item: Optional[Callable[..., None]] = None,
+) -> Dict[str, Any]:
+    """
+    Converteer alle bronbestanden in input_folder naar mp3 in output_folder.
+    on_item(naam, status=..., percent=...) geeft per-bestand voortgang (job-queue).
+    """
     inp = Path(input_folder).expanduser()
     outp = Path(output_folder).expanduser()
 
@@ -207,6 +316,7 @@ def batch_convert(input_folder: str, output_folder: str) -> Dict[str, Any]:
         "output_folder": str(outp),
         "files_found": 0,
         "converted": 0,
+        "skipped": 0,
         "errors": [],
         "details": [],  # lijst van dicts
     }
@@ -225,33 +335,183 @@ def batch_convert(input_folder: str, output_folder: str) -> Dict[str, Any]:
         return result
 
     ffmpeg_bin = SETTINGS.get("paths", {}).get("ffmpeg", "ffmpeg")
+    conv_cfg = SETTINGS.get("convert", {}) or {}
+    workers = int(conv_cfg.get("workers") or 0) or None
+    threads = int(conv_cfg.get("threads") or 0) or None
+    retries = int(conv_cfg.get("retries") or 3)
+    bitrate = str(conv_cfg.get("bitrate") or "192k")
+    two_pass = bool(conv_cfg.get("two_pass", True))
+    incremental = bool(conv_cfg.get("incremental", True))
+
+    tasks = [ConvertTask(f, outp / (f.stem + ".mp3")) for f in files]
+
+    manifest: Optional[ConvertManifest] = None
+    if incremental:
+        settings_key = f"{bitrate}|two_pass={two_pass}|{loudnorm.target_filter()}"
+        manifest = ConvertManifest(outp, settings_key)
+        manifest.prune(f.name for f in files)
+        todo = [t for t in tasks if manifest.needs_convert(t.input_path, t.output_path)]
+        result["skipped"] = len(tasks) - len(todo)
+        tasks = todo
+        if not tasks:
+            manifest.save()
+            return result
+
+    # workers/threads die niet vast ingesteld zijn: uit het encoder-profiel
+    if conv_cfg.get("autotune", True) and (workers is None or threads is None):
+        auto_workers, auto_threads = encoder_profile.recommended(ffmpeg_bin)
+        workers = workers or auto_workers
+        threads = threads or auto_threads
+
+    if on_item is not None:
+        for t in tasks:
+            on_item(t.input_path.name, status="queued", percent=0.0)
+
+    def convert_one(task: ConvertTask) -> bool:
+        name = task.input_path.name
+        progress = None
+        if on_item is not None:
+            on_item(name, status="running")
+            progress = lambda pct: on_item(name, percent=pct)  # noqa: E731
+        ok = convert_to_mp3_normalized(
+            task.input_path, task.output_path, ffmpeg_bin,
+            max_retries=retries, bitrate=bitrate, two_pass=two_pass,
+            on_progress=progress, threads=threads,
+        )
+        if ok and manifest is not None:
+            manifest.record(task.input_path, task.output_path)
+        if on_item is not None:
+            on_item(name, status="done" if ok else "error")
+        return ok
 
-    for f in files:
-        output_name = f.stem + ".mp3"
-        output_path = outp / output_name
-
-        ok = convert_to_mp3_normalized(f, output_path, ffmpeg_bin, max_retries=3)
+    try:
+        run = run_conversions(tasks, convert_one, workers=workers, ffprobe_bin=ffprobe_for(ffmpeg_bin))
+    finally:
+        if manifest is not None:
+            manifest.save()
+    result["stats"] = run["stats"]
+    result["stats"]["threads"] = threads
+
+    for r in run["results"]:
+        task = r["task"]
         row = {
-            "input": f.name,
-            "output": output_name,
-            "status": "OK" if ok else "FOUT",
+            "input": task.input_path.name,
+            "output": task.output_path.name,
+            "status": "OK" if r["ok"] else "FOUT",
         }
         result["details"].append(row)
-        if ok:
+        if r["ok"]:
             result["converted"] += 1
         else:
-            result["errors"].append(f"Fout bij converteren: {f.name}")
+            result["errors"].append(f"Fout bij converteren: {task.input_path.name}")
 
     return result
 
 
 # ====== YOUTUBE DOWNLOAD (PARALLEL + METADATA) ======
 
-def youtube_download_single(url: str, download_folder: Path) -> Dict[str, Any]:
+# Eén limiter voor het hele proces: ook parallelle download-jobs (jobs.workers > 1)
+# delen dezelfde rate en concurrency. Enkel opnieuw opgebouwd als de config wijzigt.
+_LIMITERS_LOCK = threading.Lock()
+_LIMITERS: Optional[Tuple[Tuple[Any, ...], TokenBucket, AdaptiveConcurrency]] = None
+
+
+def _global_limiters(yt_cfg: Dict[str, Any]) -> Tuple[TokenBucket, AdaptiveConcurrency]:
+    global _LIMITERS
+    max_workers = int(yt_cfg.get("max_workers", 3) or 3)
+    key = (
+        float(yt_cfg.get("rate_per_sec", 1.0) or 1.0),
+        int(yt_cfg.get("burst", 3) or 3),
+        max_workers,
+        bool(yt_cfg.get("adaptive", True)),
+    )
+    with _LIMITERS_LOCK:
+        if _LIMITERS is None or _LIMITERS[0] != key:
+            rate, burst, _max, adaptive = key
+            # adaptive uit -> min = max = max_workers (vaste concurrency)
+            _LIMITERS = (
+                key,
+                TokenBucket(rate, burst),
+                AdaptiveConcurrency(max_workers, min_limit=1 if adaptive else max_workers),
+            )
+        return _LIMITERS[1], _LIMITERS[2]
+
+
+def artist_title_from_info(info: Dict[str, Any]) -> Tuple[str, str, str]:
+    """(title, artist, veilige 'Artist - Titel' basisnaam) uit yt-dlp info."""
+    title = info.get("track") or info.get("title") or ""
+    artist = (
+        info.get("artist")
+        or info.get("uploader")
+        or info.get("channel")
+        or ""
+    )
+
+    if artist:
+        nice_base = f"{artist} - {title}"
+    else:
+        nice_base = title or "track"
+
+    return title, artist, safe_filename(nice_base)
+
+
+def claim_target(path: Path, video_id: Optional[str], archive: Optional[DownloadArchive]) -> Path:
+    """Doelpad zonder stille overschrijving (deterministisch '[<id>]' achtervoegsel)."""
+    if archive is not None:
+        return archive.claim_path(path, video_id)
+    if video_id and not reserve_path(path):
+        fallback = path.with_name(f"{path.stem} [{video_id}]{path.suffix}")
+        reserve_path(fallback)
+        return fallback
+    return path
+
+
+def _archive_download(
+    archive: Optional[DownloadArchive],
+    url: str,
+    video_id: Optional[str],
+    path: Path,
+    title: str,
+    artist: str,
+    mode: str,
+) -> Path:
+    """
+    Registreer een download in het archief. Is dezelfde inhoud al aanwezig onder
+    een andere video-ID (re-upload), dan wordt het nieuwe bestand verwijderd en
+    het bestaande pad teruggegeven.
+    """
+    if archive is None or not video_id:
+        return path
+    try:
+        digest = loudnorm.file_hash(path)
+    except OSError:
+        digest = None
+    if digest:
+        dup = archive.find_hash(digest, exclude_id=video_id)
+        if dup is not None and Path(dup[1]["path"]) != path:
+            log.info("[ARCHIVE] %s is identiek aan %s, dubbel verwijderd", path.name, dup[0])
+            try:
+                path.unlink()
+            except OSError:
+                pass
+            path = Path(dup[1]["path"])
+    archive.add(video_id, url, path, digest, title=title, artist=artist or None, mode=mode)
+    return path
+
+
+def youtube_download_single(
+    url: str,
+    download_folder: Path,
+    progress_hook: Optional[Callable[[Dict[str, Any]], None]] = None,
+    archive: Optional[DownloadArchive] = None,
+) -> Dict[str, Any]:
     """
     Download één YouTube-URL.
     - Slaat audio op in download_folder
-    - Probeert 'Artist - Titel.ext' als bestandsnaam te gebruiken
+    - Probeert 'Artist - Titel.ext' als bestandsnaam te gebruiken;
+      bij een naamconflict met een andere video: 'Artist - Titel [<id>].ext'
+    - progress_hook: yt-dlp progress hook (dict met status/downloaded_bytes/...)
+    - archive: registreert video-ID + content hash
     - Returnt dict met info voor de UI
     """
     download_folder = download_folder.expanduser()
@@ -259,7 +519,7 @@ def youtube_download_single(url: str, download_folder: Path) -> Dict[str, Any]:
 
     ydl_opts = {
         "format": "bestaudio/best",
-        "outtmpl": str(download_folder / "%(title)s.%(ext)s"),
+        "outtmpl": str(download_folder / "%(title)s [%(id)s].%(ext)s"),
         "noplaylist": True,
         "quiet": True,
         "no_warnings": True,
@@ -272,11 +532,13 @@ def youtube_download_single(url: str, download_folder: Path) -> Dict[str, Any]:
         "filename": None,
         "title": None,
         "artist": None,
+        "video_id": None,
         "error": None,
     }
 
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        # instantie uit de pool: extractors, cookies en HTTP-sessie blijven behouden
+        with YDL_POOL.lease(ydl_opts, progress_hook=progress_hook) as ydl:
             info = ydl.extract_info(url, download=True)
             if info is None:
                 raise RuntimeError("Geen info van yt-dlp (video mogelijk niet beschikbaar).")
@@ -286,35 +548,27 @@ def youtube_download_single(url: str, download_folder: Path) -> Dict[str, Any]:
             ext = orig_path.suffix
 
             # Haal metadata uit info
-            title = info.get("track") or info.get("title") or ""
-            artist = (
-                info.get("artist")
-                or info.get("uploader")
-                or info.get("channel")
-                or ""
-            )
-
-            if artist:
-                nice_base = f"{artist} - {title}"
-            else:
-                nice_base = title or "track"
-
-            nice_base = safe_filename(nice_base)
-            new_path = orig_path.with_name(nice_base + ext)
+            title, artist, nice_base = artist_title_from_info(info)
+            video_id = info.get("id")
+            new_path = claim_target(orig_path.with_name(nice_base + ext), video_id, archive)
 
             if new_path != orig_path:
                 try:
-                    orig_path.rename(new_path)
+                    os.replace(orig_path, new_path)
                 except Exception as e:
                     log.warning("Kon %s niet hernoemen naar %s: %s", orig_path, new_path, e)
+                    release_path(new_path)
                     new_path = orig_path  # fallback
 
+            new_path = _archive_download(archive, url, video_id, new_path, title, artist, "download")
+
             res.update(
                 {
                     "ok": True,
                     "filename": new_path.name,
                     "title": title,
                     "artist": artist or None,
+                    "video_id": video_id,
                 }
             )
             log.info("[YT-DLP] Downloaded: %s (%s)", new_path.name, url)
@@ -326,31 +580,233 @@ def youtube_download_single(url: str, download_folder: Path) -> Dict[str, Any]:
     return res
 
 
-def youtube_batch_download(urls: List[str]) -> Dict[str, Any]:
+def youtube_pipeline_single(
+    url: str,
+    output_folder: Path,
+    ffmpeg_bin: str,
+    bitrate: str = "192k",
+    on_progress: Optional[Callable[[float], None]] = None,
+    archive: Optional[DownloadArchive] = None,
+) -> Dict[str, Any]:
+    """
+    Pipeline-modus: yt-dlp stream -> ffmpeg stdin -> genormaliseerde MP3, in één pass.
+    - geen tussenbestand (geen .webm/.m4a op schijf)
+    - tags artist/title uit de yt-dlp info
+    - loudnorm is hier single-pass (de analyse-pass vraagt een volledig bestand)
+    - in de EXE (frozen) leest ffmpeg de gekozen stream-URL rechtstreeks
+    """
+    output_folder = output_folder.expanduser()
+    ensure_folder(output_folder)
+
+    res: Dict[str, Any] = {
+        "url": url,
+        "ok": False,
+        "filename": None,
+        "title": None,
+        "artist": None,
+        "video_id": None,
+        "error": None,
+    }
+
+    ydl_opts = {
+        "format": "bestaudio/best",
+        "noplaylist": True,
+        "quiet": True,
+        "no_warnings": True,
+    }
+
+    info_file: Optional[Path] = None
+    producer: Optional[subprocess.Popen] = None
+    tmp_path: Optional[Path] = None
+    out_path: Optional[Path] = None
+    try:
+        with YDL_POOL.lease(ydl_opts) as ydl:
+            info = ydl.extract_info(url, download=False)
+            if info is None:
+                raise RuntimeError("Geen info van yt-dlp (video mogelijk niet beschikbaar).")
+            info = ydl.sanitize_info(info)
+
+        title, artist, nice_base = artist_title_from_info(info)
+        video_id = info.get("id")
+        out_path = claim_target(output_folder / f"{nice_base}.mp3", video_id, archive)
+        tmp_path = out_path.with_name(f".{out_path.stem}.part.mp3")
+
+        cmd = [ffmpeg_bin, "-y", "-hide_banner", "-loglevel", "error"]
+        if getattr(sys, "frozen", False):
+            headers = "".join(f"{k}: {v}\r\n" for k, v in (info.get("http_headers") or {}).items())
+            cmd += ["-headers", headers, "-i", info["url"]]
+        else:
+            # info hergebruiken zodat yt-dlp niet opnieuw extraheert
+            with tempfile.NamedTemporaryFile("w", suffix=".info.json", delete=False, encoding="utf-8") as f:
+                json.dump(info, f)
+                info_file = Path(f.name)
+            producer = subprocess.Popen(
+                [
+                    sys.executable, "-m", "yt_dlp",
+                    "--quiet", "--no-warnings", "--no-part",
+                    "--load-info-json", str(info_file),
+                    "-f", "bestaudio/best",
+                    "-o", "-",
+                ],
+                stdout=subprocess.PIPE,
+            )
+            cmd += ["-i", "pipe:0"]
+
+        cmd += ["-vn", "-acodec", "libmp3lame", "-b:a", bitrate, "-af", loudnorm.target_filter()]
+        if artist:
+            cmd += ["-metadata", f"artist={artist}"]
+        if title:
+            cmd += ["-metadata", f"title={title}"]
+        cmd.append(str(tmp_path))
+
+        stdin = producer.stdout if producer is not None else None
+        duration = info.get("duration")
+        try:
+            with cynit_metrics.track_dependency("ffmpeg", env="pipeline") as call:
+                if on_progress is not None:
+                    _run_ffmpeg_with_progress(cmd, duration, on_progress, stdin=stdin)
+                else:
+                    subprocess.run(cmd, stdin=stdin, check=True)
+                call.received = tmp_path.stat().st_size
+        finally:
+            if producer is not None:
+                producer.stdout.close()
+                if producer.wait() != 0:
+                    raise RuntimeError(f"yt-dlp stream faalde (exit {producer.returncode})")
+
+        os.replace(tmp_path, out_path)
+        out_path = _archive_download(archive, url, video_id, out_path, title, artist, "pipeline")
+        res.update({
+            "ok": True,
+            "filename": out_path.name,
+            "title": title,
+            "artist": artist or None,
+            "video_id": video_id,
+        })
+        log.info("[PIPELINE] %s -> %s", url, out_path.name)
+
+    except Exception as e:
+        res["error"] = str(e)
+        log.error("[PIPELINE] Fout bij %s: %s", url, e)
+        if producer is not None and producer.poll() is None:
+            producer.kill()
+        if tmp_path is not None:
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
+        release_path(out_path)
+    finally:
+        if info_file is not None:
+            try:
+                info_file.unlink()
+            except OSError:
+                pass
+
+    return res
+
+
+def youtube_batch_download(
+    urls: List[str],
+    on_item: Optional[Callable[..., None]] = None,
+    pipeline: Optional[bool] = None,
+) -> Dict[str, Any]:
     """
     Download meerdere URLs parallel, met retries.
+    - globale token bucket (rate_per_sec/burst), gedeeld door alle workers én jobs
+    - globale adaptieve concurrency (AIMD, max = max_workers) op basis van fouten/throttling
+    - exponentiële backoff met jitter tussen pogingen
     Geeft dict terug met 'results' (lijst) en 'summary'.
+    on_item(url, status=..., percent=..., attempt=...) geeft per-URL voortgang.
+    pipeline=True: elke URL gaat rechtstreeks naar een MP3 in de outputmap
+    (downloads en encodes van verschillende URLs lopen dan parallel).
     """
     download_folder = Path(SETTINGS.get("paths", {}).get("download_folder", "C:/mus"))
     yt_cfg = SETTINGS.get("yt", {})
     max_workers = int(yt_cfg.get("max_workers", 3) or 3)
     max_retries = int(yt_cfg.get("max_retries", 6) or 6)
     sleep_between = float(yt_cfg.get("sleep_between_retries", 2.0) or 2.0)
+    backoff_cap = float(yt_cfg.get("backoff_cap", 60.0) or 60.0)
+    cooldown = float(yt_cfg.get("throttle_cooldown", 30.0) or 30.0)
+    bucket, concurrency = _global_limiters(yt_cfg)
+    if pipeline is None:
+        pipeline = bool(yt_cfg.get("pipeline", False))
+    output_folder = Path(SETTINGS.get("paths", {}).get("output_folder", "C:/mus-e"))
+    ffmpeg_bin = SETTINGS.get("paths", {}).get("ffmpeg", "ffmpeg")
+    bitrate = str((SETTINGS.get("convert", {}) or {}).get("bitrate") or "192k")
+    archive = ARCHIVE if yt_cfg.get("archive", True) else None
+    mode = "pipeline" if pipeline else "download"
 
     total = len(urls)
     done_counter = 0
+    throttled = 0  # enkel deze batch; concurrency.throttled_total is globaal
     done_lock = threading.Lock()
     results: List[Dict[str, Any]] = []
 
     def worker(u: str) -> Dict[str, Any]:
-        nonlocal done_counter
+        nonlocal done_counter, throttled
         res: Dict[str, Any] = {}
+
+        # al in de bibliotheek? meteen klaar, zonder netwerk
+        known = archive.get(video_id_from_url(u)) if archive is not None else None
+        if known is not None and known.get("mode") == mode:
+            with done_lock:
+                done_counter += 1
+            if on_item is not None:
+                on_item(u, status="skipped", filename=Path(known["path"]).name)
+            return {
+                "url": u,
+                "ok": True,
+                "skipped": True,
+                "filename": Path(known["path"]).name,
+                "title": known.get("title"),
+                "artist": known.get("artist"),
+                "video_id": known["video_id"],
+                "error": None,
+            }
+
+        hook = None
+        if on_item is not None:
+            def hook(d: Dict[str, Any]) -> None:
+                if d.get("status") == "downloading":
+                    total_b = d.get("total_bytes") or d.get("total_bytes_estimate") or 0
+                    pct = round(d.get("downloaded_bytes", 0) * 100.0 / total_b, 1) if total_b else None
+                    on_item(u, status="downloading", percent=pct, speed=d.get("speed"), eta=d.get("eta"))
+                elif d.get("status") == "finished":
+                    on_item(u, status="downloading", percent=100.0)
+
         for attempt in range(1, max_retries + 1):
             log.info("[YT] %s → poging %d/%d", u, attempt, max_retries)
-            res = youtube_download_single(u, download_folder)
-            if res.get("ok"):
+            concurrency.acquire()
+            outcome = OUTCOME_ERROR
+            try:
+                bucket.acquire()
+                if on_item is not None:
+                    on_item(u, status="downloading", attempt=attempt, percent=0.0)
+                if pipeline:
+                    progress = (lambda pct: on_item(u, status="streaming", percent=pct)) if on_item else None
+                    res = youtube_pipeline_single(
+                        u, output_folder, ffmpeg_bin, bitrate, on_progress=progress, archive=archive,
+                    )
+                else:
+                    res = youtube_download_single(u, download_folder, progress_hook=hook, archive=archive)
+                if res.get("ok"):
+                    outcome = OUTCOME_OK
+                elif is_throttle_error(res.get("error")):
+                    outcome = OUTCOME_THROTTLE
+                    bucket.pause(cooldown)
+                    with done_lock:
+                        throttled += 1
+            finally:
+                concurrency.release(outcome)
+
+            if outcome == OUTCOME_OK:
                 break
-            time.sleep(sleep_between * attempt)
+            if attempt < max_retries:
+                delay = backoff_delay(attempt, sleep_between, backoff_cap)
+                if outcome == OUTCOME_THROTTLE:
+                    delay = max(delay, cooldown)
+                time.sleep(delay)
 
         with done_lock:
             done_counter += 1
@@ -358,6 +814,8 @@ def youtube_batch_download(urls: List[str]) -> Dict[str, Any]:
 
         if not res.get("ok"):
             res["error"] = res.get("error") or f"Download faalde na {max_retries} pogingen."
+        if on_item is not None:
+            on_item(u, status="done" if res.get("ok") else "error", filename=res.get("filename"), error=res.get("error"))
         return res
 
     if total == 0:
@@ -366,6 +824,10 @@ def youtube_batch_download(urls: List[str]) -> Dict[str, Any]:
             "summary": {"total": 0, "ok": 0, "failed": 0},
         }
 
+    if on_item is not None:
+        for u in urls:
+            on_item(u, status="queued", percent=0.0)
+
     with ThreadPoolExecutor(max_workers=max_workers) as ex:
         futs = [ex.submit(worker, u) for u in urls]
         for fut in as_completed(futs):
@@ -380,6 +842,10 @@ def youtube_batch_download(urls: List[str]) -> Dict[str, Any]:
             "total": total,
             "ok": ok_count,
             "failed": fail_count,
+            "skipped": sum(1 for r in results if r.get("skipped")),
+            "throttled": throttled,
+            "final_concurrency": concurrency.limit,
+            "ydl_instances": YDL_POOL.stats(),
         },
     }
 
@@ -388,6 +854,26 @@ def youtube_batch_download(urls: List[str]) -> Dict[str, Any]:
 
 app = Flask(__name__)
 app.secret_key = "cynit-yt-dev-key"  # enkel lokaal, dus prima
+cynit_metrics.init_app(app)
+
+
+# ====== JOB QUEUE (downloads + conversies op de achtergrond) ======
+
+def _job_convert(job, input_folder: str, output_folder: str) -> Dict[str, Any]:
+    return batch_convert(input_folder, output_folder, on_item=job.item)
+
+
+def _job_download(job, urls: List[str], pipeline: Optional[bool] = None) -> Dict[str, Any]:
+    return youtube_batch_download(urls, on_item=job.item, pipeline=pipeline)
+
+
+JOB_QUEUE = JobQueue(
+    BASE_DIR / "yt_jobs.json",
+    workers=int((SETTINGS.get("jobs", {}) or {}).get("workers", 2) or 2),
+)
+JOB_QUEUE.register("convert", _job_convert)
+JOB_QUEUE.register("download", _job_download)
+JOB_QUEUE.start()
 
 PAGE_TEMPLATE = """
 <!doctype html>
@@ -527,6 +1013,70 @@ PAGE_TEMPLATE = """
       <a href="{{ url_for('index', tab='settings') }}" class="tab {% if active_tab=='settings' %}active{% endif %}">Instellingen</a>
     </div>
 
+    {# === JOB VOORTGANG === #}
+    {% if job and job.status not in ('done', 'error') %}
+      <div class="card" id="job-card">
+        <h2>Bezig: {% if job.kind == 'download' %}YouTube download{% else %}conversie{% endif %}</h2>
+        <p class="muted" id="job-summary">{{ job.status }}</p>
+        <table class="result-table">
+          <tbody id="job-items"></tbody>
+        </table>
+      </div>
+      <script>
+        (function () {
+          var url = "{{ url_for('job_status', job_id=job.id) }}";
+          var summary = document.getElementById("job-summary");
+          var body = document.getElementById("job-items");
+
+          function esc(t) {
+            var d = document.createElement("div");
+            d.textContent = t == null ? "" : String(t);
+            return d.innerHTML;
+          }
+
+          function render(s) {
+            var p = s.progress || {};
+            summary.textContent = s.status + " · " + (p.done || 0) + "/" + (p.total || 0) + " klaar";
+            var rows = "";
+            Object.keys(s.items || {}).forEach(function (k) {
+              var it = s.items[k];
+              if (it.status === "queued" || it.status === "done") return;
+              var pct = it.percent == null ? "" : it.percent + "%";
+              rows += "<tr class='" + (it.status === "error" ? "row-err" : "") + "'><td>" + esc(k) +
+                      "</td><td>" + esc(it.status) + "</td><td>" + esc(pct) + "</td><td>" + esc(it.error || "") + "</td></tr>";
+            });
+            body.innerHTML = rows;
+            if (s.status === "done" || s.status === "error") {
+              window.location.reload();
+              return true;
+            }
+            return false;
+          }
+
+          function poll() {
+            fetch(url).then(function (r) { return r.json(); }).then(function (s) {
+              if (!render(s)) setTimeout(poll, 1500);
+            }).catch(function () { setTimeout(poll, 3000); });
+          }
+
+          if (window.EventSource) {
+            var es = new EventSource(url + "?stream=1");
+            es.onmessage = function (e) {
+              if (render(JSON.parse(e.data))) es.close();
+            };
+            es.onerror = function () { es.close(); poll(); };
+          } else {
+            poll();
+          }
+        })();
+      </script>
+    {% elif job and job.status == 'error' %}
+      <div class="card">
+        <h2>Job mislukt</h2>
+        <p class="muted">{{ job.error }}</p>
+      </div>
+    {% endif %}
+
     {# === CONVERTER TAB === #}
     {% if active_tab == 'converter' %}
       <div class="card">
@@ -553,8 +1103,17 @@ PAGE_TEMPLATE = """
           <p class="muted">
             Gevonden bestanden: {{ convert_result.files_found }} ·
             Geconverteerd: {{ convert_result.converted }} ·
+            Ongewijzigd (overgeslagen): {{ convert_result.skipped }} ·
             Fouten: {{ convert_result.errors|length }}
           </p>
+          {% if convert_result.stats %}
+            <p class="muted">
+              {{ convert_result.stats.workers }} workers{% if convert_result.stats.threads %} × {{ convert_result.stats.threads }} threads{% endif %} ·
+              {{ convert_result.stats.elapsed_s }} s ·
+              {{ convert_result.stats.files_per_min }} bestanden/min ·
+              {{ convert_result.stats.audio_sec_per_sec }} audio-s/s
+            </p>
+          {% endif %}
 
           {% if convert_result.details %}
             <table class="result-table">
@@ -602,6 +1161,11 @@ PAGE_TEMPLATE = """
           <label>YouTube URLs (één per lijn)</label>
           <textarea name="urls">{{ urls_text }}</textarea>
 
+          <label>
+            <input type="checkbox" name="pipeline" value="1" {% if yt_pipeline %}checked{% endif %}>
+            Direct naar genormaliseerde MP3 in <code>{{ output_folder }}</code> (zonder tussenbestand)
+          </label>
+
           <div class="button-row">
             <button type="submit" class="btn">Download audio</button>
           </div>
@@ -613,6 +1177,8 @@ PAGE_TEMPLATE = """
             Totaal: {{ yt_summary.total }} ·
             OK: {{ yt_summary.ok }} ·
             Fout: {{ yt_summary.failed }}
+            {% if yt_summary.skipped %} · Al in bibliotheek: {{ yt_summary.skipped }}{% endif %}
+            {% if yt_summary.throttled %} · Throttled: {{ yt_summary.throttled }}{% endif %}
           </p>
         {% endif %}
 
@@ -633,7 +1199,7 @@ PAGE_TEMPLATE = """
                   <td>{{ r.title or "—" }}</td>
                   <td>{{ r.artist or "—" }}</td>
                   <td>{{ r.filename or "—" }}</td>
-                  <td>{% if r.ok %}✅ OK{% else %}❌ Fout{% endif %}</td>
+                  <td>{% if r.skipped %}⏭ Al in bibliotheek{% elif r.ok %}✅ OK{% else %}❌ Fout{% endif %}</td>
                   <td>{{ r.error or "" }}</td>
                 </tr>
               {% endfor %}
@@ -666,6 +1232,9 @@ PAGE_TEMPLATE = """
           <label>Max. retries per URL</label>
           <input type="number" name="yt_max_retries" min="1" max="20" value="{{ yt_max_retries }}">
 
+          <label>Parallelle conversies (0 = automatisch via encoder-profiel)</label>
+          <input type="number" name="convert_workers" min="0" max="64" value="{{ convert_workers }}">
+
           <div class="button-row">
             <button type="submit" class="btn">Instellingen opslaan</button>
           </div>
@@ -685,6 +1254,7 @@ def render_main_page(
     yt_results: Optional[List[Dict[str, Any]]] = None,
     yt_summary: Optional[Dict[str, Any]] = None,
     urls_text: str = "",
+    job: Optional[Dict[str, Any]] = None,
 ):
     global SETTINGS
     colors = cynit_theme.load_settings().get("colors", {})
@@ -700,6 +1270,8 @@ def render_main_page(
 
     yt_max_workers = int(yt_cfg.get("max_workers", DEFAULT_SETTINGS["yt"]["max_workers"]))
     yt_max_retries = int(yt_cfg.get("max_retries", DEFAULT_SETTINGS["yt"]["max_retries"]))
+    convert_workers = int((SETTINGS.get("convert", {}) or {}).get("workers", 0) or 0)
+    yt_pipeline = bool(yt_cfg.get("pipeline", False))
 
     base_css = cynit_layout.common_css(cynit_theme.load_settings())
     common_js = cynit_layout.common_js()
@@ -718,12 +1290,17 @@ def render_main_page(
 
     if isinstance(convert_result, dict):
         convert_result = Obj(convert_result)
+        if isinstance(convert_result.get("stats"), dict):
+            convert_result["stats"] = Obj(convert_result["stats"])
         if isinstance(convert_result.get("details"), list):
             convert_result["details"] = [Obj(d) for d in convert_result["details"]]
 
     if isinstance(yt_summary, dict):
         yt_summary = Obj(yt_summary)
 
+    if isinstance(job, dict):
+        job = Obj(job)
+
     return render_template_string(
         PAGE_TEMPLATE,
         base_css=base_css,
@@ -739,10 +1316,13 @@ def render_main_page(
         ffmpeg_path=ffmpeg_path,
         yt_max_workers=yt_max_workers,
         yt_max_retries=yt_max_retries,
+        convert_workers=convert_workers,
+        yt_pipeline=yt_pipeline,
         convert_result=convert_result,
         yt_results=yt_results or [],
         yt_summary=yt_summary,
         urls_text=urls_text,
+        job=job,
     )
 
 
@@ -751,7 +1331,22 @@ def render_main_page(
 @app.route("/", methods=["GET"])
 def index():
     tab = request.args.get("tab") or "converter"
-    return render_main_page(active_tab=tab)
+    job_id = request.args.get("job")
+    job = JOB_QUEUE.get(job_id) if job_id else None
+    if not job:
+        return render_main_page(active_tab=tab)
+
+    result = job.get("result") if job["status"] == "done" else None
+    if job["kind"] == "download":
+        result = result or {}
+        return render_main_page(
+            active_tab=tab,
+            yt_results=result.get("results", []),
+            yt_summary=result.get("summary"),
+            urls_text="\n".join(job["params"].get("urls", [])),
+            job=job,
+        )
+    return render_main_page(active_tab=tab, convert_result=result, job=job)
 
 @app.route("/logo.png")
 def logo_png():
@@ -776,8 +1371,8 @@ def convert():
     SETTINGS["paths"] = paths_cfg
     save_yt_settings(SETTINGS)
 
-    result = batch_convert(input_folder, output_folder)
-    return render_main_page(active_tab="converter", convert_result=result)
+    job_id = JOB_QUEUE.submit("convert", {"input_folder": input_folder, "output_folder": output_folder})
+    return redirect(url_for("index", tab="converter", job=job_id))
 
 
 @app.route("/download_youtube", methods=["POST"])
@@ -785,16 +1380,56 @@ def download_youtube():
     urls_raw = request.form.get("urls", "").strip()
     urls = [u.strip() for u in urls_raw.splitlines() if u.strip()]
 
-    batch_res = youtube_batch_download(urls)
-    yt_results = batch_res.get("results", [])
-    yt_summary = batch_res.get("summary", {})
+    if not urls:
+        return render_main_page(active_tab="youtube", urls_text=urls_raw)
 
-    return render_main_page(
-        active_tab="youtube",
-        yt_results=yt_results,
-        yt_summary=yt_summary,
-        urls_text=urls_raw,
+    job_id = JOB_QUEUE.submit("download", {"urls": urls, "pipeline": bool(request.form.get("pipeline"))})
+    return redirect(url_for("index", tab="youtube", job=job_id))
+
+
+@app.route("/library/lookup", methods=["GET", "POST"])
+def library_lookup():
+    """
+    Staat een URL al in de bibliotheek?
+    GET ?url=...&url=...  of  POST JSON {"urls": [...]}
+    """
+    urls = request.args.getlist("url")
+    if request.method == "POST":
+        data = request.get_json(silent=True) or {}
+        urls += [str(u) for u in (data.get("urls") or [])]
+    urls = [u.strip() for u in urls if u and u.strip()]
+    if not urls:
+        return jsonify({"error": "Geef minstens één url mee"}), 400
+    return jsonify({"results": [ARCHIVE.lookup(u) for u in urls]})
+
+
+@app.route("/jobs")
+def jobs_list():
+    return jsonify(JOB_QUEUE.list())
+
+
+@app.route("/jobs/<job_id>")
+def job_status(job_id: str):
+    """JSON snapshot, of Server-Sent Events met ?stream=1 / Accept: text/event-stream."""
+    if JOB_QUEUE.get(job_id) is None:
+        return jsonify({"status": "unknown", "error": "Job niet gevonden"}), 404
+
+    wants_stream = request.args.get("stream") == "1" or "text/event-stream" in (
+        request.headers.get("Accept") or ""
     )
+    if wants_stream:
+        return Response(
+            JOB_QUEUE.stream_events(job_id),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+    return jsonify(JOB_QUEUE.get(job_id))
+
+
+@app.route("/metrics")
+def metrics():
+    """Prometheus metrics: requests per route + ffmpeg-calls (duur, fouten, bytes)."""
+    return cynit_metrics.REGISTRY.expose(), 200, {"Content-Type": "text/plain; version=0.0.4"}
 
 
 @app.route("/update_settings", methods=["POST"])
@@ -809,6 +1444,7 @@ def update_settings():
     ffmpeg_path = request.form.get("ffmpeg", "").strip()
     yt_max_workers = request.form.get("yt_max_workers", "").strip()
     yt_max_retries = request.form.get("yt_max_retries", "").strip()
+    convert_workers = request.form.get("convert_workers", "").strip()
 
     if download_folder:
         paths_cfg["download_folder"] = download_folder
@@ -830,6 +1466,12 @@ def update_settings():
         except ValueError:
             pass
 
+    if convert_workers:
+        try:
+            SETTINGS.setdefault("convert", {})["workers"] = max(0, int(convert_workers))
+        except ValueError:
+            pass
+
     SETTINGS["paths"] = paths_cfg
     SETTINGS["yt"] = yt_cfg
     save_yt_settings(SETTINGS)